@@ -2,17 +2,31 @@ import duckdb
 import sys
 import os
 import datetime
+import time
+import orjson
+from ipnet import private_ip_sql
+from cli import parse_args
+from duck_hunt import WINDOW_OPTIONS, get_parquet_file, parse_window, create_logs_view, format_window
+from query_profile import QueryProfiler, default_profile_path, enable_profiling
 
-def get_parquet_file():
-    # Hardcoded for this specific task based on directory listing
-    return "logs/eve_merged_2026-01-20_to_2026-01-30.parquet"
+# Per-query profiles for --profile (query_profile.py)
+QUERY_PROFILES = QueryProfiler()
+
+# Read when no path is given: every Parquet file j2p.py wrote there
+DEFAULT_LOGS_DIR = "logs"
 
 def run_query(con, query):
+    start = time.perf_counter()
     try:
-        return con.sql(query).fetchall()
+        rows = con.sql(query).fetchall()
     except Exception as e:
         print(f"Query Error: {e}")
+        QUERY_PROFILES.record(query, {}, 0, time.perf_counter() - start, error=str(e))
         return []
+    if QUERY_PROFILES.enabled:
+        profile = orjson.loads(con.get_profiling_information(format="json"))
+        QUERY_PROFILES.record(query, profile, len(rows), time.perf_counter() - start)
+    return rows
 
 def analyze_alerts(con, columns):
     print("Checking for Alerts...")
@@ -74,27 +88,31 @@ def analyze_suspicious_dns(con):
             output += f"- {r[1]} (Length: {r[2]}, Count: {r[3]}, Source: {r[0]})\n"
     return output
 
-def analyze_unusual_ports(con):
+def analyze_unusual_ports(con, columns):
     print("Checking for Unusual Outbound Traffic...")
-    # Traffic to public IPs on non-standard ports
-    query = """
+    # Traffic to public IPs on non-standard ports. Use the ingest-time flag
+    # when the file has one, otherwise classify the address string.
+    if 'dest_private' in columns:
+        dest_private = "coalesce(dest_private, false)"
+    else:
+        dest_private = private_ip_sql("dest_ip")
+    # Parts written before app_proto was recorded lack the column
+    app_proto = "app_proto" if 'app_proto' in columns else "CAST(NULL AS VARCHAR) as app_proto"
+
+    query = f"""
     SELECT 
         src_ip, 
         dest_ip, 
         dest_port, 
         proto, 
-        app_proto,
+        {app_proto},
         count(*) as count
     FROM logs
     WHERE event_type = 'flow'
       AND dest_ip IS NOT NULL
       AND src_ip IS NOT NULL
       -- Exclude Private IPs (RFC 1918)
-      AND NOT (
-        dest_ip LIKE '10.%'
-        OR dest_ip LIKE '192.168.%'
-        OR (dest_ip LIKE '172.%' AND try_cast(split_part(dest_ip, '.', 2) as INTEGER) BETWEEN 16 AND 31)
-      )
+      AND NOT {dest_private}
       -- Exclude Common Ports
       AND dest_port NOT IN (80, 443, 53, 123, 22, 8080)
     GROUP BY src_ip, dest_ip, dest_port, proto, app_proto
@@ -115,30 +133,61 @@ def analyze_unusual_ports(con):
     return output
 
 def main():
-    parquet_file = get_parquet_file()
+    args, options = parse_args(sys.argv[1:], WINDOW_OPTIONS)
+    # --profile[=PATH]: per-query profiles to a sidecar and a report appendix
+    profile_path = options.get("profile")
+    try:
+        window = parse_window(options)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    parquet_file = get_parquet_file(args or [DEFAULT_LOGS_DIR])
+    if not parquet_file:
+        print("Usage: python analyze_malware.py [parquet_file_or_logs_dir_or_dataset_dir] [--from=DATE_OR_TIME] [--to=DATE_OR_TIME] [--last=DURATION] [--profile[=PATH]]")
+        print("Error: No .parquet file found in provided path.")
+        sys.exit(1)
     print(f"Analyzing {parquet_file}...")
     
     con = duckdb.connect(database=':memory:')
     try:
-        con.execute(f"CREATE VIEW logs AS SELECT * FROM read_parquet('{parquet_file}')")
+        files = create_logs_view(con, parquet_file, window)
     except Exception as e:
         print(f"Error loading parquet: {e}")
         return
+    if window is not None:
+        print(f"Window {format_window(window)}: reading {len(files)} files")
+        if not files:
+            print("Error: No Parquet files hold events in the window.")
+            sys.exit(1)
+    if profile_path:
+        enable_profiling(con)
+        QUERY_PROFILES.enabled = True
 
     # Get columns
     cols_info = con.execute("DESCRIBE logs").fetchall()
     columns = [c[0] for c in cols_info]
 
     report_name = f"malware_analysis_results-{datetime.datetime.now().strftime('%y-%m-%d-%H-%M')}.md"
+    if profile_path is True:
+        profile_path = default_profile_path(report_name)
     
     with open(report_name, 'w') as f:
         f.write("# Malware Analysis Report\n\n")
-        f.write(analyze_alerts(con, columns))
+        with QUERY_PROFILES.section("Suricata Alerts"):
+            f.write(analyze_alerts(con, columns))
         f.write("\n---\n\n")
-        f.write(analyze_suspicious_dns(con))
+        with QUERY_PROFILES.section("Suspicious DNS"):
+            f.write(analyze_suspicious_dns(con))
         f.write("\n---\n\n")
-        f.write(analyze_unusual_ports(con))
+        with QUERY_PROFILES.section("Unusual Outbound Traffic"):
+            f.write(analyze_unusual_ports(con, columns))
+        if profile_path:
+            f.write("\n---\n\n")
+            f.write(QUERY_PROFILES.format_appendix(profile_path))
     
+    if profile_path:
+        QUERY_PROFILES.save(profile_path, report=report_name, source=parquet_file)
+        print(f"Query profiles written to {profile_path}")
     print(f"Analysis complete. Report written to {report_name}")
 
 if __name__ == "__main__":
@@ -1,95 +1,70 @@
 import sys
-import orjson
+import os
 from collections import defaultdict
+from classify import cache_option
+from cli import parse_args
+from eve_engine import Detector, run
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python analyze_windows_dns.py <log_file>")
-        sys.exit(1)
+class WindowsDns(Detector):
+    event_types = {"dns"}
 
-    log_file = sys.argv[1]
-    
-    # Domains strongly associated with Windows OS background services and telemetry
-    windows_indicators = [
-        "time.windows.com",
-        "msftncsi.com",
-        "msftconnecttest.com",
-        "windowsupdate.com",
-        "update.microsoft.com",
-        "mp.microsoft.com", 
-        "wdcp.microsoft.com", # Windows Defender
-        "wdcpalt.microsoft.com",
-        "displaycatalog.mp.microsoft.com",
-        "sls.update.microsoft.com",
-        "ctldl.windowsupdate.com",
-        "download.windowsupdate.com",
-        "tlu.dl.delivery.mp.microsoft.com",
-        "settings-win.data.microsoft.com",
-        "v10.events.data.microsoft.com",
-        "watson.telemetry.microsoft.com",
-        "login.live.com",
-        "_msdcs", 
-        "_ldap._tcp",
-        "_kerberos._tcp"
-    ]
+    def __init__(self, source, labels):
+        self.source = source
+        self.labels = labels
 
-    detected_systems = defaultdict(set)
-    processed_lines = 0
+    def init(self):
+        return defaultdict(set)
 
-    try:
-        with open(log_file, 'rb') as f:
-            for line in f:
-                processed_lines += 1
-                try:
-                    event = orjson.loads(line)
-                except orjson.JSONDecodeError:
-                    continue
+    def update(self, detected_systems, event):
+        dns = event.get('dns', {})
 
-                if event.get('event_type') != 'dns':
-                    continue
+        queries_list = dns.get('queries', [])
+        # Also check if rrname is directly in dns (older formats)
+        if 'rrname' in dns:
+             queries_list.append({'rrname': dns['rrname']})
 
-                dns = event.get('dns', {})
-                
-                queries_list = dns.get('queries', [])
-                # Also check if rrname is directly in dns (older formats)
-                if 'rrname' in dns:
-                     queries_list.append({'rrname': dns['rrname']})
+        for query_obj in queries_list:
+            rrname = query_obj.get('rrname', '').lower()
 
-                for query_obj in queries_list:
-                    rrname = query_obj.get('rrname', '').lower()
-                    
-                    is_windows = False
-                    for indicator in windows_indicators:
-                        if indicator in rrname:
-                            is_windows = True
-                            break
-                    
-                    if is_windows:
-                        src_ip = event.get('src_ip')
-                        if src_ip:
-                            detected_systems[src_ip].add(rrname)
+            if self.labels.get(rrname).windows:
+                src_ip = event.get('src_ip')
+                if src_ip:
+                    detected_systems[src_ip].add(rrname)
 
-    except FileNotFoundError:
-        print(f"Error: File {log_file} not found.")
+    def merge(self, detected_systems, other):
+        for ip, queries in other.items():
+            detected_systems[ip] |= queries
+        return detected_systems
+
+    def finalize(self, detected_systems, totals):
+        print(f"Analysis of {self.source}")
+        print(f"Lines processed: {totals['lines']}")
+        print(f"Potential Windows Systems Identified: {len(detected_systems)}")
+        print("-" * 40)
+
+        for ip, queries in detected_systems.items():
+            print(f"Source IP: {ip}")
+            print(f"  Unique Windows-related Queries ({len(queries)}):")
+            sorted_queries = sorted(list(queries))
+            for q in sorted_queries[:15]:
+                print(f"    - {q}")
+            if len(sorted_queries) > 15:
+                print(f"    - ... and {len(sorted_queries) - 15} more")
+            print()
+
+def main():
+    args, options = parse_args(sys.argv[1:])
+    labels = cache_option(options)
+    if not args:
+        print("Usage: python analyze_windows_dns.py <log_file> [--label-cache[=PATH]]")
         sys.exit(1)
-    except Exception as e:
-        print(f"An error occurred: {e}")
+
+    log_file = args[0]
+    if not os.path.isfile(log_file):
+        print(f"Error: File {log_file} not found.")
         sys.exit(1)
 
-    print(f"Analysis of {log_file}")
-    print(f"Lines processed: {processed_lines}")
-    print(f"Potential Windows Systems Identified: {len(detected_systems)}")
-    print("-" * 40)
-    
-    for ip, queries in detected_systems.items():
-        print(f"Source IP: {ip}")
-        print(f"  Unique Windows-related Queries ({len(queries)}):")
-        sorted_queries = sorted(list(queries))
-        for q in sorted_queries[:15]:
-            print(f"    - {q}")
-        if len(sorted_queries) > 15:
-            print(f"    - ... and {len(sorted_queries) - 15} more")
-        print()
+    run([WindowsDns(log_file, labels)], [log_file], labels=labels)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,141 @@
+import numpy as np
+
+# Periodicity scores for flow series, the signature of C2 beaconing: an
+# implant calling home every N seconds, give or take some jitter. The input
+# is one array of series ids and one of event times (epoch seconds), sorted
+# by id and then time, e.g. one series per (src_ip, dest_ip, dest_port). All
+# series are scored together with NumPy: runs are found from where the id
+# changes and reduced with np.*.reduceat, medians come from one argsort, and
+# the spectra are computed in batches of equal-length rows.
+#
+# Per series:
+#   intervals    gaps between consecutive flows of at least MIN_INTERVAL;
+#                shorter ones are bursts of parallel connections
+#   median       median interval (seconds)
+#   jitter       median absolute deviation of the intervals / median
+#   regularity   share of intervals within TOLERANCE of the median
+#   period       period of the strongest frequency in the flow counts,
+#                binned at BINS_PER_INTERVAL bins per median interval over
+#                the series' span, or its first MAX_BINS bins (seconds)
+#   periodicity  share of the spectrum's power at that frequency and its
+#                harmonics, above what a flat spectrum would put there
+#   score        mean of regularity, 1 - jitter (floored at 0) and periodicity
+
+# Series with fewer intervals are not scored
+MIN_INTERVALS = 8
+MIN_INTERVAL = 1.0
+TOLERANCE = 0.1
+# Bins per series for the spectrum: BINS_PER_INTERVAL per median interval,
+# rounded up to a power of two within [MIN_BINS, MAX_BINS]. Fewer bins per
+# interval than 2 alias the beacon's frequency.
+BINS_PER_INTERVAL = 4
+MIN_BINS = 64
+MAX_BINS = 1 << 16
+# Fewer cycles over the whole span are not a period
+MIN_CYCLES = 4
+# Bins transformed per rfft call
+FFT_BATCH = 1 << 22
+
+
+def runs(keys):
+    # Sorted keys -> (start, length) of each run of equal keys
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return starts, np.diff(np.r_[starts, len(keys)])
+
+
+def run_medians(values, starts, counts):
+    # Median of non-negative values over each run. One argsort: each value
+    # is scaled into [0, 0.5] of its run's maximum and offset by the run's
+    # number, which orders runs first and values within them.
+    if len(starts) == 0:
+        return np.zeros(0)
+    top = np.repeat(np.maximum.reduceat(values, starts), counts)
+    run = np.repeat(np.arange(len(starts)), counts)
+    order = np.argsort(run + np.divide(values, 2 * top, out=np.zeros(len(values)), where=top > 0))
+    ordered = values[order]
+    return (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+
+
+def gather(starts, counts):
+    # Indices of the runs, concatenated
+    total = int(counts.sum())
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(total)
+
+
+def interval_scores(series, times):
+    # -> (series id, intervals, median, jitter, regularity) per series with
+    # at least MIN_INTERVALS intervals
+    gaps = np.diff(times)
+    keep = (series[1:] == series[:-1]) & (gaps >= MIN_INTERVAL)
+    keys, gaps = series[1:][keep], gaps[keep]
+    starts, counts = runs(keys)
+    enough = counts >= MIN_INTERVALS
+    keep = np.repeat(enough, counts)
+    keys, gaps = keys[keep], gaps[keep]
+    starts, counts = runs(keys)
+    medians = run_medians(gaps, starts, counts)
+    deviations = np.abs(gaps - np.repeat(medians, counts))
+    jitter = run_medians(deviations, starts, counts) / medians
+    within = (deviations <= TOLERANCE * np.repeat(medians, counts)).astype(np.float64)
+    regularity = np.add.reduceat(within, starts) / counts if len(starts) else np.zeros(0)
+    return keys[starts], counts, medians, jitter, regularity
+
+
+def spectral_scores(times, starts, counts, medians):
+    # -> (period, periodicity) of the series at starts/counts in times
+    first = times[starts]
+    span = np.minimum(times[starts + counts - 1] - first, MAX_BINS * medians / BINS_PER_INTERVAL)
+    wanted = np.maximum(span / medians * BINS_PER_INTERVAL, 1)
+    bins = np.clip(2 ** np.ceil(np.log2(wanted)), MIN_BINS, MAX_BINS).astype(np.int64)
+    period = np.full(len(starts), np.nan)
+    periodicity = np.zeros(len(starts))
+    for size in np.unique(bins):
+        members = np.flatnonzero((bins == size) & (span > 0))
+        frequencies = size // 2 + 1
+        harmonic_index = np.arange(1, frequencies)
+        batch = max(1, FFT_BATCH // size)
+        for chunk in range(0, len(members), batch):
+            rows = members[chunk:chunk + batch]
+            events = gather(starts[rows], counts[rows])
+            row = np.repeat(np.arange(len(rows)), counts[rows])
+            position = (times[events] - first[rows][row]) / span[rows][row]
+            # Flows after a shortened span are left out
+            inside = position <= 1
+            slot = np.minimum((position[inside] * size).astype(np.int64), size - 1)
+            binned = np.bincount(row[inside] * size + slot, minlength=len(rows) * size).reshape(len(rows), size)
+            power = np.abs(np.fft.rfft(binned, axis=1)[:, 1:]) ** 2
+            # Strongest frequency with at least MIN_CYCLES cycles over the span
+            k = np.argmax(power[:, MIN_CYCLES - 1:], axis=1) + MIN_CYCLES
+            harmonics = harmonic_index[None, :] % k[:, None] == 0
+            total = power.sum(axis=1)
+            share = np.divide((power * harmonics).sum(axis=1), total, out=np.zeros(len(rows)), where=total > 0)
+            chance = harmonics.sum(axis=1) / (frequencies - 1)
+            period[rows] = span[rows] / k
+            periodicity[rows] = np.clip((share - chance) / (1 - chance), 0, 1)
+    return period, periodicity
+
+
+def score_series(series, times):
+    # series: integer ids, times: epoch seconds, both sorted by (id, time)
+    # -> dict of arrays, one entry per scored series
+    series = np.asarray(series, dtype=np.int64)
+    times = np.asarray(times, dtype=np.float64)
+    ids, intervals, median, jitter, regularity = interval_scores(series, times)
+    starts, counts = runs(series)
+    scored = np.isin(series[starts], ids)
+    period, periodicity = spectral_scores(times, starts[scored], counts[scored], median)
+    score = (regularity + np.maximum(1 - jitter, 0) + periodicity) / 3
+    return {
+        "series": ids,
+        "flows": counts[scored],
+        "intervals": intervals,
+        "median": median,
+        "jitter": jitter,
+        "regularity": regularity,
+        "period": period,
+        "periodicity": periodicity,
+        "score": score,
+    }
@@ -0,0 +1,254 @@
+import io
+import os
+import sys
+import time
+import shutil
+import hashlib
+import platform
+import datetime
+import subprocess
+import contextlib
+import duckdb
+import orjson
+import j2p
+import duck_hunt
+from rollup import build_rollups
+from classify import LabelCache
+from eve_engine import scan_detectors
+from cli import parse_args
+from gen_eve import DEFAULTS, generate, generator_params
+from analyze_cloud import CloudDestinations
+from analyze_windows_dns import WindowsDns
+from explore_dns import DnsExplorer
+from extract_dns import DnsServers
+from extract_sni import UniqueSnis
+from find_iot import IotDevices
+from find_linux_hosts import LinuxHosts
+from profile_host import HostProfile
+
+# Benchmark suite over synthetic EVE data (gen_eve.py) at several sizes:
+#
+#   orjson/<hunt>         each orjson hunt alone, and orjson/all for every
+#                         hunt in one pass (hunt_all.py)
+#   j2p/merged            JSON -> one Parquet file
+#   j2p/partitioned       JSON -> event_type/date dataset
+#   rollup/build          daily rollups from the merged file (rollup.py)
+#   duckdb/<mode>/setup   duck_hunt slices and value labels, then
+#   duckdb/<mode>/<name>  each report section, for the per-analysis (views),
+#                         fused and rollups modes
+#
+# Each measurement is the best of --repeat runs. Results are appended to a
+# JSONL history, one record per measurement with the commit, the machine
+# and the generator parameters, and each is compared with the last run of
+# the same benchmark on the same parameters and machine, so regressions
+# show up as the change column.
+
+DEFAULT_SIZES = [10000, 100000]
+DEFAULT_HISTORY = "bench_history.jsonl"
+DEFAULT_WORK_DIR = "bench_data"
+SUITES = ["orjson", "j2p", "duckdb"]
+# Slowdown flagged as a regression
+DEFAULT_THRESHOLD = 0.2
+# Host profiled by orjson/profile_host: the busiest generated host
+PROFILE_HOST = "192.168.1.2"
+# bench.py's own options that take a value; gen_eve.py's are added in main()
+VALUE_OPTIONS = {"sizes", "repeat", "suites", "history", "work", "threshold"}
+
+
+def best_of(repeat, fn):
+    # -> (best seconds, last result)
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def quiet(fn, *args, **kwargs):
+    # The scripts report progress on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def dataset_file(work_dir, params):
+    # Generated once per parameter set and reused
+    key = hashlib.sha256(orjson.dumps(params, option=orjson.OPT_SORT_KEYS)).hexdigest()[:12]
+    size_dir = os.path.join(work_dir, f"eve_{params['events']}_{key}")
+    path = os.path.join(size_dir, "eve.json")
+    if not os.path.exists(path):
+        os.makedirs(size_dir, exist_ok=True)
+        print(f"Generating {params['events']} events into {path}...")
+        generate(path + ".tmp", params)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def orjson_hunts(path, labels):
+    hunts = [
+        ("extract_sni", [UniqueSnis()]),
+        ("analyze_windows_dns", [WindowsDns(path, labels)]),
+        ("explore_dns", [DnsExplorer(path)]),
+        ("analyze_cloud", [CloudDestinations(labels)]),
+        ("find_iot", [IotDevices(labels)]),
+        ("find_linux_hosts", [LinuxHosts(labels)]),
+        ("profile_host", [HostProfile(PROFILE_HOST)]),
+        ("extract_dns", [DnsServers()]),
+    ]
+    hunts.append(("all", [d for _, detectors in hunts for d in detectors]))
+    return hunts
+
+
+def bench_orjson(path, repeat):
+    results = {}
+    for name, _ in orjson_hunts(path, LabelCache()):
+        def scan_hunt():
+            # Fresh detectors and label cache per run: classification is part of the cost
+            detectors = dict(orjson_hunts(path, LabelCache()))[name]
+            return scan_detectors(detectors, [path])
+        results[f"orjson/{name}"], _ = best_of(repeat, scan_hunt)
+    return results
+
+
+def bench_j2p(path, repeat):
+    # -> (results, merged Parquet file)
+    results = {}
+    base = os.path.dirname(path)
+    out_dir = os.path.join(base, "j2p")
+
+    def merged():
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(out_dir)
+        return quiet(j2p.convert_merged, [path], out_dir, False)
+
+    def partitioned():
+        dataset_dir = os.path.join(base, "j2p_dataset")
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        quiet(j2p.convert_dataset, [path], dataset_dir, True, False, complete=True)
+
+    results["j2p/partitioned"], _ = best_of(repeat, partitioned)
+    results["j2p/merged"], parquet_file = best_of(repeat, merged)
+    return results, parquet_file
+
+
+def duckdb_con(parquet_file, mode):
+    # duck_hunt's setup for one mode -> (con, duck_hunt.setup_hunt result)
+    con = duckdb.connect(database=':memory:')
+    rollup_dir = duck_hunt.default_rollup_dir(parquet_file) if mode == "rollups" else None
+    hunt = quiet(duck_hunt.setup_hunt, con, parquet_file, LabelCache(), mode == "fused", rollup_dir)
+    return con, hunt
+
+
+def bench_duckdb(parquet_file, repeat):
+    results = {}
+    results["rollup/build"], _ = best_of(repeat, lambda: quiet(
+        build_rollups, parquet_file, duck_hunt.default_rollup_dir(parquet_file), rebuild=True))
+    for mode in ["views", "fused", "rollups"]:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            con, hunt = duckdb_con(parquet_file, mode)
+            timings = {f"duckdb/{mode}/setup": time.perf_counter() - start}
+            sections = duck_hunt.report_sections(hunt["has_http"], hunt["has_dns"], hunt["has_tls"], hunt["beacons"],
+                                                 mode == "rollups")
+            for _, stats in quiet(duck_hunt.run_sections, con, sections):
+                if stats is not None:
+                    timings[f"duckdb/{mode}/{stats['name']}"] = stats["wall_time"]
+            con.close()
+            for name, seconds in timings.items():
+                results[name] = min(seconds, results.get(name, seconds))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def machine():
+    return {"system": platform.system(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "python": platform.python_version(), "duckdb": duckdb.__version__}
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        return [orjson.loads(line) for line in f if line.strip()]
+
+
+def comparable(record):
+    return (record["benchmark"], record["events"],
+            orjson.dumps(record["params"], option=orjson.OPT_SORT_KEYS), orjson.dumps(record["machine"], option=orjson.OPT_SORT_KEYS))
+
+
+def main():
+    args, options = parse_args(sys.argv[1:], VALUE_OPTIONS | DEFAULTS.keys())
+    if args or options.get("help"):
+        print("Usage: python bench.py [--sizes=10000,100000] [--repeat=3] [--suites=orjson,j2p,duckdb]")
+        print("       [--history=bench_history.jsonl] [--work=bench_data] [--threshold=0.2] [gen_eve.py options]")
+        sys.exit(1)
+    sizes = [int(s) for s in str(options.get("sizes", ",".join(map(str, DEFAULT_SIZES)))).split(",")]
+    repeat = int(options.get("repeat", 3))
+    suites = str(options.get("suites", ",".join(SUITES))).split(",")
+    history_path = options.get("history", DEFAULT_HISTORY)
+    work_dir = options.get("work", DEFAULT_WORK_DIR)
+    threshold = float(options.get("threshold", DEFAULT_THRESHOLD))
+    base_params = generator_params({k: v for k, v in options.items() if k in DEFAULTS and k != "events"})
+
+    history = load_history(history_path)
+    previous = {}
+    for record in history:
+        previous[comparable(record)] = record
+
+    run = {"time": datetime.datetime.now().isoformat(timespec="seconds"), "commit": git_commit(), "machine": machine()}
+    shared_params = {k: v for k, v in base_params.items() if k != "events"}
+    records = []
+    for size in sizes:
+        params = dict(base_params, events=size)
+        path = dataset_file(work_dir, params)
+        results = {}
+        if "orjson" in suites:
+            print(f"[{size}] orjson hunts...")
+            results.update(bench_orjson(path, repeat))
+        if "j2p" in suites or "duckdb" in suites:
+            print(f"[{size}] j2p conversion...")
+            j2p_results, parquet_file = bench_j2p(path, repeat if "j2p" in suites else 1)
+            if "j2p" in suites:
+                results.update(j2p_results)
+            if "duckdb" in suites:
+                print(f"[{size}] rollups and duck_hunt sections...")
+                results.update(bench_duckdb(parquet_file, repeat))
+        for name, seconds in results.items():
+            records.append(dict(run, benchmark=name, events=size, bytes=os.path.getsize(path),
+                                params=shared_params, seconds=round(seconds, 6), repeat=repeat))
+
+    with open(history_path, 'ab') as f:
+        for record in records:
+            f.write(orjson.dumps(record) + b"\n")
+
+    regressions = 0
+    print(f"\n{'benchmark':<42} {'events':>8} {'seconds':>9} {'events/s':>11} {'previous':>9} {'change':>8}")
+    for record in records:
+        before = previous.get(comparable(record))
+        change = ""
+        if before is not None and before["seconds"] > 0:
+            ratio = record["seconds"] / before["seconds"] - 1
+            change = f"{ratio:+.0%}"
+            if ratio > threshold:
+                change += " !"
+                regressions += 1
+        rate = record["events"] / record["seconds"] if record["seconds"] else 0
+        prev = f"{before['seconds']:.3f}" if before is not None else "-"
+        print(f"{record['benchmark']:<42} {record['events']:>8} {record['seconds']:>9.3f} {rate:>11.0f} {prev:>9} {change:>8}")
+    print(f"\nAppended {len(records)} results to {history_path}")
+    if regressions:
+        print(f"{regressions} benchmarks slower than the previous run by more than {threshold:.0%} (marked !)")
+
+
+if __name__ == "__main__":
+    main()
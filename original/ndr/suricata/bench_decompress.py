@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import eve_reader
+from classify import LabelCache
+from eve_engine import scan_detectors
+from eve_reader import EveStream, detect_compression, find_tool
+from analyze_cloud import CloudDestinations
+from analyze_windows_dns import WindowsDns
+from explore_dns import DnsExplorer
+from extract_sni import UniqueSnis
+from find_iot import IotDevices
+from find_linux_hosts import LinuxHosts
+
+# Compares, for compressed EVE logs, decompressing to disk and then scanning
+# the plain file against scanning the compressed file as a stream
+# (eve_reader.EveStream), with the external tool and in-process. The scan
+# runs the type-filtered hunts of hunt_all.py.
+
+
+def detectors(path, labels):
+    return [
+        CloudDestinations(labels),
+        WindowsDns(path, labels),
+        DnsExplorer(path),
+        UniqueSnis(),
+        IotDevices(labels),
+        LinuxHosts(labels),
+    ]
+
+
+def decompress_only(path, compression, tool):
+    size = 0
+    with EveStream(path, compression, tool=tool) as stream:
+        for chunk in stream.chunks():
+            size += len(chunk)
+    return size
+
+
+def decompress_to_disk(path, compression, tool, directory):
+    fd, target = tempfile.mkstemp(suffix=".json", dir=directory)
+    with os.fdopen(fd, 'wb') as out, EveStream(path, compression, tool=tool) as stream:
+        shutil.copyfileobj(stream, out, eve_reader.CHUNK_BYTES)
+    return target
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python bench_decompress.py <compressed_log> [...]")
+        sys.exit(1)
+
+    labels = LabelCache()
+    print(f"{'file':<28} {'backend':<18} {'decompress':>10} {'MB/s':>7} {'to disk+scan':>13} {'stream scan':>12}")
+    for path in sys.argv[1:]:
+        compression = detect_compression(path)
+        if compression is None:
+            print(f"{path}: not compressed, skipped")
+            continue
+        backends = [(False, f"{compression} module")]
+        command = find_tool(compression)
+        if command is not None:
+            backends.insert(0, (True, command[0]))
+
+        for tool, name in backends:
+            try:
+                elapsed, size = timed(lambda: decompress_only(path, compression, tool))
+            except RuntimeError as e:
+                print(f"{os.path.basename(path):<28} {name:<18} {e}")
+                continue
+
+            # Decompress to a file beside the input, then scan it
+            start = time.perf_counter()
+            plain = decompress_to_disk(path, compression, tool, os.path.dirname(path) or ".")
+            try:
+                scan_detectors(detectors(plain, labels), [plain])
+            finally:
+                os.remove(plain)
+            to_disk = time.perf_counter() - start
+
+            eve_reader.USE_TOOLS = tool
+            try:
+                stream, _ = timed(lambda: scan_detectors(detectors(path, labels), [path]))
+            finally:
+                eve_reader.USE_TOOLS = True
+
+            mb = size / (1024**2)
+            print(f"{os.path.basename(path):<28} {name:<18} {elapsed:>9.2f}s {mb / elapsed:>7.1f} "
+                  f"{to_disk:>12.2f}s {stream:>11.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import sys
+import re
+import time
+import orjson
+import duckdb
+from eve_scan import iter_lines
+from multimatch import KeywordMatcher, register_duckdb_matcher, sql_match
+from indicators import CLOUD_KEYWORDS, IOT_KEYWORDS, WINDOWS_INDICATORS
+
+# Compares keyword matching strategies on the domain/UA strings of an EVE
+# log: the per-keyword `in` loop the orjson scripts used, KeywordMatcher,
+# and in DuckDB the ILIKE OR chain duck_hunt.py used, a flat RE2
+# alternation, the matcher's trie pattern (sql_match) and the
+# KeywordMatcher UDF.
+
+KEYWORD_SETS = {"cloud": CLOUD_KEYWORDS, "iot": IOT_KEYWORDS, "windows": WINDOWS_INDICATORS}
+
+
+def load_strings(log_file, limit):
+    strings = []
+    for line in iter_lines(log_file):
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        for query in (record.get('dns') or {}).get('queries') or []:
+            strings.append(query.get('rrname'))
+        tls = record.get('tls') or {}
+        strings += [tls.get('sni'), tls.get('subject')]
+        http = record.get('http') or {}
+        strings += [http.get('hostname'), http.get('http_user_agent')]
+        if limit and len(strings) >= limit:
+            break
+    return [s for s in strings if s]
+
+
+def ilike_chain(column, keywords):
+    conditions = [f"{column} ILIKE '%{k}%'" for k in keywords]
+    return f"({' OR '.join(conditions)})"
+
+
+def timed(fn, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def any_loop(strings, keywords):
+    count = 0
+    for s in strings:
+        s = s.lower()
+        if any(k in s for k in keywords):
+            count += 1
+    return count
+
+
+def matcher_loop(strings, matcher):
+    return sum(1 for s in strings if matcher.matches(s))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python bench_keywords.py <eve.json> [max_strings]")
+        sys.exit(1)
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    strings = load_strings(sys.argv[1], limit)
+    distinct = len(set(strings))
+    print(f"Strings: {len(strings)} ({distinct} distinct)\n")
+
+    con = duckdb.connect()
+    con.execute("CREATE TABLE strings AS SELECT unnest(?) as s", [strings])
+
+    print(f"{'set':<8} {'keywords':>8}  {'method':<22} {'time':>10} {'per string':>12} {'matches':>8}")
+    for name, keywords in KEYWORD_SETS.items():
+        build_start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        build_time = time.perf_counter() - build_start
+        register_duckdb_matcher(con, f"kw_{name}", matcher)
+        lowered = [k.lower() for k in keywords]
+        alternation = "|".join(re.escape(k) for k in lowered).replace("'", "''")
+
+        methods = [
+            ("python any(in)", lambda: any_loop(strings, lowered)),
+            ("KeywordMatcher", lambda: matcher_loop(strings, matcher)),
+            ("duckdb ILIKE chain", lambda: con.execute(
+                f"SELECT count(*) FROM strings WHERE {ilike_chain('s', keywords)}").fetchone()[0]),
+            ("duckdb RE2 alternation", lambda: con.execute(
+                f"SELECT count(*) FROM strings WHERE regexp_matches(lower(s), '{alternation}')").fetchone()[0]),
+            ("duckdb RE2 trie", lambda: con.execute(
+                f"SELECT count(*) FROM strings WHERE {sql_match('s', matcher)}").fetchone()[0]),
+            ("duckdb KeywordMatcher", lambda: con.execute(
+                f"SELECT count(*) FROM strings WHERE kw_{name}(s) IS NOT NULL").fetchone()[0]),
+        ]
+        print(f"{name:<8} {len(keywords):>8}  {'(matcher build)':<22} {build_time * 1000:>8.2f}ms")
+        for label, fn in methods:
+            elapsed, matches = timed(fn)
+            per = elapsed / len(strings) * 1e9 if strings else 0
+            print(f"{name:<8} {len(keywords):>8}  {label:<22} {elapsed * 1000:>8.1f}ms {per:>9.0f}ns {matches:>8}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
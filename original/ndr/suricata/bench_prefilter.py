@@ -0,0 +1,115 @@
+import sys
+import time
+import orjson
+from classify import LabelCache
+from eve_engine import scan_detectors
+from eve_scan import iter_lines
+from prefilter import LinePrefilter
+from analyze_cloud import CloudDestinations
+from analyze_windows_dns import WindowsDns
+from explore_dns import DnsExplorer
+from extract_dns import DnsServers
+from extract_sni import UniqueSnis
+from find_iot import IotDevices
+from find_linux_hosts import LinuxHosts
+from profile_host import HostProfile
+
+# Times each orjson hunt over an EVE log with and without the byte prefilter
+# (prefilter.py) and checks that nothing is lost: the detector states must be
+# identical, and every line the filter rejects is decoded and checked against
+# the detectors' event_types and needles (a hit is a false negative). The
+# skipped column is what the scan skipped; it stops filtering a range once
+# most lines are wanted (eve_engine.MAX_CANDIDATE_RATIO).
+
+
+def record_strings(value, out):
+    # Every key and string value in a decoded record
+    if isinstance(value, str):
+        out.add(value)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            out.add(key)
+            record_strings(item, out)
+    elif isinstance(value, list):
+        for item in value:
+            record_strings(item, out)
+    return out
+
+
+def false_negatives(path, detectors):
+    line_filter = LinePrefilter(detectors)
+    if not line_filter.active:
+        return 0
+    missed = 0
+    for line in iter_lines(path):
+        if line_filter.wants(line):
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        if not isinstance(record, dict):
+            continue
+        strings = None
+        for d in detectors:
+            if d.event_types is not None and record.get("event_type") not in d.event_types:
+                continue
+            if d.needles is not None:
+                if strings is None:
+                    strings = record_strings(record, set())
+                if not any(n[1:-1].decode() in strings for n in d.needles):
+                    continue
+            missed += 1
+            print(f"  false negative: {line[:120]!r}")
+            break
+    return missed
+
+
+def timed(detectors, path, prefilter, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        totals, states = scan_detectors(detectors, [path], prefilter=prefilter)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, totals, states
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python bench_prefilter.py <eve.json> [host_ip]")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    host = sys.argv[2] if len(sys.argv) > 2 else "192.168.1.20"
+    labels = LabelCache()
+    hunts = [
+        ("extract_sni", [UniqueSnis()]),
+        ("analyze_windows_dns", [WindowsDns(path, labels)]),
+        ("explore_dns", [DnsExplorer(path)]),
+        ("analyze_cloud", [CloudDestinations(labels)]),
+        ("find_iot", [IotDevices(labels)]),
+        ("find_linux_hosts", [LinuxHosts(labels)]),
+        ("profile_host", [HostProfile(host)]),
+        ("extract_dns", [DnsServers()]),
+    ]
+    hunts.append(("all", [d for _, detectors in hunts for d in detectors]))
+
+    failures = 0
+    print(f"{'hunt':<20} {'full':>8} {'filtered':>9} {'speedup':>8} {'skipped':>9} {'missed':>7}  states")
+    for name, detectors in hunts:
+        full, _, full_states = timed(detectors, path, False)
+        filtered, totals, filtered_states = timed(detectors, path, True)
+        missed = false_negatives(path, detectors)
+        same = full_states == filtered_states
+        if missed or not same:
+            failures += 1
+        print(f"{name:<20} {full:>7.2f}s {filtered:>8.2f}s {full / filtered:>7.1f}x "
+              f"{totals['skipped']:>9} {missed:>7}  {'same' if same else 'DIFFERENT'}")
+
+    if failures:
+        print(f"\n{failures} hunts failed verification")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
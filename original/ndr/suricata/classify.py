@@ -0,0 +1,150 @@
+import os
+import re
+import hashlib
+import orjson
+from collections import OrderedDict, namedtuple
+from multimatch import KeywordMatcher
+from domain_index import SuffixSet
+import indicators
+
+# Classifies a domain / SNI / hostname / user-agent string once for every
+# category and remembers the result, so the per-event cost of the hunts is a
+# dict lookup. Distinct values are few (thousands) compared to events
+# (millions).
+#
+# LabelCache is a bounded LRU keyed by the raw value. With a path it is
+# loaded from and saved to an orjson file; the file is ignored when the
+# indicator lists have changed since it was written.
+
+Labels = namedtuple("Labels", ["cloud", "iot", "windows", "linux_domain", "linux_ua"])
+
+# iot is the first matching IOT_KEYWORDS entry (or None); the rest are bools
+EMPTY_LABELS = Labels(False, None, False, False, False)
+
+DEFAULT_MAX_ENTRIES = 200_000
+# Cache file used by --label-cache without a path
+DEFAULT_LABEL_CACHE = "label_cache.json"
+
+CLOUD_MATCHER = KeywordMatcher(indicators.CLOUD_KEYWORDS)
+IOT_MATCHER = KeywordMatcher(indicators.IOT_KEYWORDS)
+WINDOWS_MATCHER = KeywordMatcher(indicators.WINDOWS_INDICATORS)
+LINUX_DOMAINS = SuffixSet(indicators.LINUX_DOMAINS)
+LINUX_UA = re.compile(indicators.LINUX_UA_REGEX, re.IGNORECASE)
+
+
+def indicators_version():
+    # Changes whenever an indicator list or pattern changes
+    parts = [
+        indicators.CLOUD_KEYWORDS, indicators.IOT_KEYWORDS, indicators.WINDOWS_INDICATORS,
+        indicators.LINUX_DOMAINS, indicators.LINUX_UA_REGEX, Labels._fields,
+    ]
+    return hashlib.sha1(orjson.dumps(parts)).hexdigest()[:16]
+
+
+def classify_value(value):
+    if not value:
+        return EMPTY_LABELS
+    return Labels(
+        CLOUD_MATCHER.matches(value),
+        IOT_MATCHER.first(value),
+        WINDOWS_MATCHER.matches(value),
+        LINUX_DOMAINS.match(value) is not None,
+        LINUX_UA.search(value) is not None,
+    )
+
+
+class LabelCache:
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.labels = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Values classified since the last drain_new(), when tracked
+        self.new = None
+        if path:
+            self.load()
+
+    def get(self, value):
+        if not value:
+            return EMPTY_LABELS
+        labels = self.labels.get(value)
+        if labels is not None:
+            self.hits += 1
+            self.labels.move_to_end(value)
+            return labels
+        self.misses += 1
+        labels = classify_value(value)
+        self.labels[value] = labels
+        if self.new is not None:
+            self.new[value] = labels
+        if len(self.labels) > self.max_entries:
+            self.labels.popitem(last=False)
+        return labels
+
+    def track_new(self):
+        # Parallel workers send their newly classified values back to the
+        # parent's cache (eve_scan.py)
+        self.new = {}
+
+    def drain_new(self):
+        new, self.new = self.new or {}, {}
+        return new
+
+    def absorb(self, entries):
+        for value, labels in entries.items():
+            if value not in self.labels:
+                self.misses += 1
+            self.labels[value] = labels
+            self.labels.move_to_end(value)
+        while len(self.labels) > self.max_entries:
+            self.labels.popitem(last=False)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError) as e:
+            print(f"Ignoring unreadable label cache {self.path}: {e}")
+            return
+        if data.get("version") != indicators_version():
+            return
+        # Stored least recently used first; keep the newest max_entries
+        for value, labels in data.get("labels", [])[-self.max_entries:]:
+            self.labels[value] = Labels(*labels)
+
+    def save(self):
+        if not self.path:
+            return
+        labels = [[value, list(l)] for value, l in self.labels.items()]
+        data = {"version": indicators_version(), "labels": labels}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(data))
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        return f"{len(self.labels)} labelled values, {self.hits} cache hits, {self.misses} classified"
+
+
+def cache_option(options):
+    # --label-cache[=PATH] -> LabelCache. A bare --label-cache uses
+    # DEFAULT_LABEL_CACHE; without the option the cache is kept in memory.
+    path = options.get("label-cache")
+    return LabelCache(DEFAULT_LABEL_CACHE if path is True else path)
+
+
+def create_label_table(con, cache, values, name="value_labels"):
+    # Classifies distinct `values` through the cache into a DuckDB table
+    # (value, <Labels fields>) that queries join back to their events on value
+    labels = [cache.get(value) for value in values]
+    columns = ", ".join(
+        f"unnest(${i + 2}::{'VARCHAR' if field == 'iot' else 'BOOLEAN'}[]) as {field}"
+        for i, field in enumerate(Labels._fields)
+    )
+    con.execute(
+        f"CREATE OR REPLACE TABLE {name} AS SELECT unnest($1::VARCHAR[]) as value, {columns}",
+        [list(values)] + [[l[i] for l in labels] for i in range(len(Labels._fields))],
+    )
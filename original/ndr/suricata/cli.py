@@ -0,0 +1,47 @@
+import sys
+
+# Command-line parsing shared by the scripts: positional arguments plus
+# --flag and --option=value switches. Options a script names in `values`
+# always take a value, so for them the next argument is accepted as well
+# (--from 2026-01-21). Any other option without "=" is a flag, and takes the
+# next argument only when that is a plain number, so --jobs 4 and --sketch 500
+# work like --jobs=4 and --sketch=500. A bare "--" ends the options. Repeating an
+# option keeps the last value, except for options named in `repeated`, which
+# collect every value into a list.
+#
+# Each module whose options several scripts share reads them from the parsed
+# dict (classify.cache_option, eve_scan.jobs_option, ...) and exports the set
+# of its options that take a value.
+
+
+def parse_args(argv, values=(), repeated=()):
+    # -> (positional arguments, {name: value, or True for a bare flag})
+    positional = []
+    options = {}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        i += 1
+        if arg == "--":
+            positional.extend(argv[i:])
+            break
+        if not arg.startswith("--"):
+            positional.append(arg)
+            continue
+        name, eq, value = arg[2:].partition("=")
+        if not eq and (name in values or name in repeated):
+            if i == len(argv):
+                print(f"Error: --{name} needs a value")
+                sys.exit(1)
+            value = argv[i]
+            i += 1
+        elif not eq and i < len(argv) and argv[i].isdigit():
+            value = argv[i]
+            i += 1
+        elif not value:
+            value = True
+        if name in repeated:
+            options.setdefault(name, []).append(value)
+        else:
+            options[name] = value
+    return positional, options
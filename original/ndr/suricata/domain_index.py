@@ -0,0 +1,155 @@
+import os
+import bisect
+from functools import lru_cache
+
+# Domain names keyed by their labels in reverse order
+# ("archive.ubuntu.com" -> "com.ubuntu.archive"). In that form a zone and
+# everything under it sort together, so "all names under ubuntu.com" is a
+# range of a sorted list (or a >=/< range in SQL, see zone_sql), and suffix
+# checks become set lookups on label boundaries instead of regex/substring
+# scans.
+#
+# registrable_domain() gives the eTLD+1 using the offline public suffix
+# list bundled next to this file (public_suffix_list.dat).
+
+PUBLIC_SUFFIX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public_suffix_list.dat")
+
+
+def normalize_name(name):
+    return name.strip().rstrip(".").lower()
+
+
+def reverse_name(name):
+    # Its own inverse on normalized names
+    return ".".join(reversed(normalize_name(name).split(".")))
+
+
+class PublicSuffixList:
+    def __init__(self, path=PUBLIC_SUFFIX_FILE):
+        self.rules = set()
+        self.wildcards = set()
+        self.exceptions = set()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                fields = line.split()
+                if not fields or fields[0].startswith("//"):
+                    continue
+                rule = fields[0].lower()
+                if rule.startswith("!"):
+                    target, rule = self.exceptions, rule[1:]
+                elif rule.startswith("*."):
+                    target, rule = self.wildcards, rule[2:]
+                else:
+                    target = self.rules
+                target.add(rule)
+                # DNS carries internationalized names in punycode
+                try:
+                    target.add(rule.encode("idna").decode("ascii"))
+                except UnicodeError:
+                    pass
+
+    def suffix_labels(self, labels):
+        # Number of trailing labels that form the public suffix. The longest
+        # matching rule wins; unlisted TLDs count as one-label suffixes.
+        count = len(labels)
+        for i in range(count):
+            candidate = ".".join(labels[i:])
+            if candidate in self.exceptions:
+                return count - i - 1
+            if candidate in self.rules:
+                return count - i
+            if i + 1 < count and ".".join(labels[i + 1:]) in self.wildcards:
+                return count - i
+        return 1
+
+
+_PSL = None
+
+
+def public_suffix_list():
+    global _PSL
+    if _PSL is None:
+        _PSL = PublicSuffixList()
+    return _PSL
+
+
+@lru_cache(maxsize=65536)
+def registrable_domain(name):
+    # "a.b.example.co.uk" -> "example.co.uk"; None for public suffixes
+    # themselves and for anything that is not a dotted name
+    if not name:
+        return None
+    labels = normalize_name(name).split(".")
+    if any(not label for label in labels):
+        return None
+    suffix = public_suffix_list().suffix_labels(labels)
+    if len(labels) <= suffix:
+        return None
+    return ".".join(labels[-(suffix + 1):])
+
+
+class SuffixSet:
+    # Label-aware suffix matching: "ubuntu.com" matches "ubuntu.com" and
+    # "archive.ubuntu.com" but not "notubuntu.com"
+    def __init__(self, suffixes):
+        self.keys = {reverse_name(s) for s in suffixes if s}
+
+    def match(self, name):
+        # -> the shortest listed suffix of name, or None
+        if not name:
+            return None
+        key = ""
+        for label in reversed(normalize_name(name).split(".")):
+            key = f"{key}.{label}" if key else label
+            if key in self.keys:
+                return reverse_name(key)
+        return None
+
+
+class DomainIndex:
+    # Sorted reversed names; zone queries are bisect ranges
+    def __init__(self, names=()):
+        self.names = {}
+        for name in names:
+            if name:
+                self.names.setdefault(reverse_name(name), []).append(name)
+        self.keys = sorted(self.names)
+
+    def under(self, zone):
+        # -> the indexed names equal to zone or below it, in reversed-label order
+        key = reverse_name(zone)
+        found = []
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            found.append(key)
+        # "." sorts right before "/", so [key + ".", key + "/") is the subtree
+        lo = bisect.bisect_left(self.keys, key + ".")
+        hi = bisect.bisect_left(self.keys, key + "/")
+        found += self.keys[lo:hi]
+        return [name for k in found for name in self.names[k]]
+
+
+def zone_sql(column, zone):
+    # DuckDB predicate on a reversed-name column: zone or anything below it
+    key = reverse_name(zone).replace("'", "''")
+    return f"({column} = '{key}' OR ({column} >= '{key}.' AND {column} < '{key}/'))"
+
+
+def zones_sql(column, zones):
+    # Any of the zones; SuffixSet.match in SQL
+    return "(" + " OR ".join(zone_sql(column, zone) for zone in zones) + ")"
+
+
+def create_domain_table(con, names, name="domain_names"):
+    # (name, reversed_name, registrable) for each distinct name, stored in
+    # reversed_name order so a zone is one contiguous range of the table
+    names = list(names)
+    con.execute(
+        f"""CREATE OR REPLACE TABLE {name} AS
+        SELECT * FROM (
+            SELECT unnest($1::VARCHAR[]) as name,
+                   unnest($2::VARCHAR[]) as reversed_name,
+                   unnest($3::VARCHAR[]) as registrable
+        ) ORDER BY reversed_name""",
+        [names, [reverse_name(n) for n in names], [registrable_domain(n) for n in names]],
+    )
@@ -1,73 +1,336 @@
 import duckdb
 import glob
+import orjson
 import sys
 import os
 import datetime
+import re
+import threading
+import time
+import indicators
+from concurrent.futures import ThreadPoolExecutor
+from cli import parse_args
+from ipnet import private_ip_sql
+from classify import cache_option, create_label_table
+from domain_index import create_domain_table, zones_sql
+from query_profile import QueryProfiler, as_list, default_profile_path, enable_profiling, format_bytes
+from beacons import MIN_INTERVALS, score_series
 
-# --- Constants & Keywords ---
-
-CLOUD_KEYWORDS = [
-    "aws", "amazon", "azure", "google", "cloud", "googleapis",
-    "amazonaws", "blob.core.windows.net", "s3", "cloudfront",
-    "gcp", "dropbox", "box.com", "salesforce"
-]
-
-WINDOWS_INDICATORS = [
-    "time.windows.com", "msftncsi.com", "msftconnecttest.com",
-    "windowsupdate.com", "update.microsoft.com", "mp.microsoft.com",
-    "wdcp.microsoft.com", "wdcpalt.microsoft.com",
-    "displaycatalog.mp.microsoft.com", "sls.update.microsoft.com",
-    "ctldl.windowsupdate.com", "download.windowsupdate.com",
-    "tlu.dl.delivery.mp.microsoft.com", "settings-win.data.microsoft.com",
-    "v10.events.data.microsoft.com", "watson.telemetry.microsoft.com",
-    "login.live.com", "_msdcs", "_ldap._tcp", "_kerberos._tcp"
-]
-
-IOT_KEYWORDS = [
-    "camera", "doorbell", "smart", "alexa", "echo", "nest", "google home",
-    "tuya", "dahua", "hikvision", "amcrest", "foscam", "wyze", "ring",
-    "roku", "samsung", "lg", "tv", "sonos", "tplink", "belkin", "wemo",
-    "philips", "hue", "lifx", "xiaomi", "aqara", "eufy", "arlo",
-    "ubiquiti", "unifi", "meross", "nanoleaf", "apple tv", "fire tv",
-    "nvidia shield", "chromecast", "nintendo", "xbox", "playstation",
-    "steam deck", "oculus", "quest", "yeelight", "sensibo", "tado",
-    "netatmo", "withings", "fitbit", "garmin", "myq", "chamberlain",
-    "august", "schlage", "yale", "kasa", "tapo", "reolink", "ezviz",
-    "imou", "vivint", "simplisafe", "adt", "honeywell", "resideo",
-    "ecobee", "sensi", "daikin", "mitsubishi", "fujitsu", "panasonic",
-    "toshiba", "sharp", "hitachi", "sony", "bose", "denon", "marantz",
-    "onkyo", "pioneer", "yamaha", "harman", "jbl", "ultimate ears",
-    "bang olufsen", "bowers wilkins", "kepul", "tuya", "smartlife"
-]
-
-LINUX_DOMAINS_REGEX = r'(ubuntu\.com|debian\.org|centos\.org|fedoraproject\.org|archlinux\.org|raspberrypi\.org|kali\.org|linuxmint\.com|pop-os\.org|canonical\.com|pypi\.org|pythonhosted\.org|docker\.io|quay\.io|gcr\.io|registry\.npmjs\.org|rubygems\.org|snapcraft\.io)$'
-LINUX_UA_REGEX = r'(linux|ubuntu|debian|fedora|arch|curl|wget|apt-http|pacman)'
+# --- Constants ---
+
+# Sections run at once by --concurrent without a count
+DEFAULT_CONCURRENCY = 4
 
 # --- Helper Functions ---
 
-def get_parquet_file(argv):
-    if len(argv) < 2:
+# Options of parse_window() that take a value (cli.parse_args)
+WINDOW_OPTIONS = {"from", "to", "last"}
+# duck_hunt.py's other options that take a value
+VALUE_OPTIONS = WINDOW_OPTIONS | {"threads", "memory-limit"}
+
+def is_dataset_dir(path):
+    # Dataset written by `j2p.py --partition/--incremental`: Parquet parts,
+    # either hive-partitioned (event_type=<type>/date=<day>/) or flat
+    if not os.path.isdir(path):
+        return False
+    if os.path.exists(os.path.join(path, "_manifest.json")):
+        return True
+    return any(
+        "=" in name and os.path.isdir(os.path.join(path, name))
+        for name in os.listdir(path)
+    )
+
+def get_parquet_file(args):
+    if not args:
         return None
-    path = argv[1]
+    path = args[0]
+    if is_dataset_dir(path):
+        return path
     if os.path.isdir(path):
-        files = glob.glob(os.path.join(path, "*.parquet"))
-        if not files:
-            return None
-        return sorted(files)[-1]
+        # A directory of Parquet files (j2p.py merged outputs) is read as one dataset
+        if glob.glob(os.path.join(path, "*.parquet")):
+            return path
+        dataset = os.path.join(path, "eve_dataset")
+        return dataset if is_dataset_dir(dataset) else None
     if os.path.isfile(path) and path.endswith(".parquet"):
         return path
     return None
 
-def build_like_clause(column, keywords):
-    conditions = [f"{column} ILIKE '%{k}%'" for k in keywords]
-    return f"({' OR '.join(conditions)})"
+def parquet_glob(path):
+    if is_dataset_dir(path):
+        return os.path.join(path, "**", "*.parquet")
+    if os.path.isdir(path):
+        return os.path.join(path, "*.parquet")
+    return path
+
+def parquet_source(path, files=None):
+    # files: the source's files left after pruning (see parquet_files); all
+    # of them by default. Partition columns (event_type, date) come back
+    # from the directory names, so filters on them skip whole directories.
+    # Files written with different schemas are read by column name.
+    if files is not None:
+        listed = ", ".join(f"'{f}'" for f in files)
+        hive = "hive_partitioning=true, " if is_dataset_dir(path) else ""
+        return f"read_parquet([{listed}], {hive}union_by_name=true)"
+    if is_dataset_dir(path):
+        return f"read_parquet('{parquet_glob(path)}', hive_partitioning=true, union_by_name=true)"
+    if os.path.isdir(path):
+        return f"read_parquet('{parquet_glob(path)}', union_by_name=true)"
+    return f"read_parquet('{path}')"
+
+# --- Time Windows ---
+# --from/--to restrict a report to a time window: a date stands for the whole
+# day (--from=2026-01-20 --to=2026-01-21 is two days), an ISO time for that
+# instant (--from=2026-01-21T06:00, --to excludes its own instant), both in
+# UTC unless they carry an offset. --last=6h (s, m, h or d) is the window
+# ending at the newest event in the source. Typed timestamps are compared as
+# instants; untyped ones (j2p.py --infer) as written.
+#
+# Only the files that can hold events in the window are opened, judged
+# first by the dates in j2p's file names (eve_merged_<start>_to_<end>.parquet)
+# or date= partitions, then by the timestamp min/max in the remaining files'
+# footers. The window is also applied to the rows, so DuckDB skips the row
+# groups outside it; j2p writes rows in timestamp order, which makes each
+# row group's time range narrow.
+
+MERGED_FILE_DATES = re.compile(r"eve_merged_(\d{4}-\d{2}-\d{2})_to_(\d{4}-\d{2}-\d{2})\.parquet$")
+PARTITION_DATE = re.compile(r"(?:^|/)date=(\d{4}-\d{2}-\d{2})(?:/|$)")
+DURATION = re.compile(r"^(\d+)([smhd])$")
+DURATION_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+def parse_time(value, end=False):
+    # A --from/--to value -> naive UTC datetime. A date is its day's start,
+    # or with end=True the next day's (the window end is exclusive).
+    if value is True:
+        raise ValueError("--from/--to need a date or time (--from=2026-01-20, --to=2026-01-21T06:00)")
+    if len(value) == 10:
+        day = datetime.date.fromisoformat(value)
+        if end:
+            day += datetime.timedelta(days=1)
+        return datetime.datetime.combine(day, datetime.time())
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return moment
 
-def run_query(con, query):
+def parse_window(options):
+    # -> {"start", "end"} (naive UTC datetimes, end exclusive, either None)
+    # and "last" (timedelta of --last, resolved against the data by
+    # create_logs_view), or None without a window
+    start, end, last = options.get("from"), options.get("to"), options.get("last")
+    if start is None and end is None and last is None:
+        return None
+    window = {"start": None, "end": None, "last": None}
+    if last is not None:
+        if start is not None or end is not None:
+            raise ValueError("--last cannot be combined with --from/--to")
+        match = DURATION.match(str(last))
+        if not match:
+            raise ValueError("--last needs a duration (--last=6h; s, m, h or d)")
+        window["last"] = datetime.timedelta(**{DURATION_UNITS[match.group(2)]: int(match.group(1))})
+        return window
+    if start is not None:
+        window["start"] = parse_time(start)
+    if end is not None:
+        window["end"] = parse_time(end, end=True)
+    if None not in (window["start"], window["end"]) and window["start"] >= window["end"]:
+        raise ValueError(f"--from={start} is not before --to={end}")
+    return window
+
+def window_days(window):
+    # (first day, last day) touched by the window, either None when open
+    first = window["start"].date().isoformat() if window["start"] is not None else None
+    last = None
+    if window["end"] is not None:
+        last = (window["end"] - datetime.timedelta(microseconds=1)).date().isoformat()
+    return first, last
+
+def whole_days(window):
+    # Whether the window is made of whole days (rollups hold no finer times)
+    return window["last"] is None and all(
+        moment is None or moment.time() == datetime.time() for moment in (window["start"], window["end"]))
+
+def in_window(first, last, window):
+    # Whether the days first..last overlap the window's days
+    start, end = window_days(window)
+    return not ((start is not None and last < start) or (end is not None and first > end))
+
+def named_dates(path):
+    # (first, last) day from a file's name or date= partition, or None
+    match = MERGED_FILE_DATES.search(os.path.basename(path))
+    if match:
+        return match.group(1), match.group(2)
+    match = PARTITION_DATE.search(path.replace(os.sep, "/"))
+    if match:
+        return match.group(1), match.group(1)
+    return None
+
+def footer_times(con, files):
+    # {file: (min, max)} timestamp statistics as written in the footers;
+    # files without complete statistics are left out
     try:
-        return con.sql(query).fetchall()
+        rows = con.execute("""
+            SELECT file_name, min(stats_min_value), max(stats_max_value), bool_and(stats_min_value IS NOT NULL)
+            FROM parquet_metadata(?)
+            WHERE path_in_schema = 'timestamp'
+            GROUP BY file_name
+        """, [files]).fetchall()
+    except Exception as e:
+        print(f"Could not read Parquet metadata: {e}")
+        return {}
+    return {name: (low, high) for name, low, high, complete in rows if complete}
+
+def parse_stat_time(text):
+    # Footer statistic ('2026-01-20 00:00:00+00', '2026-01-20T00:00:00.000000+0000') -> naive UTC
+    moment = datetime.datetime.fromisoformat(text)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return moment
+
+def resolve_last(con, files, window):
+    # --last: the window ends with the newest event in the files
+    times = footer_times(con, files)
+    if len(times) == len(files):
+        latest = max(parse_stat_time(high) for _, high in times.values())
+    else:
+        listed = ", ".join(f"'{f}'" for f in files)
+        latest = con.execute(f"SELECT max(timestamp)::VARCHAR FROM read_parquet([{listed}], union_by_name=true)").fetchone()[0]
+        if latest is None:
+            raise ValueError("--last needs timestamps, and the source has none")
+        latest = parse_stat_time(latest)
+    window["end"] = latest + datetime.timedelta(microseconds=1)
+    window["start"] = window["end"] - window["last"]
+
+def parquet_files(con, path, window=None):
+    # The source's Parquet files that can hold events in the window
+    files = sorted(glob.glob(parquet_glob(path), recursive=True))
+    if window is None:
+        return files
+    if window["last"] is not None and files:
+        resolve_last(con, files, window)
+    files = [f for f in files if named_dates(f) is None or in_window(*named_dates(f), window)]
+    if not files:
+        return files
+    times = footer_times(con, files)
+    return [f for f in files if f not in times or in_window(times[f][0][:10], times[f][1][:10], window)]
+
+def overlapping_files(files):
+    # Merged files whose named date ranges overlap, e.g. a file converted
+    # again after it grew: their common events are read twice
+    named = [(MERGED_FILE_DATES.search(os.path.basename(f)), f) for f in files]
+    ranges = sorted((match.groups(), f) for match, f in named if match)
+    return [(a, b) for (ra, a), (rb, b) in zip(ranges, ranges[1:]) if rb[0] <= ra[1]]
+
+def time_literal(timestamp_type, moment):
+    # SQL literal for a naive UTC datetime, comparable with the timestamp
+    # column, or None when the column cannot be range-filtered
+    if timestamp_type is None:
+        return None
+    if timestamp_type == "VARCHAR":
+        return f"'{moment.isoformat()}'"
+    if timestamp_type.startswith("TIMESTAMP WITH TIME ZONE"):
+        return f"TIMESTAMPTZ '{moment.isoformat(sep=' ')}+00'"
+    return f"TIMESTAMP '{moment.isoformat(sep=' ')}'"
+
+def window_filter(timestamp_type, window):
+    # WHERE clause for the events in the window
+    if timestamp_type is None:
+        return "true"
+    clauses = []
+    if window["start"] is not None:
+        clauses.append(f"timestamp >= {time_literal(timestamp_type, window['start'])}")
+    if window["end"] is not None:
+        clauses.append(f"timestamp < {time_literal(timestamp_type, window['end'])}")
+    return " AND ".join(clauses)
+
+def format_window(window):
+    def moment(value, default):
+        return value.isoformat(sep=" ", timespec="seconds") if value is not None else default
+    return f"{moment(window['start'], 'start')} to {moment(window['end'], 'end')} UTC"
+
+def create_logs_view(con, path, window=None):
+    # The `logs` view over the source, restricted to the window -> files read
+    files = parquet_files(con, path, window)
+    for a, b in overlapping_files(files):
+        print(f"Warning: {os.path.basename(a)} and {os.path.basename(b)} cover overlapping dates; events in both are counted twice")
+    if window is None:
+        con.execute(f"CREATE VIEW logs AS SELECT * FROM {parquet_source(path)}")
+        return files
+    if not files:
+        return files
+    source = parquet_source(path, files)
+    types = dict(con.execute(f"SELECT column_name, column_type FROM (DESCRIBE SELECT * FROM {source})").fetchall())
+    if "timestamp" not in types:
+        print("Warning: no timestamp column; the window only pruned files by name")
+    con.execute(f"CREATE VIEW logs AS SELECT * FROM {source} WHERE {window_filter(types.get('timestamp'), window)}")
+    return files
+
+# Running totals of Parquet rows read, filled from DuckDB's profiler, and the
+# columns each Parquet scan read (for the bytes estimate, see scanned_columns)
+SCAN_TOTALS = {"queries": 0, "rows_scanned": 0, "parquet_scans": []}
+SCAN_TOTALS_LOCK = threading.Lock()
+
+# Stats of the report section running on this thread (see run_section)
+_SECTION = threading.local()
+
+# Per-query profiles for --profile (query_profile.py)
+QUERY_PROFILES = QueryProfiler()
+
+def last_query_profile(con):
+    try:
+        return orjson.loads(con.get_profiling_information(format="json"))
+    except Exception:
+        return {}
+
+def run_query(con, query, numpy=False):
+    # -> rows, or with numpy=True {column: NumPy array}
+    start = time.perf_counter()
+    try:
+        result = con.sql(query)
+        rows = result.fetchnumpy() if numpy else result.fetchall()
     except Exception as e:
         print(f"Query Error: {e}")
-        return []
+        QUERY_PROFILES.record(query, {}, 0, time.perf_counter() - start, error=str(e))
+        return {} if numpy else []
+    wall_time = time.perf_counter() - start
+    rows_returned = len(next(iter(rows.values()), [])) if numpy else len(rows)
+    profile = last_query_profile(con)
+    QUERY_PROFILES.record(query, profile, rows_returned, wall_time)
+    rows_scanned = profile.get("cumulative_rows_scanned", 0)
+    parquet_scans = scanned_columns(profile)
+    with SCAN_TOTALS_LOCK:
+        SCAN_TOTALS["queries"] += 1
+        SCAN_TOTALS["rows_scanned"] += rows_scanned
+        SCAN_TOTALS["parquet_scans"] += parquet_scans
+    section = getattr(_SECTION, "stats", None)
+    if section is not None:
+        section["queries"] += 1
+        section["rows_returned"] += rows_returned
+        section["rows_scanned"] += rows_scanned
+        section["latency"] += profile.get("latency", 0.0)
+        section["cpu_time"] += profile.get("cpu_time", 0.0)
+        section["peak_memory"] = max(section["peak_memory"], profile.get("system_peak_buffer_memory", 0))
+    return rows
+
+STRUCT_EXTRACT = re.compile(r"struct_extract\(([A-Za-z_][\w.]*), '([^']*)'\)")
+
+def scanned_columns(node):
+    # Columns read by each Parquet scan in a query profile, as leaf paths
+    # ("tls, sni"): the projections plus the columns the pushed filters test
+    scans = []
+    for child in node.get("children", []):
+        extra = child.get("extra_info") or {}
+        if child.get("operator_type") == "TABLE_SCAN" and extra.get("Function") == "READ_PARQUET":
+            filters = " ".join(as_list(extra.get("Filters")))
+            # struct_extract(tls, 'sni') reads tls.sni only; then drop literals
+            # and function names
+            while STRUCT_EXTRACT.search(filters):
+                filters = STRUCT_EXTRACT.sub(r"\1.\2", filters)
+            filters = re.sub(r"'(?:[^']|'')*'", "", filters)
+            columns = as_list(extra.get("Projections")) + re.findall(r"[A-Za-z_][\w.]*(?![\w.]*\s*\()", filters)
+            scans.append(list(dict.fromkeys(c.replace(".", ", ") for c in columns)))
+        scans += scanned_columns(child)
+    return scans
 
 def format_list_output(title, rows, limit=50):
     output = f"## {title}\n\n"
@@ -81,49 +344,326 @@ def format_list_output(title, rows, limit=50):
     output += "\n"
     return output
 
+# --- Event Slices ---
+# Analyses read these relations instead of `logs`. By default they are views,
+# so each analysis scans the Parquet file on its own. In fused mode the
+# dns/tls/http/flow slices are read once into tables and shared. Tables
+# live in the in-memory database, so every cursor (--concurrent) sees them.
+# `stats` events never carry a dest_port; excluding them explicitly lets a
+# partitioned dataset skip the stats directories entirely.
+#
+# Every slice but dns_servers has an `events` column, the number of raw
+# events a row stands for: 1 when reading events, the day's count when
+# reading rollups (--rollups, rollup.py). Analyses count with sum(events).
+
+UNWEIGHTED_SLICES = {"dns_servers"}
+
+def weighted(name, query):
+    if name in UNWEIGHTED_SLICES:
+        return query
+    return f"SELECT *, 1 as events FROM ({query})"
+
+def private_flag(prefix, has_ip_flags):
+    # <prefix>_private from ingest (j2p/eve_schema) when present, otherwise
+    # derived from the address string
+    if has_ip_flags:
+        return f"{prefix}_private"
+    return f"{private_ip_sql(prefix + '_ip')} as {prefix}_private"
+
+def slice_definitions(has_http, has_dns, has_tls, has_ip_flags, source="logs", carry=()):
+    # carry: columns of `source` passed through every slice unchanged
+    # (rollup.py carries the day of each event)
+    src_private = private_flag("src", has_ip_flags)
+    dest_private = private_flag("dest", has_ip_flags)
+    keys = "".join(f"{column}, " for column in carry)
+    slices = {
+        "flow_events": f"""
+            SELECT {keys}src_ip, dest_ip, dest_port, proto, {src_private}, {dest_private}
+            FROM {source}
+            WHERE event_type = 'flow'
+        """,
+    }
+    if has_dns:
+        slices["dns_queries"] = f"""
+            SELECT {keys}src_ip, src_private, query_index, rrname
+            FROM (
+                SELECT
+                    {keys}src_ip,
+                    src_private,
+                    generate_subscripts(dns_queries, 1) as query_index,
+                    unnest(dns_queries).rrname as rrname
+                FROM (
+                    SELECT {keys}src_ip, {src_private}, dns.queries as dns_queries
+                    FROM {source}
+                    WHERE event_type = 'dns'
+                )
+            )
+            WHERE rrname IS NOT NULL
+        """
+        slices["dns_servers"] = f"""
+            SELECT DISTINCT {keys}dest_ip
+            FROM {source}
+            WHERE (event_type = 'dns' OR (event_type <> 'stats' AND dest_port = 53))
+              AND dest_ip IS NOT NULL
+        """
+    if has_tls:
+        slices["tls_events"] = f"""
+            SELECT {keys}src_ip, {src_private}, tls.sni as sni, tls.subject as subject
+            FROM {source}
+            WHERE event_type = 'tls'
+        """
+    if has_http:
+        slices["http_events"] = f"""
+            SELECT {keys}src_ip, {src_private}, http.hostname as hostname, http.http_user_agent as user_agent
+            FROM {source}
+            WHERE event_type = 'http'
+        """
+    return slices
+
+def create_slices(con, has_http, has_dns, has_tls, has_ip_flags, beacons=None):
+    for name, query in slice_definitions(has_http, has_dns, has_tls, has_ip_flags).items():
+        con.execute(f"CREATE OR REPLACE VIEW {name} AS {weighted(name, query)}")
+    if beacons is not None:
+        con.execute(f"CREATE OR REPLACE VIEW beacon_flows AS {beacon_flows_query(beacons)}")
+
+FUSED_EVENT_TYPES = ["dns", "tls", "http", "flow"]
+
+def create_fused_slices(con, parquet_file, has_http, has_dns, has_tls, has_ip_flags, files=None, beacons=None):
+    # One pass over the Parquet file pulls every field any analysis needs.
+    # Nested fields are repacked so the slice queries work unchanged; flow
+    # times for the beaconing analysis come along as flow_time.
+    columns = ["event_type", "src_ip", "dest_ip", "dest_port", "proto"]
+    if has_ip_flags:
+        columns += ["src_private", "dest_private"]
+    leaf_paths = list(columns)
+    if beacons is not None:
+        columns.append(f"CASE WHEN event_type = 'flow' THEN {beacons['time']} END as flow_time")
+        leaf_paths += beacons["paths"]
+    if has_dns:
+        columns.append("struct_pack(queries := dns.queries) as dns")
+        leaf_paths.append("dns, queries")
+    if has_tls:
+        columns.append("struct_pack(sni := tls.sni, subject := tls.subject) as tls")
+        leaf_paths += ["tls, sni", "tls, subject"]
+    if has_http:
+        columns.append("struct_pack(hostname := http.hostname, http_user_agent := http.http_user_agent) as http")
+        leaf_paths += ["http, hostname", "http, http_user_agent"]
+
+    scan_query = f"""
+    CREATE OR REPLACE TABLE hunt_scan AS
+    SELECT {', '.join(columns)}
+    FROM logs
+    WHERE event_type IN ({', '.join(repr(t) for t in FUSED_EVENT_TYPES)})
+       OR (event_type <> 'stats' AND dest_port = 53)
+    """
+    start = time.perf_counter()
+    con.execute(scan_query)
+    profile = last_query_profile(con)
+    QUERY_PROFILES.record(scan_query, profile, 0, time.perf_counter() - start)
+    stats = {
+        "rows_scanned": profile.get("cumulative_rows_scanned", 0),
+        "bytes_scanned": projected_bytes(column_sizes(con, files or parquet_glob(parquet_file)), leaf_paths),
+    }
+
+    for name, query in slice_definitions(has_http, has_dns, has_tls, has_ip_flags, source="hunt_scan").items():
+        con.execute(f"CREATE OR REPLACE TABLE {name} AS {weighted(name, query)}")
+        stats[name] = con.execute(f"SELECT count(*) FROM {name}").fetchone()[0]
+    if beacons is not None:
+        con.execute(f"CREATE OR REPLACE TABLE beacon_flows AS {beacon_flows_query(beacons, 'hunt_scan', 'flow_time')}")
+        stats["beacon_flows"] = con.execute("SELECT count(*) FROM beacon_flows").fetchone()[0]
+    con.execute("DROP TABLE hunt_scan")
+    return stats
+
+def column_sizes(con, files):
+    # [(path_in_schema, compressed size)] of the column chunks in `files` (a
+    # glob or a list). In a partitioned dataset the pruned stats directories
+    # do not count.
+    try:
+        rows = con.execute(
+            "SELECT file_name, path_in_schema, total_compressed_size FROM parquet_metadata(?)",
+            [files],
+        ).fetchall()
+    except Exception as e:
+        print(f"Could not read Parquet metadata: {e}")
+        return []
+    return [(path, size) for file_name, path, size in rows
+            if "event_type=stats" not in file_name.replace(os.sep, "/").split("/")]
+
+def projected_bytes(sizes, leaf_paths):
+    # Compressed size of the column chunks under `leaf_paths` (e.g. "tls, sni").
+    # An estimate of the bytes a scan reads: row groups skipped by their
+    # statistics still count, and pages are counted as stored.
+    return sum(size for path, size in sizes
+               if any(path == p or path.startswith(p + ", ") for p in leaf_paths))
+
+def views_bytes_scanned(con, files):
+    # projected_bytes summed over the Parquet scans of the per-analysis queries
+    sizes = column_sizes(con, files)
+    return sum(projected_bytes(sizes, columns) for columns in SCAN_TOTALS["parquet_scans"])
+
+# --- Rollups ---
+# Daily aggregates written by rollup.py under <dir>/<slice>/day=<YYYY-MM-DD>/:
+# one row per distinct slice row and day, with its event count. With
+# --rollups the slices are rebuilt from them with the days summed, so every
+# analysis gives the same result as on the raw events while reading only
+# the rollup rows.
+
+ROLLUP_MANIFEST = "_rollups.json"
+
+# Slice columns as stored in the rollups; types only matter for empty slices
+ROLLUP_COLUMNS = {
+    "flow_events": "src_ip VARCHAR, dest_ip VARCHAR, dest_port INTEGER, proto VARCHAR, src_private BOOLEAN, dest_private BOOLEAN",
+    "dns_queries": "src_ip VARCHAR, src_private BOOLEAN, query_index BIGINT, rrname VARCHAR",
+    "dns_servers": "dest_ip VARCHAR",
+    "tls_events": "src_ip VARCHAR, src_private BOOLEAN, sni VARCHAR, subject VARCHAR",
+    "http_events": "src_ip VARCHAR, src_private BOOLEAN, hostname VARCHAR, user_agent VARCHAR",
+}
+
+def default_rollup_dir(parquet_file):
+    return os.path.splitext(parquet_file.rstrip(os.sep))[0] + "_rollups"
+
+def rollup_files(rollup_dir, table):
+    return os.path.join(rollup_dir, table, "day=*", "*.parquet")
+
+def rollup_source(rollup_dir, table):
+    # The day comes back from the directory names, kept as text
+    return f"read_parquet('{rollup_files(rollup_dir, table)}', hive_partitioning=true, hive_types_autocast=false)"
+
+def load_rollup_manifest(rollup_dir):
+    path = os.path.join(rollup_dir, ROLLUP_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def create_rollup_slices(con, rollup_dir, manifest, window=None):
+    # Slices the rollups were built with, over the days in the window ->
+    # stats for the scan summary
+    days = sorted(manifest["days"])
+    where = ""
+    if window is not None:
+        # Whole days only (see main). Undated events sort after every date,
+        # so a window leaves them out.
+        start, end = window_days(window)
+        where = f" WHERE day BETWEEN '{start or '0000-01-01'}' AND '{end or '9999-12-31'}'"
+        days = [day for day in days if in_window(day, day, window)]
+    stats = {"rows_read": 0, "days": len(days)}
+    for name in manifest["slices"]:
+        typed_columns = ROLLUP_COLUMNS[name]
+        if not glob.glob(rollup_files(rollup_dir, name)):
+            # No day had such events
+            events = "" if name in UNWEIGHTED_SLICES else ", events HUGEINT"
+            con.execute(f"CREATE OR REPLACE TABLE {name} ({typed_columns}{events})")
+            stats[name] = 0
+            continue
+        columns = ", ".join(c.split()[0] for c in typed_columns.split(", "))
+        source = rollup_source(rollup_dir, name) + where
+        if name in UNWEIGHTED_SLICES:
+            query = f"SELECT DISTINCT {columns} FROM {source}"
+        else:
+            query = f"SELECT {columns}, sum(events) as events FROM {source} GROUP BY ALL"
+        con.execute(f"CREATE OR REPLACE TABLE {name} AS {query}")
+        stats["rows_read"] += con.execute(f"SELECT count(*) FROM {source}").fetchone()[0]
+        stats[name] = con.execute(f"SELECT count(*) FROM {name}").fetchone()[0]
+    return stats
+
+def format_scan_summary(fused, fused_stats, label_cache, labelled_values, rollup_stats=None, bytes_scanned=None):
+    output = "## Scan Summary\n\n"
+    if rollup_stats is not None:
+        output += f"- Mode: rollups ({rollup_stats['days']} days, no raw events read)\n"
+        output += f"- Rollup rows read: {rollup_stats['rows_read']}\n"
+        for name in ["dns_queries", "dns_servers", "tls_events", "http_events", "flow_events"]:
+            if name in rollup_stats:
+                output += f"- Slice `{name}`: {rollup_stats[name]} rows\n"
+        output += f"- Slice rows read by analyses: {SCAN_TOTALS['rows_scanned']} ({SCAN_TOTALS['queries']} queries)\n"
+    elif fused:
+        output += "- Mode: fused (single Parquet scan)\n"
+        output += "- Parquet scans: 1\n"
+        output += f"- Parquet rows scanned: {fused_stats['rows_scanned']}\n"
+        output += f"- Parquet bytes scanned (estimate): {format_bytes(fused_stats['bytes_scanned'])}\n"
+        for name in ["dns_queries", "dns_servers", "tls_events", "http_events", "flow_events", "beacon_flows"]:
+            if name in fused_stats:
+                output += f"- Slice `{name}`: {fused_stats[name]} rows\n"
+        output += f"- Slice rows read by analyses: {SCAN_TOTALS['rows_scanned']} ({SCAN_TOTALS['queries']} queries)\n"
+    else:
+        output += "- Mode: per-analysis (one Parquet scan per query)\n"
+        output += f"- Parquet scans: {SCAN_TOTALS['queries']}\n"
+        output += f"- Parquet rows scanned: {SCAN_TOTALS['rows_scanned']}\n"
+        if bytes_scanned is not None:
+            output += f"- Parquet bytes scanned (estimate): {format_bytes(bytes_scanned)}\n"
+    output += f"- Distinct values classified: {labelled_values} ({label_cache.hits} from label cache)\n"
+    output += "\n"
+    return output
+
+# --- Value Labels ---
+# Domains, SNIs, hostnames and user-agents repeat across millions of events.
+# Their distinct values are classified once (classify.py) into the
+# value_labels table, and the keyword/regex analyses join against it.
+# The distinct domain-like values also go into domain_names with their
+# reversed-label form and registrable domain (domain_index.py); zone
+# matches such as the Linux domains are ranges of the reversed names.
+
+def create_value_labels(con, label_cache, has_http, has_dns, has_tls):
+    sources = []
+    if has_dns:
+        sources.append(("dns_queries", "rrname", True))
+    if has_tls:
+        sources += [("tls_events", "sni", True), ("tls_events", "subject", False)]
+    if has_http:
+        sources += [("http_events", "hostname", True), ("http_events", "user_agent", False)]
+    rows = []
+    if sources:
+        query = " UNION ".join(
+            f"SELECT {column} as value, {is_domain} as is_domain FROM {relation} WHERE {column} IS NOT NULL"
+            for relation, column, is_domain in sources
+        )
+        rows = run_query(con, query)
+    values = list(dict.fromkeys(r[0] for r in rows))
+    create_label_table(con, label_cache, values)
+    create_domain_table(con, {r[0] for r in rows if r[1]})
+    return len(values)
+
 # --- Analysis Functions ---
 
 def analyze_cloud(con, has_dns, has_tls):
-    # Construct domain expression based on available columns
+    # Domain candidates: TLS SNI (falling back to subject) and the first DNS query
     parts = []
     if has_tls:
-        parts.append("tls.sni")
-        parts.append("tls.subject")
+        parts.append("""
+            SELECT 'tls' as event_type, COALESCE(sni, subject) as domain
+            FROM tls_events
+        """)
     if has_dns:
-        parts.append("dns.queries[1].rrname")
+        parts.append("""
+            SELECT 'dns' as event_type, rrname as domain
+            FROM dns_queries
+            WHERE query_index = 1
+        """)
         
     if not parts:
         return "## Cloud Destinations\n\nNo suitable columns (TLS/DNS) found.\n\n"
-        
-    domain_expr = f"COALESCE({', '.join(parts)})"
     
     query = f"""
     WITH candidates AS (
-        SELECT 
-            event_type, 
-            {domain_expr} as domain
-        FROM logs
-        WHERE event_type IN ('tls', 'dns')
+        {" UNION ALL ".join(parts)}
     )
     SELECT DISTINCT event_type, domain
     FROM candidates
-    WHERE domain IS NOT NULL 
-      AND {build_like_clause('domain', CLOUD_KEYWORDS)}
-    ORDER BY domain
+    JOIN value_labels ON value_labels.value = candidates.domain
+    WHERE value_labels.cloud
+    ORDER BY domain, event_type
     """
     rows = run_query(con, query)
     return format_list_output("Cloud Destinations", rows)
 
 def analyze_windows_dns(con):
-    # Uses UNNEST(dns.queries)
-    query = f"""
-    SELECT src_ip, q.unnest.rrname, count(*) as count
-    FROM logs, UNNEST(dns.queries) as q
-    WHERE event_type = 'dns' 
-      AND q.unnest.rrname IS NOT NULL
-      AND {build_like_clause('q.unnest.rrname', WINDOWS_INDICATORS)}
-    GROUP BY src_ip, q.unnest.rrname
-    ORDER BY count DESC
+    query = """
+    SELECT src_ip, rrname, sum(events) as count
+    FROM dns_queries
+    JOIN value_labels ON value_labels.value = dns_queries.rrname
+    WHERE value_labels.windows
+    GROUP BY src_ip, rrname
+    ORDER BY count DESC, src_ip, rrname
     """
     rows = run_query(con, query)
     
@@ -147,11 +687,10 @@ def analyze_windows_dns(con):
 
 def explore_dns(con):
     query = """
-    SELECT q.unnest.rrname, count(*) as cnt
-    FROM logs, UNNEST(dns.queries) as q
-    WHERE event_type = 'dns' AND q.unnest.rrname IS NOT NULL
-    GROUP BY q.unnest.rrname
-    ORDER BY cnt DESC
+    SELECT rrname, sum(events) as cnt
+    FROM dns_queries
+    GROUP BY rrname
+    ORDER BY cnt DESC, rrname
     LIMIT 50
     """
     rows = run_query(con, query)
@@ -159,14 +698,29 @@ def explore_dns(con):
     for r in rows:
         output += f"- {r[1]}: {r[0]}\n"
     output += "\n"
+
+    # Same queries rolled up to their registrable domain (eTLD+1), so CDN
+    # and tracker subdomains collapse into one line each
+    query = """
+    SELECT domain_names.registrable, sum(events) as cnt, count(DISTINCT dns_queries.rrname) as names
+    FROM dns_queries
+    JOIN domain_names ON domain_names.name = dns_queries.rrname
+    WHERE domain_names.registrable IS NOT NULL
+    GROUP BY domain_names.registrable
+    ORDER BY cnt DESC, domain_names.registrable
+    LIMIT 50
+    """
+    rows = run_query(con, query)
+    output += "## Top 50 Registrable Domains\n\n"
+    for r in rows:
+        output += f"- {r[1]}: {r[0]} ({r[2]} names)\n"
+    output += "\n"
     return output
 
 def extract_dns_servers(con):
     query = """
-    SELECT DISTINCT dest_ip
-    FROM logs
-    WHERE (event_type = 'dns' OR dest_port = 53) 
-      AND dest_ip IS NOT NULL
+    SELECT dest_ip
+    FROM dns_servers
     ORDER BY dest_ip
     """
     rows = run_query(con, query)
@@ -174,11 +728,10 @@ def extract_dns_servers(con):
 
 def extract_sni(con):
     query = """
-    SELECT DISTINCT tls.sni
-    FROM logs
-    WHERE event_type = 'tls' 
-      AND tls.sni IS NOT NULL
-    ORDER BY tls.sni
+    SELECT DISTINCT sni
+    FROM tls_events
+    WHERE sni IS NOT NULL
+    ORDER BY sni
     """
     rows = run_query(con, query)
     return format_list_output("Unique SNIs", rows)
@@ -187,45 +740,48 @@ def find_iot(con, has_http, has_dns, has_tls):
     iot_clauses = []
     
     if has_dns:
-        iot_clauses.append(f"""
-            SELECT src_ip, 'dns' as type, q.unnest.rrname as detail
-            FROM logs, UNNEST(dns.queries) as q 
-            WHERE event_type='dns' AND q.unnest.rrname IS NOT NULL 
-              AND {build_like_clause('q.unnest.rrname', IOT_KEYWORDS)}
+        iot_clauses.append("""
+            SELECT src_ip, 'dns' as type, rrname as detail
+            FROM dns_queries
+            JOIN value_labels ON value_labels.value = dns_queries.rrname
+            WHERE value_labels.iot IS NOT NULL
         """ )
     
     if has_tls:
-        iot_clauses.append(f"""
-            SELECT src_ip, 'tls_sni' as type, tls.sni as detail
-            FROM logs 
-            WHERE event_type='tls' AND tls.sni IS NOT NULL 
-              AND {build_like_clause('tls.sni', IOT_KEYWORDS)}
+        iot_clauses.append("""
+            SELECT src_ip, 'tls_sni' as type, sni as detail
+            FROM tls_events
+            JOIN value_labels ON value_labels.value = tls_events.sni
+            WHERE value_labels.iot IS NOT NULL
         """ )
-        iot_clauses.append(f"""
-            SELECT src_ip, 'tls_subject' as type, tls.subject as detail
-            FROM logs 
-            WHERE event_type='tls' AND tls.subject IS NOT NULL 
-              AND {build_like_clause('tls.subject', IOT_KEYWORDS)}
+        iot_clauses.append("""
+            SELECT src_ip, 'tls_subject' as type, subject as detail
+            FROM tls_events
+            JOIN value_labels ON value_labels.value = tls_events.subject
+            WHERE value_labels.iot IS NOT NULL
         """ )
     
     if has_http:
-        iot_clauses.append(f"""
-            SELECT src_ip, 'http_host' as type, http.hostname as detail
-            FROM logs 
-            WHERE event_type='http' AND http.hostname IS NOT NULL 
-              AND {build_like_clause('http.hostname', IOT_KEYWORDS)}
+        iot_clauses.append("""
+            SELECT src_ip, 'http_host' as type, hostname as detail
+            FROM http_events
+            JOIN value_labels ON value_labels.value = http_events.hostname
+            WHERE value_labels.iot IS NOT NULL
         """ )
-        iot_clauses.append(f"""
-            SELECT src_ip, 'http_ua' as type, http.http_user_agent as detail
-            FROM logs 
-            WHERE event_type='http' AND http.http_user_agent IS NOT NULL 
-              AND {build_like_clause('http.http_user_agent', IOT_KEYWORDS)}
+        iot_clauses.append("""
+            SELECT src_ip, 'http_ua' as type, user_agent as detail
+            FROM http_events
+            JOIN value_labels ON value_labels.value = http_events.user_agent
+            WHERE value_labels.iot IS NOT NULL
         """ )
-    
     if not iot_clauses:
         return "## IoT Device Analysis\n\nNo relevant columns (DNS/TLS/HTTP) found.\n\n"
 
-    full_query = " UNION ALL ".join(iot_clauses)
+    full_query = f"""
+    SELECT DISTINCT src_ip, type, detail
+    FROM ({" UNION ALL ".join(iot_clauses)})
+    ORDER BY src_ip, type, detail
+    """
     rows = run_query(con, full_query)
     
     output = "## IoT Device Analysis\n\n"
@@ -246,37 +802,40 @@ def find_iot(con, has_http, has_dns, has_tls):
             output += "\n"
     return output
 
+# indicators.LINUX_DOMAINS as ranges of domain_names.reversed_name
+LINUX_ZONES = zones_sql("domain_names.reversed_name", indicators.LINUX_DOMAINS)
+
 def find_linux_hosts(con, has_http, has_dns, has_tls):
     clauses = []
 
     if has_http:
-        clauses.append(f"""
-            SELECT src_ip, 1 as score, http.http_user_agent as evidence
-            FROM logs
-            WHERE event_type = 'http'
-              AND regexp_matches(http.http_user_agent, '(?i){LINUX_UA_REGEX}')
+        clauses.append("""
+            SELECT src_ip, src_private, events as score, user_agent as evidence
+            FROM http_events
+            JOIN value_labels ON value_labels.value = http_events.user_agent
+            WHERE value_labels.linux_ua
         """)
         clauses.append(f"""
-            SELECT src_ip, 2 as score, http.hostname as evidence
-            FROM logs
-            WHERE event_type = 'http'
-              AND regexp_matches(http.hostname, '(?i){LINUX_DOMAINS_REGEX}')
+            SELECT src_ip, src_private, 2 * events as score, hostname as evidence
+            FROM http_events
+            JOIN domain_names ON domain_names.name = http_events.hostname
+            WHERE {LINUX_ZONES}
         """)
 
     if has_tls:
         clauses.append(f"""
-            SELECT src_ip, 2 as score, tls.sni as evidence
-            FROM logs
-            WHERE event_type = 'tls'
-              AND regexp_matches(tls.sni, '(?i){LINUX_DOMAINS_REGEX}')
+            SELECT src_ip, src_private, 2 * events as score, sni as evidence
+            FROM tls_events
+            JOIN domain_names ON domain_names.name = tls_events.sni
+            WHERE {LINUX_ZONES}
         """)
 
     if has_dns:
         clauses.append(f"""
-            SELECT src_ip, 1 as score, q.unnest.rrname as evidence
-            FROM logs, UNNEST(dns.queries) as q
-            WHERE event_type = 'dns'
-              AND regexp_matches(q.unnest.rrname, '(?i){LINUX_DOMAINS_REGEX}')
+            SELECT src_ip, src_private, events as score, rrname as evidence
+            FROM dns_queries
+            JOIN domain_names ON domain_names.name = dns_queries.rrname
+            WHERE {LINUX_ZONES}
         """)
 
     if not clauses:
@@ -291,16 +850,12 @@ def find_linux_hosts(con, has_http, has_dns, has_tls):
     SELECT 
         src_ip, 
         SUM(score) as total_score,
-        LIST(DISTINCT evidence) as evidences
+        LIST(DISTINCT evidence ORDER BY evidence) as evidences
     FROM scored_events
     WHERE src_ip IS NOT NULL 
-      AND (
-        src_ip LIKE '10.%'
-        OR src_ip LIKE '192.168.%'
-        OR (src_ip LIKE '172.%' AND try_cast(split_part(src_ip, '.', 2) as INTEGER) BETWEEN 16 AND 31)
-      )
+      AND src_private
     GROUP BY src_ip
-    ORDER BY total_score DESC
+    ORDER BY total_score DESC, src_ip
     """
     rows = run_query(con, query)
     output = "## Linux Host Analysis\n\n"
@@ -319,19 +874,14 @@ def find_linux_hosts(con, has_http, has_dns, has_tls):
 
 def analyze_flow_pairs(con):
     base_filter = """
-    FROM logs
-    WHERE event_type = 'flow'
-      AND src_ip IS NOT NULL
+    FROM flow_events
+    WHERE src_ip IS NOT NULL
       AND dest_ip IS NOT NULL
-      AND NOT (
-        dest_ip LIKE '10.%'
-        OR dest_ip LIKE '192.168.%'
-        OR (dest_ip LIKE '172.%' AND try_cast(split_part(dest_ip, '.', 2) as INTEGER) BETWEEN 16 AND 31)
-      )
+      AND NOT coalesce(dest_private, false)
     """
 
     top_query = f"""
-    SELECT src_ip, dest_ip, count(*) as flow_count
+    SELECT src_ip, dest_ip, sum(events) as flow_count
     {base_filter}
     GROUP BY src_ip, dest_ip
     ORDER BY flow_count DESC, src_ip, dest_ip
@@ -339,7 +889,7 @@ def analyze_flow_pairs(con):
     """
 
     bottom_query = f"""
-    SELECT src_ip, dest_ip, count(*) as flow_count
+    SELECT src_ip, dest_ip, sum(events) as flow_count
     {base_filter}
     GROUP BY src_ip, dest_ip
     ORDER BY flow_count ASC, src_ip, dest_ip
@@ -368,74 +918,308 @@ def analyze_flow_pairs(con):
 
     return output
 
+# --- Beaconing ---
+# Periodic flows to public addresses, scored per (src_ip, dest_ip,
+# dest_port) by beacons.py. The flow start times of each flow event to a
+# public address are in beacon_flows: a view of `logs` per analysis, or a
+# table filled by the fused scan. Rollups keep one row per day and no
+# per-event times, so with --rollups the section is skipped.
+
+BEACON_LIMIT = 25
+
+def beacon_columns(con, has_ip_flags):
+    # -> {"time": epoch seconds of each flow's start (flow.start, else the
+    # event timestamp), "paths": the columns it reads, "dest_private": SQL
+    # flag} or None without times
+    times = []
+    paths = []
+    for column in ["flow.start", "timestamp"]:
+        try:
+            column_type = con.execute(f"SELECT column_type FROM (DESCRIBE SELECT {column} FROM logs)").fetchone()[0]
+        except duckdb.Error:
+            continue
+        times.append(f"epoch(try_cast({column} AS TIMESTAMPTZ))" if column_type == "VARCHAR" else f"epoch({column})")
+        paths.append(column.replace(".", ", "))
+    if not times:
+        return None
+    return {
+        "time": times[0] if len(times) == 1 else f"coalesce({', '.join(times)})",
+        "paths": paths,
+        "dest_private": "dest_private" if has_ip_flags else private_ip_sql("dest_ip"),
+    }
+
+def beacon_flows_query(beacons, source="logs", time=None):
+    # (src_ip, dest_ip, dest_port, t) of each timed flow event to a public
+    # address; time: a column of `source` holding beacons["time"] already
+    return f"""
+        SELECT src_ip, dest_ip, dest_port, {time or beacons['time']} as t
+        FROM {source}
+        WHERE event_type = 'flow'
+          AND src_ip IS NOT NULL
+          AND dest_ip IS NOT NULL
+          AND dest_port IS NOT NULL
+          AND NOT coalesce({beacons['dest_private']}, false)
+    """
+
+def analyze_beacons(con):
+    # Each series is numbered in (src_ip, dest_ip, dest_port) order; its
+    # flow times come back as NumPy arrays sorted by series and time
+    series = f"""
+    WITH series AS (
+        SELECT src_ip, dest_ip, dest_port, row_number() OVER (ORDER BY src_ip, dest_ip, dest_port) - 1 as id
+        FROM beacon_flows
+        WHERE t IS NOT NULL
+        GROUP BY src_ip, dest_ip, dest_port
+        HAVING count(*) > {MIN_INTERVALS}
+    )
+    """
+    times = run_query(con, f"""
+    {series}
+    SELECT s.id, f.t
+    FROM beacon_flows f JOIN series s USING (src_ip, dest_ip, dest_port)
+    WHERE f.t IS NOT NULL
+    ORDER BY s.id, f.t
+    """, numpy=True)
+
+    output = "## Beaconing Analysis (Public Dest IPs)\n\n"
+    scores = score_series(times["id"], times["t"]) if times else None
+    if not scores or not len(scores["series"]):
+        output += f"No (source, dest, port) series with at least {MIN_INTERVALS} flow intervals.\n\n"
+        return output
+
+    ranked = sorted(range(len(scores["series"])), key=lambda i: (-scores["score"][i], -scores["flows"][i]))[:BEACON_LIMIT]
+    ids = [int(scores["series"][i]) for i in ranked]
+    keys = {r[0]: r[1:] for r in run_query(con, f"""
+    {series}
+    SELECT id, src_ip, dest_ip, dest_port FROM series WHERE id IN ({', '.join(map(str, ids))})
+    """)}
+
+    output += (f"Scored {len(scores['series'])} (source, dest, port) series with at least {MIN_INTERVALS} "
+               f"flow intervals; top {len(ranked)} by score (1 = perfectly periodic).\n\n")
+    output += "| Source | Dest | Port | Flows | Median interval (s) | Jitter | Regularity | Period (s) | Periodicity | Score |\n"
+    output += "|---|---|---|---|---|---|---|---|---|---|\n"
+    for i, series_id in zip(ranked, ids):
+        src_ip, dest_ip, dest_port = keys[series_id]
+        output += (f"| {src_ip} | {dest_ip} | {dest_port} | {scores['flows'][i]} | {scores['median'][i]:.1f} "
+                   f"| {scores['jitter'][i]:.3f} | {scores['regularity'][i]:.2f} | {scores['period'][i]:.1f} "
+                   f"| {scores['periodicity'][i]:.2f} | {scores['score'][i]:.2f} |\n")
+    output += "\n"
+    return output
+
+# --- Report Sections ---
+# Each section is an analysis run on its own; the slices and label tables
+# are built before any of them. With --concurrent the sections run in a
+# thread pool, each on its own cursor, so DuckDB executes their queries side
+# by side within the database's threads/memory_limit budget. Sections are
+# written in report order whichever finishes first.
+
+def report_sections(has_http, has_dns, has_tls, beacons=None, rollups=False):
+    # -> [(name, fn(con) -> markdown)] in report order; a markdown string
+    # instead of fn is written as is. beacons: beacon_columns(), None to
+    # skip the beaconing analysis
+    sections = [("Cloud Analysis", lambda con: analyze_cloud(con, has_dns, has_tls))]
+    if has_dns:
+        sections += [
+            ("Windows DNS Analysis", analyze_windows_dns),
+            ("DNS Exploration", explore_dns),
+            ("DNS Server Extraction", extract_dns_servers),
+        ]
+    else:
+        sections.append(("DNS Analysis", "## DNS Analysis skipped (No DNS data)\n\n"))
+    if has_tls:
+        sections.append(("SNI Extraction", extract_sni))
+    else:
+        sections.append(("TLS Analysis", "## TLS Analysis skipped (No TLS data)\n\n"))
+    sections += [
+        ("IoT Analysis", lambda con: find_iot(con, has_http, has_dns, has_tls)),
+        ("Linux Host Analysis", lambda con: find_linux_hosts(con, has_http, has_dns, has_tls)),
+        ("Flow Pair Analysis", analyze_flow_pairs),
+    ]
+    if beacons is not None:
+        sections.append(("Beaconing Analysis", analyze_beacons))
+    elif rollups:
+        sections.append(("Beaconing Analysis", "## Beaconing Analysis skipped (Rollups keep no per-event flow times)\n\n"))
+    else:
+        sections.append(("Beaconing Analysis", "## Beaconing Analysis skipped (No flow event times)\n\n"))
+    return sections
+
+def run_section(con, name, section, own_cursor=False):
+    # -> (markdown, stats or None)
+    if isinstance(section, str):
+        return section, None
+    print(f"Running {name}...")
+    cursor = con.cursor() if own_cursor else con
+    if own_cursor:
+        enable_profiling(cursor)
+    stats = {"name": name, "queries": 0, "rows_returned": 0, "rows_scanned": 0,
+             "latency": 0.0, "cpu_time": 0.0, "peak_memory": 0}
+    _SECTION.stats = stats
+    start = time.perf_counter()
+    try:
+        with QUERY_PROFILES.section(name):
+            output = section(cursor) + "---\n\n"
+    finally:
+        _SECTION.stats = None
+        if own_cursor:
+            cursor.close()
+    stats["wall_time"] = time.perf_counter() - start
+    return output, stats
+
+def run_sections(con, sections, workers=1):
+    if workers <= 1:
+        return [run_section(con, name, section) for name, section in sections]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_section, con, name, section, True) for name, section in sections]
+        return [future.result() for future in futures]
+
+def apply_budget(con, options):
+    # Database-wide limits, shared by every cursor: --threads=N, --memory-limit=SIZE
+    if options.get("threads"):
+        con.execute(f"SET threads = {int(options['threads'])}")
+    if options.get("memory-limit"):
+        limit = str(options["memory-limit"]).replace("'", "")
+        con.execute(f"SET memory_limit = '{limit}'")
+
+def format_section_timings(results, workers, total_wall, budget):
+    output = "## Section Timings\n\n"
+    mode = f"concurrent, {workers} cursors" if workers > 1 else "sequential"
+    output += f"- Sections: {mode}; {total_wall:.2f}s wall in total\n"
+    output += f"- DuckDB budget: threads={budget[0]}, memory_limit={budget[1]}\n\n"
+    output += "| Section | Wall (s) | DuckDB latency (s) | DuckDB CPU (s) | Queries | Rows returned | Rows scanned | Peak buffer memory |\n"
+    output += "|---|---|---|---|---|---|---|---|\n"
+    for _, stats in results:
+        if stats is None:
+            continue
+        output += (f"| {stats['name']} | {stats['wall_time']:.3f} | {stats['latency']:.3f} | {stats['cpu_time']:.3f} "
+                   f"| {stats['queries']} | {stats['rows_returned']} | {stats['rows_scanned']} "
+                   f"| {format_bytes(stats['peak_memory'])} |\n")
+    output += "\n"
+    return output
+
+def setup_hunt(con, parquet_file, label_cache, fused=False, rollup_dir=None, window=None):
+    # Everything the report sections read: the logs view or the rollups,
+    # the event slices and the value labels, with profiling switched on.
+    # Used by main() and bench.py. -> {has_http, has_dns, has_tls, beacons,
+    # fused_stats, rollup_stats, files_read, data_source, labelled_values}.
+    # Raises ValueError when the source cannot be hunted.
+    hunt = {"fused_stats": None, "rollup_stats": None, "files_read": None, "beacons": None}
+    if rollup_dir:
+        manifest = load_rollup_manifest(rollup_dir)
+        if manifest is None:
+            raise ValueError(f"No rollups in {rollup_dir} (build them with rollup.py).")
+        if window is not None and not whole_days(window):
+            raise ValueError("Rollups hold whole days; use dates with --from/--to.")
+        print(f"Using rollups: {rollup_dir} ({len(manifest['days'])} days)")
+        hunt["data_source"] = rollup_dir
+        hunt["has_http"] = "http_events" in manifest["slices"]
+        hunt["has_dns"] = "dns_queries" in manifest["slices"]
+        hunt["has_tls"] = "tls_events" in manifest["slices"]
+        enable_profiling(con)
+        hunt["rollup_stats"] = create_rollup_slices(con, rollup_dir, manifest, window)
+    else:
+        hunt["data_source"] = parquet_file
+        print(f"Using data file: {parquet_file}")
+        files_read = hunt["files_read"] = create_logs_view(con, parquet_file, window)
+        if window is not None:
+            print(f"Window {format_window(window)}: reading {len(files_read)} of "
+                  f"{len(glob.glob(parquet_glob(parquet_file), recursive=True))} files")
+            if not files_read:
+                raise ValueError("No Parquet files hold events in the window.")
+
+        # Check columns
+        columns = [r[0] for r in con.execute("DESCRIBE logs").fetchall()]
+        hunt["has_http"] = 'http' in columns
+        hunt["has_dns"] = 'dns' in columns
+        hunt["has_tls"] = 'tls' in columns
+        has_ip_flags = 'src_private' in columns and 'dest_private' in columns
+
+        beacons = hunt["beacons"] = beacon_columns(con, has_ip_flags)
+
+        print(f"Schema Check: HTTP={hunt['has_http']}, DNS={hunt['has_dns']}, TLS={hunt['has_tls']}, "
+              f"IP flags={has_ip_flags}, flow times={beacons is not None}")
+
+        enable_profiling(con)
+        if fused:
+            print("Fused mode: reading dns/tls/http/flow slices in a single scan...")
+            hunt["fused_stats"] = create_fused_slices(con, parquet_file, hunt["has_http"], hunt["has_dns"], hunt["has_tls"],
+                                                      has_ip_flags, files_read if window is not None else None, beacons)
+        else:
+            create_slices(con, hunt["has_http"], hunt["has_dns"], hunt["has_tls"], has_ip_flags, beacons)
+
+    hunt["labelled_values"] = create_value_labels(con, label_cache, hunt["has_http"], hunt["has_dns"], hunt["has_tls"])
+    return hunt
+
 def main():
-    parquet_file = get_parquet_file(sys.argv)
-    if not parquet_file:
-        print("Usage: python duck_hunt.py <parquet_file_or_logs_dir>")
+    args, options = parse_args(sys.argv[1:], VALUE_OPTIONS)
+    fused = bool(options.get("fused"))
+    workers = options.get("concurrent")
+    if workers is True:
+        workers = DEFAULT_CONCURRENCY
+    workers = max(1, int(workers or 1))
+    profile_path = options.get("profile")
+    QUERY_PROFILES.enabled = bool(profile_path)
+    try:
+        window = parse_window(options)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    parquet_file = get_parquet_file(args)
+    rollup_dir = options.get("rollups")
+    if rollup_dir is True:
+        rollup_dir = default_rollup_dir(parquet_file) if parquet_file else None
+    if not parquet_file and not rollup_dir:
+        print("Usage: python duck_hunt.py <parquet_file_or_logs_dir_or_dataset_dir> [--fused] [--rollups[=DIR]] [--label-cache[=PATH]]")
+        print("       [--concurrent[=N]] [--threads=N] [--memory-limit=SIZE] [--profile[=PATH]]")
+        print("       [--from=DATE_OR_TIME] [--to=DATE_OR_TIME] [--last=DURATION]")
         print("Error: No .parquet file found in provided path.")
         sys.exit(1)
-        
-    print(f"Using data file: {parquet_file}")
-    
+
     con = duckdb.connect(database=':memory:')
-    con.execute(f"CREATE VIEW logs AS SELECT * FROM read_parquet('{parquet_file}')")
-    
-    # Check columns
-    columns = [r[0] for r in con.execute("DESCRIBE logs").fetchall()]
-    has_http = 'http' in columns
-    has_dns = 'dns' in columns
-    has_tls = 'tls' in columns
-    
-    print(f"Schema Check: HTTP={has_http}, DNS={has_dns}, TLS={has_tls}")
+    apply_budget(con, options)
+    label_cache = cache_option(options)
+    try:
+        hunt = setup_hunt(con, parquet_file, label_cache, fused, rollup_dir, window)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    label_cache.save()
+    fused_stats, rollup_stats, files_read = hunt["fused_stats"], hunt["rollup_stats"], hunt["files_read"]
+    data_source = hunt["data_source"]
     
     now = datetime.datetime.now()
     report_filename = f"duckhunt-{now.strftime('%y-%m-%d-%H-%M')}.md"
+    if profile_path is True:
+        profile_path = default_profile_path(report_filename)
     os.makedirs("example_reports", exist_ok=True)
     
     print(f"Running analyses and writing to {report_filename}...")
-    
+    sections = report_sections(hunt["has_http"], hunt["has_dns"], hunt["has_tls"], hunt["beacons"], rollup_stats is not None)
+    start = time.perf_counter()
+    results = run_sections(con, sections, workers)
+    total_wall = time.perf_counter() - start
+    budget = con.execute("SELECT current_setting('threads'), current_setting('memory_limit')").fetchone()
+    bytes_scanned = None
+    if not fused and rollup_stats is None:
+        bytes_scanned = views_bytes_scanned(con, files_read if window is not None else parquet_glob(parquet_file))
+
     with open(report_filename, 'w') as f:
         f.write(f"# Analyst Log - {now.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        f.write(f"Data Source: `{parquet_file}`\n\n")
-        
-        print("Running Cloud Analysis...")
-        f.write(analyze_cloud(con, has_dns, has_tls))
-        f.write("---\n\n")
-        
-        if has_dns:
-            print("Running Windows DNS Analysis...")
-            f.write(analyze_windows_dns(con))
-            f.write("---\n\n")
-            
-            print("Running DNS Exploration...")
-            f.write(explore_dns(con))
-            f.write("---\n\n")
-            
-            print("Running DNS Server Extraction...")
-            f.write(extract_dns_servers(con))
-            f.write("---\n\n")
-        else:
-            f.write("## DNS Analysis skipped (No DNS data)\n\n")
+        f.write(f"Data Source: `{data_source}`\n\n")
+        if window is not None:
+            scope = f"{rollup_stats['days']} days" if rollup_stats is not None else f"{len(files_read)} files"
+            f.write(f"Window: {format_window(window)} ({scope})\n\n")
+        for output, _ in results:
+            f.write(output)
 
-        if has_tls:
-            print("Running SNI Extraction...")
-            f.write(extract_sni(con))
-            f.write("---\n\n")
-        else:
-             f.write("## TLS Analysis skipped (No TLS data)\n\n")
-        
-        print("Running IoT Analysis...")
-        f.write(find_iot(con, has_http, has_dns, has_tls))
-        f.write("---\n\n")
-        
-        print("Running Linux Host Analysis...")
-        f.write(find_linux_hosts(con, has_http, has_dns, has_tls))
-        f.write("---\n\n")
+        f.write(format_section_timings(results, workers, total_wall, budget))
+        f.write(format_scan_summary(fused, fused_stats, label_cache, hunt["labelled_values"], rollup_stats, bytes_scanned))
+        if profile_path:
+            f.write(QUERY_PROFILES.format_appendix(profile_path))
+
+    if profile_path:
+        QUERY_PROFILES.save(profile_path, report=report_filename, source=data_source)
+        print(f"Query profiles written to {profile_path}")
 
-        print("Running Flow Pair Analysis...")
-        f.write(analyze_flow_pairs(con))
-        f.write("---\n\n")
-    
     print("Done.")
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+import sys
+import orjson
+from functools import partial
+from eve_reader import count_lines, open_eve
+from eve_scan import scan
+from prefilter import LinePrefilter
+
+# Single-pass engine for the orjson hunts. Each line is parsed once and the
+# record is handed to every registered detector that wants its event_type,
+# so running all hunts over a log costs one parse instead of one per script.
+#
+# A detector provides:
+#   event_types              set of event_type values it wants, or None for all
+#   needles                  optional byte strings (prefilter.needle()) of
+#                            which a line must hold one to be decoded for it
+#   init()                   -> new empty state
+#   update(state, record)    fold one record into the state (in place)
+#   merge(state, other)      -> state; combines the states of two byte
+#                            ranges when scanning in parallel (eve_scan.py)
+#   finalize(state, totals)  print or write the report; totals counts the
+#                            lines and decoded records of the whole run
+#   checkpoint_key()         names the state in follow-mode checkpoints
+#                            (eve_follow.py); the class name unless the
+#                            state depends on settings
+#
+# Unless every line is wanted, the raw bytes are searched with
+# prefilter.LinePrefilter first and only candidate lines are decoded; the rest
+# are counted as skipped.
+
+
+# Stop prefiltering a range once a chunk keeps more than this share of lines
+MAX_CANDIDATE_RATIO = 0.5
+
+
+class Detector:
+    event_types = None
+    needles = None
+
+    def init(self):
+        raise NotImplementedError
+
+    def update(self, state, record):
+        raise NotImplementedError
+
+    def merge(self, state, other):
+        raise NotImplementedError
+
+    def finalize(self, state, totals):
+        raise NotImplementedError
+
+    def checkpoint_key(self):
+        return type(self).__name__
+
+
+def new_totals():
+    return {"lines": 0, "records": 0, "skipped": 0}
+
+
+class ChunkScanner:
+    # Feeds chunks of whole lines to the detectors, keeping their states and
+    # the totals; used for byte ranges here and for live files (eve_follow.py)
+    def __init__(self, detectors, states=None, totals=None, prefilter=True):
+        self.detectors = detectors
+        self.states = [d.init() for d in detectors] if states is None else states
+        self.totals = new_totals() if totals is None else totals
+        self.line_filter = LinePrefilter(detectors) if prefilter else None
+        if self.line_filter is not None and not self.line_filter.active:
+            self.line_filter = None
+        # event_type -> [detector update bound to its state], filled on first
+        # sight of each type
+        self.routes = {}
+
+    def route(self, event_type):
+        updates = self.routes[event_type] = [
+            partial(d.update, s) for d, s in zip(self.detectors, self.states)
+            if d.event_types is None or event_type in d.event_types
+        ]
+        return updates
+
+    def dispatch(self, lines):
+        # Decodes each line and hands the record to the detectors that want
+        # it; -> number of lines decoded. Called once per chunk, so the loop
+        # only touches locals.
+        loads = orjson.loads
+        decode_error = orjson.JSONDecodeError
+        routes = self.routes
+        records = 0
+        decoded = 0
+        if len(self.detectors) == 1 and self.detectors[0].event_types is None:
+            # One detector that takes every record: no routing
+            update = partial(self.detectors[0].update, self.states[0])
+            for line in lines:
+                if not line:
+                    continue
+                decoded += 1
+                try:
+                    record = loads(line)
+                except decode_error:
+                    continue
+                if type(record) is dict:
+                    records += 1
+                    update(record)
+        else:
+            for line in lines:
+                if not line:
+                    continue
+                decoded += 1
+                try:
+                    record = loads(line)
+                except decode_error:
+                    continue
+                if type(record) is not dict:
+                    continue
+                records += 1
+                event_type = record.get("event_type")
+                updates = routes.get(event_type)
+                if updates is None:
+                    updates = self.route(event_type)
+                for update in updates:
+                    update(record)
+        self.totals["records"] += records
+        return decoded
+
+    def feed(self, chunk):
+        lines = count_lines(chunk)
+        self.totals["lines"] += lines
+        if self.line_filter is None:
+            self.dispatch(chunk.split(b'\n'))
+            return
+        decoded = self.dispatch(self.line_filter.candidates(chunk))
+        self.totals["skipped"] += lines - decoded
+        if decoded > lines * MAX_CANDIDATE_RATIO:
+            # Most lines are wanted: searching costs more than it saves
+            self.line_filter = None
+
+
+def scan_range(path, start, end, detectors, prefilter=True, labels=None):
+    # labels arrives from eve_scan for syncing; detectors hold their own reference
+    scanner = ChunkScanner(detectors, prefilter=prefilter)
+    try:
+        with open_eve(path) as eve:
+            for chunk in eve.chunks(start, end):
+                scanner.feed(chunk)
+    except Exception as e:
+        print(f"Error processing {path}: {e}", file=sys.stderr)
+    return scanner.totals, scanner.states
+
+
+def merge_ranges(detectors, total, other):
+    totals, states = total
+    other_totals, other_states = other
+    for key, value in other_totals.items():
+        totals[key] += value
+    states = [d.merge(s, o) for d, s, o in zip(detectors, states, other_states)]
+    return totals, states
+
+
+def scan_detectors(detectors, paths, jobs=1, labels=None, prefilter=True):
+    # -> (totals, [state per detector])
+    result = scan(paths, scan_range, partial(merge_ranges, detectors),
+                  jobs=jobs, args=(detectors, prefilter), labels=labels)
+    if result is None:
+        return new_totals(), [d.init() for d in detectors]
+    return result
+
+
+def run(detectors, paths, jobs=1, labels=None):
+    totals, states = scan_detectors(detectors, paths, jobs, labels)
+    for detector, state in zip(detectors, states):
+        detector.finalize(state, totals)
+    if labels is not None:
+        labels.save()
+    return totals
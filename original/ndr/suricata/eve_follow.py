@@ -0,0 +1,275 @@
+import os
+import re
+import sys
+import time
+import pickle
+import signal
+import datetime
+from eve_engine import ChunkScanner
+
+# Follow mode for the orjson hunts: tails a live eve.json, folds new lines
+# into the detectors' states as they are written and reprints their reports
+# every interval. The states, totals and read position are checkpointed to
+# disk (pickle, replaced atomically), so a restart resumes where the last
+# run stopped instead of rescanning the file.
+#
+# Rotation is detected by the file's inode changing under the followed name:
+# the old file is read to its end, then the new one from its start. A file
+# that shrinks below the read position was truncated in place (logrotate
+# copytruncate) and is read again from the start. When the checkpoint's file
+# was rotated while nothing was following it, its remainder is read from the
+# rotated name if that is still in the same directory (eve.json.1).
+
+CHECKPOINT_VERSION = 1
+# Seconds between reports and checkpoints
+DEFAULT_INTERVAL = 60
+# Seconds to wait for new data at the end of the file
+POLL_SECONDS = 1.0
+READ_BYTES = 4 * 1024 * 1024
+
+
+# Options of follow_option() that take a value (cli.parse_args)
+FOLLOW_OPTIONS = {"checkpoint", "interval"}
+
+
+def follow_option(options):
+    # --follow, --once, --checkpoint=PATH and --interval=SECONDS -> follow
+    # options, or None when not following. --once catches up with the file,
+    # checkpoints and exits. The checkpoint defaults to
+    # follow_<detectors>.checkpoint in the working directory.
+    if not (options.get("follow") or options.get("once")):
+        return None
+    follow_options = {"once": bool(options.get("once"))}
+    if "checkpoint" in options:
+        follow_options["checkpoint"] = options["checkpoint"]
+    if "interval" in options:
+        follow_options["interval"] = float(options["interval"])
+    return follow_options
+
+
+def detector_names(detectors):
+    return [d.checkpoint_key() for d in detectors]
+
+
+def load_checkpoint(path, detectors):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        checkpoint = pickle.load(f)
+    if checkpoint.get("version") != CHECKPOINT_VERSION or checkpoint.get("detectors") != detector_names(detectors):
+        print(f"Ignoring checkpoint {path}: written for other detectors", file=sys.stderr)
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def find_rotated(path, dev, inode):
+    # -> the path now holding the file (dev, inode) in path's directory
+    directory = os.path.dirname(os.path.abspath(path))
+    for name in sorted(os.listdir(directory)):
+        candidate = os.path.join(directory, name)
+        try:
+            st = os.stat(candidate)
+        except OSError:
+            continue
+        if (st.st_dev, st.st_ino) == (dev, inode):
+            return candidate
+    return None
+
+
+class Follower:
+    def __init__(self, detectors, path, checkpoint_path=None, labels=None):
+        self.detectors = detectors
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.labels = labels
+        self.file = None
+        self.dev = self.inode = None
+        # Bytes of the current file folded into the states (whole lines)
+        self.offset = 0
+        # Partial last line, waiting for its newline
+        self.tail = b""
+        # An interrupt arrived while a chunk was being folded in (see fold)
+        self.folding = False
+        self.interrupted = False
+
+        checkpoint = load_checkpoint(checkpoint_path, detectors)
+        if checkpoint is None:
+            self.scanner = ChunkScanner(detectors)
+            return
+        self.scanner = ChunkScanner(detectors, checkpoint["states"], checkpoint["totals"])
+        self.dev, self.inode, self.offset = checkpoint["dev"], checkpoint["inode"], checkpoint["offset"]
+        print(f"Resuming from {checkpoint_path} ({checkpoint['totals']['lines']} lines, "
+              f"byte {self.offset}, saved {checkpoint['saved']})")
+
+    def open_current(self):
+        # Opens the followed name; False when it does not exist right now
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        st = os.fstat(f.fileno())
+        if (st.st_dev, st.st_ino) != (self.dev, self.inode):
+            if self.inode is not None and self.file is None:
+                self.finish_rotated()
+            self.dev, self.inode, self.offset = st.st_dev, st.st_ino, 0
+        elif st.st_size < self.offset:
+            print(f"{self.path} was truncated, reading it from the start")
+            self.offset = 0
+        f.seek(self.offset)
+        self.file = f
+        self.tail = b""
+        return True
+
+    def finish_rotated(self):
+        # The checkpointed file was rotated while nothing followed it
+        rotated = find_rotated(self.path, self.dev, self.inode)
+        if rotated is None:
+            print(f"Checkpointed file is gone; data written to it after byte {self.offset} was missed")
+            return
+        print(f"Finishing rotated file {rotated} from byte {self.offset}")
+        with open(rotated, 'rb') as f:
+            f.seek(self.offset)
+            self.read_available(f)
+        self.flush_tail()
+
+    def read_available(self, f):
+        # Folds everything readable from f into the states -> bytes read
+        total = 0
+        while True:
+            data = f.read(READ_BYTES)
+            if not data:
+                return total
+            total += len(data)
+            data = self.tail + data
+            cut = data.rfind(b'\n')
+            if cut < 0:
+                self.tail = data
+                continue
+            self.fold(data[:cut + 1])
+            self.tail = data[cut + 1:]
+
+    def flush_tail(self):
+        # The file is finished, so an unterminated last line is complete
+        if self.tail:
+            self.fold(self.tail)
+            self.tail = b""
+
+    def fold(self, data):
+        # Feeds whole lines to the states and moves the offset past them as
+        # one step: a checkpoint taken after an interrupt must not hold
+        # states that counted lines its offset would read again
+        self.folding = True
+        try:
+            self.scanner.feed(data)
+            self.offset += len(data)
+        finally:
+            self.folding = False
+        if self.interrupted:
+            raise KeyboardInterrupt
+
+    def interrupt(self, signum, frame):
+        # SIGINT/SIGTERM: stop now, or after the chunk being folded in
+        if self.folding:
+            self.interrupted = True
+        else:
+            raise KeyboardInterrupt
+
+    def check_rotation(self):
+        # At the end of the current file: switch files if the name moved on
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Renamed away, not re-created yet: keep reading the old file
+            return
+        if (st.st_dev, st.st_ino) != (self.dev, self.inode):
+            # Anything written to the old file before the switch
+            self.read_available(self.file)
+            self.flush_tail()
+            self.file.close()
+            self.file = None
+            self.dev = self.inode = None
+            print(f"{self.path} was rotated, following the new file")
+        elif st.st_size < self.offset + len(self.tail):
+            print(f"{self.path} was truncated, reading it from the start")
+            self.file.seek(0)
+            self.offset = 0
+            self.tail = b""
+
+    def checkpoint(self):
+        if self.labels is not None:
+            self.labels.save()
+        if not self.checkpoint_path:
+            return
+        save_checkpoint(self.checkpoint_path, {
+            "version": CHECKPOINT_VERSION,
+            "detectors": detector_names(self.detectors),
+            "path": os.path.abspath(self.path),
+            "dev": self.dev,
+            "inode": self.inode,
+            "offset": self.offset,
+            "totals": self.scanner.totals,
+            "states": self.scanner.states,
+            "saved": datetime.datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def report(self):
+        totals = self.scanner.totals
+        stamp = datetime.datetime.now().isoformat(timespec="seconds")
+        print(f"\n===== {stamp}: {totals['lines']} lines ({totals['records']} records) =====\n")
+        for detector, state in zip(self.detectors, self.scanner.states):
+            detector.finalize(state, totals)
+        sys.stdout.flush()
+
+    def run(self, interval=DEFAULT_INTERVAL, once=False):
+        if once and not os.path.isfile(self.path):
+            print(f"Error: File {self.path} not found.")
+            return
+        # SIGTERM (systemd, docker stop) ends the loop like Ctrl-C
+        handlers = {signum: signal.signal(signum, self.interrupt) for signum in (signal.SIGINT, signal.SIGTERM)}
+        last_report = time.monotonic()
+        try:
+            while True:
+                if self.file is None and not self.open_current():
+                    # Between rename and re-create
+                    time.sleep(POLL_SECONDS)
+                    continue
+                if self.read_available(self.file):
+                    continue
+                if once:
+                    break
+                now = time.monotonic()
+                if now - last_report >= interval:
+                    self.checkpoint()
+                    self.report()
+                    last_report = now
+                self.check_rotation()
+                time.sleep(POLL_SECONDS)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.checkpoint()
+            if self.file is not None:
+                self.file.close()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.report()
+
+
+def default_checkpoint(detectors):
+    name = re.sub(r"[^A-Za-z0-9.-]+", "_", "-".join(detector_names(detectors))).strip("_")
+    return f"follow_{name}.checkpoint"
+
+
+def follow(detectors, path, options, labels=None):
+    checkpoint_path = options.get("checkpoint") or default_checkpoint(detectors)
+    Follower(detectors, path, checkpoint_path, labels).run(
+        options.get("interval", DEFAULT_INTERVAL), options["once"])
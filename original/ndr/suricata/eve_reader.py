@@ -0,0 +1,215 @@
+import bz2
+import gzip
+import mmap
+import os
+import shutil
+import subprocess
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Memory-mapped reader for EVE files. The file is mapped read-only and cut
+# into chunks that begin and end on line boundaries; chunk bounds come from
+# a find() on the mapping, so splitting a file for parallel work reads no
+# data. Consumers take a chunk either as one bytes object (for byte-level
+# searches such as prefilter.py) or as a batch of lines split in C.
+#
+# Each chunk is copied out of the mapping: every consumer (prefilter.py,
+# orjson, Polars) needs bytes rather than a view, and the copy lets the
+# chunk's pages be dropped from the process once it has been handed out, so
+# scanning a file much larger than memory keeps a flat resident size. The
+# copy costs one memcpy per chunk, well below the parsing that follows.
+#
+# Rotated logs compressed with gzip, zstd or bz2 (recognised by their magic
+# number, not their name) are read through EveStream instead, which offers
+# the same chunks()/batches() over the decompressed data. A compressed file
+# is read from the start in one pass, so it is never split for parallel work.
+# Decompression runs in an external tool when one is installed, so it
+# overlaps the parsing in another process; pigz, lbzip2 and pbzip2 also
+# decompress on several cores.
+
+CHUNK_BYTES = 1024 * 1024
+
+MAGIC_NUMBERS = [
+    (b"\x1f\x8b", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"BZh", "bz2"),
+]
+
+# False decompresses in-process with the gzip/bz2/zstandard modules
+USE_TOOLS = True
+# Decompression tools in order of preference
+DECOMPRESS_TOOLS = {
+    "gzip": [["pigz", "-dc"], ["gzip", "-dc"]],
+    "zstd": [["zstd", "-dcq"]],
+    "bz2": [["lbzip2", "-dc"], ["pbzip2", "-dc"], ["bzip2", "-dc"]],
+}
+
+
+def detect_compression(path):
+    # -> "gzip", "zstd", "bz2" or None
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    for magic, name in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_eve(path):
+    # -> EveMap for plain files, EveStream for compressed ones
+    compression = detect_compression(path)
+    if compression is None:
+        return EveMap(path)
+    return EveStream(path, compression)
+
+
+def split_batch(chunk):
+    # Lines of a chunk, without newlines
+    lines = chunk.split(b'\n')
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+class EveMap:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.size = os.fstat(f.fileno()).st_size
+            # mmap refuses empty files
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        if self.size and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self.buf.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+
+    def line_end(self, pos):
+        # -> offset just past the line holding pos
+        nl = self.buf.find(b'\n', pos)
+        return self.size if nl < 0 else nl + 1
+
+    def chunk_bounds(self, start=0, end=None, chunk_bytes=CHUNK_BYTES):
+        # -> [(start, end)] covering the lines that start in [start, end)
+        end = self.size if end is None else min(end, self.size)
+        if start and start < end:
+            # A start inside a line begins at the next line, as the chunk
+            # before it owns that line
+            start = self.line_end(start - 1)
+        if 0 < end < self.size:
+            end = self.line_end(end - 1)
+        bounds = []
+        while start < end:
+            cut = end if end - start <= chunk_bytes else min(end, self.line_end(start + chunk_bytes - 1))
+            bounds.append((start, cut))
+            start = cut
+        return bounds
+
+    def release(self, start, end):
+        if isinstance(self.buf, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED"):
+            start -= start % mmap.PAGESIZE
+            self.buf.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def chunks(self, start=0, end=None, chunk_bytes=CHUNK_BYTES):
+        # Yields each chunk as bytes, copied out of the mapping
+        for chunk_start, chunk_end in self.chunk_bounds(start, end, chunk_bytes):
+            chunk = self.buf[chunk_start:chunk_end]
+            self.release(chunk_start, chunk_end)
+            yield chunk
+
+    def batches(self, start=0, end=None, chunk_bytes=CHUNK_BYTES):
+        # Yields the lines of each chunk as a list of bytes, without newlines
+        for chunk in self.chunks(start, end, chunk_bytes):
+            yield split_batch(chunk)
+
+
+class EveStream:
+    # Offsets are positions in the decompressed data
+    def __init__(self, path, compression, tool=None):
+        self.path = path
+        self.compression = compression
+        self.size = None
+        self.process = None
+        if tool is None:
+            tool = USE_TOOLS
+        command = find_tool(compression) if tool else None
+        if command is not None:
+            self.process = subprocess.Popen(command + [path], stdout=subprocess.PIPE)
+            self.stream = self.process.stdout
+        elif compression == "gzip":
+            self.stream = gzip.open(path, 'rb')
+        elif compression == "bz2":
+            self.stream = bz2.open(path, 'rb')
+        elif zstandard is not None:
+            self.stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+        else:
+            raise RuntimeError(f"{path} is zstd-compressed: install the zstandard module or the zstd tool")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.stream.close()
+        if self.process is not None:
+            if self.process.poll() is None:
+                # Stopped early: the tool would block on a full pipe
+                self.process.kill()
+            self.process.wait()
+
+    def read(self, size):
+        data = self.stream.read(size)
+        if not data and self.process is not None and self.process.wait():
+            raise RuntimeError(f"Decompressing {self.path} failed (exit code {self.process.returncode})")
+        return data
+
+    def chunks(self, start=0, end=None, chunk_bytes=CHUNK_BYTES):
+        # Yields chunks of whole lines from start on. end is not supported:
+        # the data is only known once decompressed.
+        while start > 0:
+            skipped = self.read(min(start, chunk_bytes))
+            if not skipped:
+                return
+            start -= len(skipped)
+        tail = b""
+        while True:
+            data = self.read(chunk_bytes)
+            if not data:
+                break
+            cut = data.rfind(b'\n')
+            if cut < 0:
+                tail += data
+                continue
+            yield tail + data[:cut + 1]
+            tail = data[cut + 1:]
+        if tail:
+            yield tail
+
+    def batches(self, start=0, end=None, chunk_bytes=CHUNK_BYTES):
+        for chunk in self.chunks(start, end, chunk_bytes):
+            yield split_batch(chunk)
+
+
+def find_tool(compression):
+    for command in DECOMPRESS_TOOLS[compression]:
+        if shutil.which(command[0]):
+            return command
+    return None
+
+
+def count_lines(chunk):
+    if not chunk:
+        return 0
+    return chunk.count(b'\n') + (not chunk.endswith(b'\n'))
@@ -0,0 +1,105 @@
+import os
+import multiprocessing
+from eve_reader import EveMap, detect_compression, open_eve
+
+# Parallel scanning for the orjson EVE scripts. Input files are cut into byte
+# ranges that begin and end on line boundaries (a large file gives several
+# ranges). A process pool runs the script's range function on each range and
+# the parent merges the partial results back in input order, so the output
+# matches a sequential scan.
+#
+# A range function is called as fn(path, start, end, *args[, labels=cache])
+# and returns a partial result built from the lines starting in [start, end),
+# read with iter_lines() or eve_reader.open_eve().
+# merge(total, partial) folds a partial result into the running total.
+
+CHUNK_BYTES = 64 * 1024 * 1024
+MIN_CHUNK_BYTES = 1024 * 1024
+# Ranges per worker, so uneven ranges still balance across the pool
+RANGES_PER_JOB = 4
+
+
+def jobs_option(options):
+    # --jobs[=N] -> number of jobs. A bare --jobs uses every core.
+    jobs = options.get("jobs")
+    if jobs is None:
+        return 1
+    if jobs is True:
+        return os.cpu_count() or 1
+    return max(1, int(jobs))
+
+
+def split_ranges(paths, jobs, chunk_bytes=CHUNK_BYTES):
+    # -> [(path, start, end)] with end=None meaning "to end of file"
+    if jobs <= 1:
+        return [(path, 0, None) for path in paths]
+    sizes = {}
+    for path in paths:
+        try:
+            sizes[path] = os.path.getsize(path)
+        except OSError:
+            sizes[path] = None
+    total = sum(size or 0 for size in sizes.values())
+    chunk = max(MIN_CHUNK_BYTES, min(chunk_bytes, total // (jobs * RANGES_PER_JOB)))
+
+    ranges = []
+    for path in paths:
+        size = sizes[path]
+        if not size or size <= chunk or detect_compression(path):
+            # Unreadable files are left to the range function to report;
+            # compressed files can only be read from the start
+            ranges.append((path, 0, None))
+            continue
+        # Cuts are found in the mapping, without reading the data
+        with EveMap(path) as eve:
+            ranges += [(path, start, end) for start, end in eve.chunk_bounds(chunk_bytes=chunk)]
+    return ranges
+
+
+def iter_lines(path, start=0, end=None):
+    # Lines starting in [start, end), without their newlines
+    with open_eve(path) as eve:
+        for batch in eve.batches(start, end):
+            yield from batch
+
+
+_WORKER = {}
+
+
+def _init_worker(fn, args, labels):
+    if labels is not None:
+        labels.track_new()
+    _WORKER.update(fn=fn, args=args, labels=labels)
+
+
+def _run_range(task):
+    path, start, end = task
+    labels = _WORKER["labels"]
+    if labels is None:
+        return _WORKER["fn"](path, start, end, *_WORKER["args"]), None
+    partial = _WORKER["fn"](path, start, end, *_WORKER["args"], labels=labels)
+    # Send newly classified values back so the parent can persist them
+    return partial, labels.drain_new()
+
+
+def scan(paths, fn, merge, jobs=1, args=(), labels=None):
+    # -> merged result, or None when there is nothing to scan
+    ranges = split_ranges(paths, jobs)
+    result = None
+    if jobs <= 1 or len(ranges) <= 1:
+        for path, start, end in ranges:
+            if labels is None:
+                partial = fn(path, start, end, *args)
+            else:
+                partial = fn(path, start, end, *args, labels=labels)
+            result = partial if result is None else merge(result, partial)
+        return result
+
+    with multiprocessing.Pool(min(jobs, len(ranges)), initializer=_init_worker,
+                              initargs=(fn, args, labels)) as pool:
+        # imap keeps input order, which keeps the merge deterministic
+        for partial, new_labels in pool.imap(_run_range, ranges):
+            if new_labels:
+                labels.absorb(new_labels)
+            result = partial if result is None else merge(result, partial)
+    return result
@@ -0,0 +1,340 @@
+import io
+import orjson
+import polars as pl
+import ipnet
+
+# Explicit Suricata EVE schema used by j2p.py instead of row-sampling
+# inference. Add a field here (and bump EVE_SCHEMA_VERSION) when a hunt
+# needs it typed. Other top-level fields (ssh, smb, fileinfo, the stats
+# payload, ...) are stored as their JSON text when the caller names them in
+# `extra` (j2p.py finds them in a sample of each input), and the nested
+# fields in NESTED_JSON_TEXT likewise; anything else is dropped.
+#
+# RAW_SCHEMA is what the NDJSON reader parses; it only uses types the reader
+# supports (String/Int64/Float64/Boolean). normalize() then narrows it to
+# the stored types: UTC datetimes, categoricals, unsigned ports/counters,
+# and numeric forms of src_ip/dest_ip with private-address flags.
+#
+# The reader is given READ_SCHEMA, where the nested (struct and list)
+# columns of RAW_SCHEMA are strings holding their JSON text, and normalize()
+# decodes them. The reader fills in every declared nested field of every
+# row, absent or not, which made parsing these columns several times slower
+# than decoding their text afterwards.
+
+EVE_SCHEMA_VERSION = 3
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S%.f%z"
+
+# Low-cardinality strings stored dictionary-encoded
+CATEGORICAL_COLUMNS = ["event_type", "proto", "app_proto", "direction", "pkt_src"]
+
+_DNS_RR = pl.Struct({
+    "rrname": pl.String,
+    "rrtype": pl.String,
+    "ttl": pl.Int64,
+    "rdata": pl.String,
+})
+
+RAW_SCHEMA = {
+    "timestamp": pl.String,
+    "flow_id": pl.Int64,
+    "pcap_cnt": pl.Int64,
+    "in_iface": pl.String,
+    "event_type": pl.String,
+    "vlan": pl.List(pl.Int64),
+    "src_ip": pl.String,
+    "src_port": pl.Int64,
+    "dest_ip": pl.String,
+    "dest_port": pl.Int64,
+    "proto": pl.String,
+    "pkt_src": pl.String,
+    "icmp_type": pl.Int64,
+    "icmp_code": pl.Int64,
+    "app_proto": pl.String,
+    "community_id": pl.String,
+    "tx_id": pl.Int64,
+    "direction": pl.String,
+    "host": pl.String,
+    "dns": pl.Struct({
+        "version": pl.Int64,
+        "type": pl.String,
+        "id": pl.Int64,
+        "flags": pl.String,
+        "qr": pl.Boolean,
+        "rd": pl.Boolean,
+        "ra": pl.Boolean,
+        "aa": pl.Boolean,
+        "tc": pl.Boolean,
+        "opcode": pl.Int64,
+        "rcode": pl.String,
+        "tx_id": pl.Int64,
+        # Legacy (v1/v2 query records) single-name form
+        "rrname": pl.String,
+        "rrtype": pl.String,
+        "queries": pl.List(pl.Struct({"rrname": pl.String, "rrtype": pl.String})),
+        "answers": pl.List(_DNS_RR),
+        "authorities": pl.List(_DNS_RR),
+        "grouped": pl.Struct({
+            "A": pl.List(pl.String),
+            "AAAA": pl.List(pl.String),
+            "CNAME": pl.List(pl.String),
+            "PTR": pl.List(pl.String),
+            "MX": pl.List(pl.String),
+            "TXT": pl.List(pl.String),
+        }),
+    }),
+    "tls": pl.Struct({
+        "sni": pl.String,
+        "subject": pl.String,
+        "issuerdn": pl.String,
+        "serial": pl.String,
+        "fingerprint": pl.String,
+        "version": pl.String,
+        "notbefore": pl.String,
+        "notafter": pl.String,
+        "session_resumed": pl.Boolean,
+        "ja3": pl.Struct({"hash": pl.String, "string": pl.String}),
+        "ja3s": pl.Struct({"hash": pl.String, "string": pl.String}),
+        "ja4": pl.String,
+    }),
+    "quic": pl.Struct({
+        "version": pl.String,
+        "sni": pl.String,
+        "ua": pl.String,
+    }),
+    "http": pl.Struct({
+        "hostname": pl.String,
+        "http_port": pl.Int64,
+        "url": pl.String,
+        "http_user_agent": pl.String,
+        "http_content_type": pl.String,
+        "http_refer": pl.String,
+        "http_method": pl.String,
+        "protocol": pl.String,
+        "status": pl.Int64,
+        "length": pl.Int64,
+    }),
+    "flow": pl.Struct({
+        "pkts_toserver": pl.Int64,
+        "pkts_toclient": pl.Int64,
+        "bytes_toserver": pl.Int64,
+        "bytes_toclient": pl.Int64,
+        "start": pl.String,
+        "end": pl.String,
+        "age": pl.Int64,
+        "state": pl.String,
+        "reason": pl.String,
+        "alerted": pl.Boolean,
+    }),
+    "alert": pl.Struct({
+        "action": pl.String,
+        "gid": pl.Int64,
+        "signature_id": pl.Int64,
+        "rev": pl.Int64,
+        "signature": pl.String,
+        "category": pl.String,
+        "severity": pl.Int64,
+    }),
+}
+
+READ_SCHEMA = {name: pl.String if dtype.is_nested() else dtype for name, dtype in RAW_SCHEMA.items()}
+
+# Nested fields whose keys vary per rule or sensor, kept as JSON text
+NESTED_JSON_TEXT = [("alert", "metadata"), ("alert", "source"), ("alert", "target")]
+
+
+def read_schema(extra=()):
+    # READ_SCHEMA plus the `extra` top-level fields, read as JSON text
+    return dict(READ_SCHEMA, **{name: pl.String for name in extra if name not in READ_SCHEMA})
+
+
+def unregistered(names):
+    # Sorted top-level field names the registry does not type, leaving out
+    # the columns normalize() derives itself
+    derived = {f.name for prefix in IP_COLUMNS.values() for f in ip_struct_dtype(prefix).fields}
+    return sorted(set(names) - set(RAW_SCHEMA) - derived)
+
+
+# Stored types for fields that differ from RAW_SCHEMA. Nested fields are
+# addressed as (column, field).
+_NARROW = {
+    "flow_id": pl.UInt64,
+    "pcap_cnt": pl.UInt64,
+    "vlan": pl.List(pl.UInt16),
+    "src_port": pl.UInt16,
+    "dest_port": pl.UInt16,
+    "icmp_type": pl.UInt8,
+    "icmp_code": pl.UInt8,
+    "tx_id": pl.UInt64,
+    ("dns", "version"): pl.UInt8,
+    ("dns", "id"): pl.UInt16,
+    ("dns", "opcode"): pl.UInt8,
+    ("dns", "tx_id"): pl.UInt64,
+    ("http", "http_port"): pl.UInt16,
+    ("http", "status"): pl.UInt16,
+    ("http", "length"): pl.UInt64,
+    ("flow", "pkts_toserver"): pl.UInt64,
+    ("flow", "pkts_toclient"): pl.UInt64,
+    ("flow", "bytes_toserver"): pl.UInt64,
+    ("flow", "bytes_toclient"): pl.UInt64,
+    ("flow", "age"): pl.UInt32,
+    ("alert", "gid"): pl.UInt32,
+    ("alert", "signature_id"): pl.UInt32,
+    ("alert", "rev"): pl.UInt32,
+    ("alert", "severity"): pl.UInt8,
+}
+
+# Nested timestamp strings parsed like the top-level one
+_NESTED_TIMESTAMPS = [("flow", "start"), ("flow", "end")]
+
+
+# Derived per address column: <prefix>_ip_v4 (u32), <prefix>_ip_v6_hi and
+# <prefix>_ip_v6_lo (u64 halves of the 128-bit value), <prefix>_private
+# (RFC 1918 / fc00::/7, see ipnet.py). The string columns are kept.
+IP_COLUMNS = {"src_ip": "src", "dest_ip": "dest"}
+
+
+def ip_struct_dtype(prefix):
+    return pl.Struct({
+        f"{prefix}_ip_v4": pl.UInt32,
+        f"{prefix}_ip_v6_hi": pl.UInt64,
+        f"{prefix}_ip_v6_lo": pl.UInt64,
+        f"{prefix}_private": pl.Boolean,
+    })
+
+
+# Dotted quad as ipaddress accepts it: octets 0-255 without leading zeros
+_V4_PATTERN = r"^(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)$"
+
+
+_V6_FIELDS = [(1, "hi", pl.UInt64), (2, "lo", pl.UInt64), (3, "private", pl.Boolean)]
+_V6_DTYPE = pl.Struct({name: dtype for _, name, dtype in _V6_FIELDS})
+
+
+def _v6_parts_batch(series):
+    # Parse each distinct IPv6 address once and map the results back
+    if series.null_count() == len(series):
+        return pl.Series(series.name, [None] * len(series), dtype=_V6_DTYPE)
+    distinct = series.drop_nulls().unique().to_list()
+    parts = [ipnet.ip_parts(ip) or (None, None, None, None) for ip in distinct]
+    return pl.struct([
+        series.replace_strict(distinct, [p[i] for p in parts], default=None, return_dtype=dtype).alias(name)
+        for i, name, dtype in _V6_FIELDS
+    ], eager=True)
+
+
+def add_ip_columns(lf):
+    # IPv4 addresses are converted with column expressions; the rest (few
+    # and mostly IPv6) go through ipnet once per distinct value. The parts
+    # are computed once into temporary columns and the outputs derived.
+    parts = []
+    outputs = []
+    for column, prefix in IP_COLUMNS.items():
+        col = pl.col(column)
+        octets = col.str.split_exact(".", 3).struct
+        v4 = pl.sum_horizontal([
+            octets.field(f"field_{i}").cast(pl.UInt32, strict=False) * (1 << (24 - 8 * i)) for i in range(4)
+        ]).cast(pl.UInt32)
+        parts.append(pl.when(col.str.contains(_V4_PATTERN)).then(v4).alias(f"_{prefix}_v4"))
+        parts.append(pl.when(col.str.contains(":", literal=True)).then(col).map_batches(
+            _v6_parts_batch, return_dtype=_V6_DTYPE, is_elementwise=True,
+        ).alias(f"_{prefix}_v6"))
+        v4 = pl.col(f"_{prefix}_v4")
+        v6 = pl.col(f"_{prefix}_v6").struct
+        v4_private = pl.any_horizontal([(v4 & mask) == net for net, mask in ipnet.RFC1918_V4])
+        outputs += [
+            v4.alias(f"{prefix}_ip_v4"),
+            v6.field("hi").alias(f"{prefix}_ip_v6_hi"),
+            v6.field("lo").alias(f"{prefix}_ip_v6_lo"),
+            pl.when(v4.is_not_null()).then(v4_private).otherwise(v6.field("private")).alias(f"{prefix}_private"),
+        ]
+    temporary = [f"_{prefix}_{part}" for prefix in IP_COLUMNS.values() for part in ("v4", "v6")]
+    return lf.with_columns(parts).with_columns(outputs).drop(temporary)
+
+
+def _decode_batch(dtype):
+    def decode(series):
+        try:
+            return series.str.json_decode(dtype)
+        except pl.exceptions.ComputeError:
+            # A value of another type: read the batch again with the NDJSON
+            # reader, which nulls such values as it does at the top level
+            lines = []
+            for text in series.to_list():
+                try:
+                    value = orjson.loads(text) if text is not None else None
+                except orjson.JSONDecodeError:
+                    value = None
+                lines.append(b'{"value":' + (text.encode() if isinstance(value, (dict, list)) else b"null") + b"}\n")
+            return pl.read_ndjson(io.BytesIO(b"".join(lines)), schema={"value": dtype}, ignore_errors=True).to_series()
+
+    return decode
+
+
+def decode_nested(name):
+    # READ_SCHEMA column -> its RAW_SCHEMA type
+    dtype = RAW_SCHEMA[name]
+    return pl.col(name).map_batches(_decode_batch(dtype), return_dtype=dtype, is_elementwise=True)
+
+
+def parse_timestamp(expr):
+    # EVE timestamps carry a numeric UTC offset (+0000, -0500); store as UTC
+    return expr.str.to_datetime(TIMESTAMP_FORMAT, time_zone="UTC", strict=False)
+
+
+def stored_schema(extra=()):
+    # The schema of normalize()'s output
+    schema = {}
+    for name, dtype in RAW_SCHEMA.items():
+        if isinstance(dtype, pl.Struct):
+            fields = {}
+            for field in dtype.fields:
+                key = (name, field.name)
+                if key in _NESTED_TIMESTAMPS:
+                    fields[field.name] = pl.Datetime("us", "UTC")
+                else:
+                    fields[field.name] = _NARROW.get(key, field.dtype)
+            fields.update((field, pl.String) for column, field in NESTED_JSON_TEXT if column == name)
+            schema[name] = pl.Struct(fields)
+        elif name == "timestamp":
+            schema[name] = pl.Datetime("us", "UTC")
+        elif name in CATEGORICAL_COLUMNS:
+            schema[name] = pl.Categorical
+        else:
+            schema[name] = _NARROW.get(name, dtype)
+    for prefix in IP_COLUMNS.values():
+        schema.update({f.name: f.dtype for f in ip_struct_dtype(prefix).fields})
+    schema.update((name, pl.String) for name in unregistered(extra))
+    return schema
+
+
+def normalize(lf, extra=()):
+    # read_schema(extra) frame -> stored types
+    stored = stored_schema(extra)
+    exprs = []
+    for name in RAW_SCHEMA:
+        dtype = stored[name]
+        col = decode_nested(name) if READ_SCHEMA[name] != RAW_SCHEMA[name] else pl.col(name)
+        if name == "timestamp":
+            exprs.append(parse_timestamp(col).alias(name))
+        elif isinstance(dtype, pl.Struct):
+            # Parse nested timestamps in place, then cast field-wise;
+            # absent (null) structs stay null
+            nested = [parse_timestamp(pl.field(field)).alias(field)
+                      for column, field in _NESTED_TIMESTAMPS if column == name]
+            nested += [pl.col(name).str.json_path_match(f"$.{field}").alias(field)
+                       for column, field in NESTED_JSON_TEXT if column == name]
+            expr = col.struct.with_fields(nested) if nested else col
+            exprs.append(expr.cast(dtype, strict=False).alias(name))
+        elif dtype != RAW_SCHEMA[name]:
+            exprs.append(col.cast(dtype, strict=False).alias(name))
+        else:
+            exprs.append(col.alias(name))
+    exprs += [pl.col(name) for name in unregistered(extra)]
+    return add_ip_columns(lf.select(exprs))
+
+
+def scan_eve(source, extra=()):
+    # NDJSON path(s) or file-like -> LazyFrame in the stored schema.
+    # Values that do not fit their declared type are read as null.
+    return normalize(pl.scan_ndjson(source, schema=read_schema(extra), ignore_errors=True), extra)
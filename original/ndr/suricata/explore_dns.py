@@ -1,38 +1,127 @@
 import sys
-import orjson
-from collections import Counter
+import os
+from collections import Counter, defaultdict
+from domain_index import DomainIndex, registrable_domain
+from cli import parse_args
+from eve_engine import Detector, run
+from sketches import SKETCH_OPTIONS, HyperLogLog, SpaceSaving, format_count, format_distinct, run_sketches, sketch_option
+
+class DnsExplorer(Detector):
+    event_types = {"dns"}
+
+    def __init__(self, source, zones=(), sketch_size=None):
+        self.source = source
+        self.zones = list(zones)
+        # SpaceSaving counters per top-N list; None counts every name exactly
+        self.sketch_size = sketch_size
+
+    def init(self):
+        if self.sketch_size:
+            return {
+                "names": SpaceSaving(self.sketch_size),
+                "registrable": SpaceSaving(self.sketch_size),
+                "distinct": HyperLogLog(),
+            }
+        return Counter()
+
+    def update(self, domain_counts, event):
+        dns = event.get('dns', {})
+        rrname = dns.get('rrname')
+        if not rrname:
+            return
+        if self.sketch_size:
+            domain_counts["names"].add(rrname)
+            domain_counts["distinct"].add(rrname)
+            registrable = registrable_domain(rrname)
+            if registrable:
+                domain_counts["registrable"].add(registrable)
+        else:
+            domain_counts[rrname] += 1
+
+    def merge(self, domain_counts, other):
+        if self.sketch_size:
+            for name, sketch in other.items():
+                domain_counts[name].merge(sketch)
+            return domain_counts
+        domain_counts.update(other)
+        return domain_counts
+
+    def checkpoint_key(self):
+        if self.sketch_size:
+            return f"DnsExplorer(sketch={self.sketch_size})"
+        return super().checkpoint_key()
+
+    def finalize(self, domain_counts, totals):
+        if self.sketch_size:
+            self.finalize_sketches(domain_counts)
+            return
+        print(f"Top 50 DNS Queries in {self.source}:")
+        for domain, count in domain_counts.most_common(50):
+            print(f"{count}: {domain}")
+
+        # Roll the distinct names up to their registrable domain (eTLD+1)
+        registrable_counts = Counter()
+        registrable_names = defaultdict(int)
+        for domain, count in domain_counts.items():
+            registrable = registrable_domain(domain)
+            if registrable:
+                registrable_counts[registrable] += count
+                registrable_names[registrable] += 1
+
+        print(f"\nTop 50 Registrable Domains in {self.source}:")
+        for registrable, count in registrable_counts.most_common(50):
+            print(f"{count}: {registrable} ({registrable_names[registrable]} names)")
+
+        if self.zones:
+            index = DomainIndex(domain_counts)
+            for zone in self.zones:
+                names = index.under(zone)
+                print(f"\nNames under {zone} ({len(names)}):")
+                for name in names:
+                    print(f"{domain_counts.get(name, 0)}: {name}")
+
+    def finalize_sketches(self, sketches):
+        names = sketches["names"]
+        print(f"Top 50 DNS Queries in {self.source} (top {names.k} sketch of {names.total} queries, "
+              f"counts over by {names.max_error()} at most):")
+        for domain, count, error in names.most_common(50):
+            print(f"{format_count(count, error)}: {domain}")
+        print(f"Distinct names: {format_distinct(sketches['distinct'])}")
+
+        registrable = sketches["registrable"]
+        print(f"\nTop 50 Registrable Domains in {self.source} (counts over by {registrable.max_error()} at most):")
+        for domain, count, error in registrable.most_common(50):
+            print(f"{format_count(count, error)}: {domain}")
+
+        if self.zones:
+            counts = {domain: count for domain, count, _ in names.most_common()}
+            index = DomainIndex(counts)
+            for zone in self.zones:
+                found = index.under(zone)
+                print(f"\nTracked names under {zone} ({len(found)}):")
+                for name in found:
+                    print(f"{counts[name]}: {name}")
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python explore_dns.py <log_file>")
+    args, options = parse_args(sys.argv[1:], SKETCH_OPTIONS, repeated={"zone"})
+    sketch_options = sketch_option(options)
+    zones = options.get("zone", [])
+    if not args or (not sketch_options and len(args) > 1):
+        print("Usage: python explore_dns.py <log_file> [--zone=example.com ...]")
+        print("       python explore_dns.py <log_file|file.sketch> [...] --sketch[=K] [--save-sketch=PATH] [--zone=...]")
         sys.exit(1)
 
-    log_file = sys.argv[1]
-    domain_counts = Counter()
-
-    try:
-        with open(log_file, 'rb') as f:
-            for line in f:
-                try:
-                    event = orjson.loads(line)
-                except orjson.JSONDecodeError:
-                    continue
-
-                if event.get('event_type') != 'dns':
-                    continue
-
-                dns = event.get('dns', {})
-                rrname = dns.get('rrname')
-                if rrname:
-                    domain_counts[rrname] += 1
-    
-    except Exception as e:
-        print(f"Error: {e}")
-        sys.exit(1)
+    for path in args:
+        if not os.path.isfile(path):
+            print(f"Error: File {path} not found.")
+            sys.exit(1)
 
-    print(f"Top 50 DNS Queries in {log_file}:")
-    for domain, count in domain_counts.most_common(50):
-        print(f"{count}: {domain}")
+    if sketch_options:
+        source = ", ".join(args)
+        run_sketches([DnsExplorer(source, zones, sketch_options["size"])], args, sketch_options)
+    else:
+        log_file = args[0]
+        run([DnsExplorer(log_file, zones)], [log_file])
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,26 @@
 import sys
-import orjson
+import os
+from eve_engine import Detector, run
+
+class DnsServers(Detector):
+    # Any event type: traffic to port 53 counts as well as dns events
+    def init(self):
+        return set()
+
+    def update(self, dns_servers, event):
+        # Check for event_type 'dns' or traffic to port 53
+        if event.get('event_type') == 'dns' or event.get('dest_port') == 53:
+            dest_ip = event.get('dest_ip')
+            if dest_ip:
+                dns_servers.add(dest_ip)
+
+    def merge(self, dns_servers, other):
+        dns_servers |= other
+        return dns_servers
+
+    def finalize(self, dns_servers, totals):
+        for ip in sorted(dns_servers):
+            print(ip)
 
 def main():
     if len(sys.argv) < 2:
@@ -7,26 +28,11 @@ def main():
         sys.exit(1)
 
     filename = sys.argv[1]
-    dns_servers = set()
-
-    try:
-        with open(filename, 'rb') as f:
-            for line in f:
-                try:
-                    event = orjson.loads(line)
-                    # Check for event_type 'dns' or traffic to port 53
-                    if event.get('event_type') == 'dns' or event.get('dest_port') == 53:
-                        dest_ip = event.get('dest_ip')
-                        if dest_ip:
-                            dns_servers.add(dest_ip)
-                except orjson.JSONDecodeError:
-                    continue
-    except FileNotFoundError:
+    if not os.path.isfile(filename):
         print(f"Error: File {filename} not found.")
         sys.exit(1)
 
-    for ip in sorted(dns_servers):
-        print(ip)
+    run([DnsServers()], [filename])
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,26 @@
 import sys
-import orjson
+import os
+from eve_engine import Detector, run
+
+class UniqueSnis(Detector):
+    event_types = {"tls"}
+
+    def init(self):
+        return set()
+
+    def update(self, unique_snis, event):
+        tls_data = event.get('tls', {})
+        sni = tls_data.get('sni')
+        if sni:
+            unique_snis.add(sni)
+
+    def merge(self, unique_snis, other):
+        unique_snis |= other
+        return unique_snis
+
+    def finalize(self, unique_snis, totals):
+        for sni in sorted(unique_snis):
+            print(sni)
 
 def main():
     if len(sys.argv) < 2:
@@ -7,26 +28,11 @@ def main():
         sys.exit(1)
 
     filename = sys.argv[1]
-    unique_snis = set()
-
-    try:
-        with open(filename, 'rb') as f:
-            for line in f:
-                try:
-                    event = orjson.loads(line)
-                    if event.get('event_type') == 'tls':
-                        tls_data = event.get('tls', {})
-                        sni = tls_data.get('sni')
-                        if sni:
-                            unique_snis.add(sni)
-                except orjson.JSONDecodeError:
-                    continue
-    except FileNotFoundError:
+    if not os.path.isfile(filename):
         print(f"Error: File {filename} not found.")
         sys.exit(1)
 
-    for sni in sorted(unique_snis):
-        print(sni)
+    run([UniqueSnis()], [filename])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,347 @@
+import sys
+import gzip
+import heapq
+import random
+import datetime
+import orjson
+from cli import parse_args
+from indicators import CLOUD_KEYWORDS, IOT_KEYWORDS, LINUX_DOMAINS, WINDOWS_INDICATORS
+
+# Deterministic synthetic Suricata EVE generator, for benchmarks (bench.py)
+# and tests without production logs. The same parameters and seed always
+# give the same file, byte for byte.
+#
+# Hosts are internal addresses (192.168.x.y) talking to resolvers and to
+# public servers, one per domain. Domain popularity is Zipf-like over the
+# configured cardinality and part of the names come from indicators.py, so
+# every hunt finds something. DNS records use either the nested
+# dns.queries[] form (EVE v3) or the legacy dns.rrname form (v2), and a
+# fraction of lines is malformed (truncated JSON, junk, blank lines).
+#
+# --beacons=N adds N hosts that call home to a server of their own every
+# --beacon-interval seconds, give or take --beacon-jitter of it, for the
+# beaconing hunts. Their flows come on top of --events, timed by a separate
+# random stream, so the rest of the file is the same with or without them.
+
+DEFAULTS = {
+    "events": 100000,
+    "seed": 1,
+    "hosts": 50,
+    "domains": 5000,
+    # event_type weights
+    "mix": "dns:30,flow:25,tls:15,http:10,alert:8,quic:2,stats:1",
+    # Share of DNS records with dns.queries[] instead of dns.rrname
+    "nested-dns": 0.5,
+    "malformed": 0.001,
+    "start": "2026-01-20T00:00:00",
+    "days": 1,
+    "beacons": 0,
+    "beacon-interval": 300.0,
+    "beacon-jitter": 0.05,
+}
+
+# Popularity exponent: name i is picked with weight 1 / (i + 1) ** ZIPF_S
+ZIPF_S = 1.1
+# Every n-th domain is built from an indicator
+INDICATOR_EVERY = 10
+PUBLIC_FIRST_OCTETS = [13, 23, 34, 52, 104, 142, 151, 185, 203]
+# Beacon servers are 45.66.x.y, apart from the domains' servers
+BEACON_NET = "45.66"
+RESOLVERS = ["192.168.0.1", "192.168.0.53", "8.8.8.8", "1.1.1.1"]
+TLDS = ["com", "net", "org", "io", "co.uk", "de", "example.com"]
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0",
+    "curl/8.5.0",
+    "Wget/1.21.4",
+    "Debian APT-HTTP/1.3 (2.6.1)",
+    "Microsoft-CryptoAPI/10.0",
+    "Roku/DVP-13.0 (13.0.0.4154-C4)",
+    "SmartTV/1.0 Samsung Tizen",
+]
+SIGNATURES = [
+    (2013028, "ET POLICY curl User-Agent Outbound", "Attempted Information Leak", 2),
+    (2027865, "ET INFO Observed DNS Query to .cloud TLD", "Potentially Bad Traffic", 2),
+    (2019401, "ET POLICY Vulnerable Java Version Detected", "Potential Corporate Privacy Violation", 1),
+    (2210045, "SURICATA STREAM Packet with invalid ack", "Generic Protocol Command Decode", 3),
+    (2221010, "SURICATA HTTP unable to match response to request", "Generic Protocol Command Decode", 3),
+    (2008581, "ET P2P BitTorrent DHT ping request", "Potential Corporate Privacy Violation", 1),
+    (2001219, "ET SCAN Potential SSH Scan", "Attempted Information Leak", 2),
+    (2024897, "ET USER_AGENTS Go HTTP Client User-Agent", "Misc activity", 3),
+]
+TLS_VERSIONS = ["TLS 1.2", "TLS 1.3"]
+FLOW_STATES = [("closed", "timeout"), ("established", "timeout"), ("new", "timeout"), ("closed", "shutdown")]
+SERVICES = [(443, "TCP", "tls"), (80, "TCP", "http"), (53, "UDP", "dns"), (22, "TCP", "ssh"),
+            (123, "UDP", "ntp"), (8443, "TCP", "tls"), (3389, "TCP", "rdp"), (445, "TCP", "smb")]
+
+
+def parse_mix(mix):
+    # "dns:30,flow:25" -> ([event types], [cumulative weights])
+    types, cumulative = [], []
+    total = 0
+    for item in mix.split(","):
+        name, _, weight = item.partition(":")
+        total += float(weight or 1)
+        types.append(name.strip())
+        cumulative.append(total)
+    return types, cumulative
+
+
+def generator_params(options):
+    # DEFAULTS overridden by --name=value options, typed like the defaults
+    params = dict(DEFAULTS)
+    for name, default in DEFAULTS.items():
+        if name in options and options[name] is not True:
+            params[name] = type(default)(options[name])
+    return params
+
+
+class EveGenerator:
+    def __init__(self, params):
+        self.params = params
+        self.rng = random.Random(params["seed"])
+        self.types, self.type_weights = parse_mix(params["mix"])
+        self.hosts = [f"192.168.{1 + i // 250}.{1 + i % 250}" for i in range(params["hosts"])]
+        self.domains = [self.domain_name(i) for i in range(params["domains"])]
+        weights = 0.0
+        self.domain_weights = []
+        for i in range(len(self.domains)):
+            weights += 1 / (i + 1) ** ZIPF_S
+            self.domain_weights.append(weights)
+        self.start = datetime.datetime.fromisoformat(params["start"])
+        self.step = params["days"] * 86400 / max(1, params["events"])
+        self.flow_id = 1000000
+        self.beacon_rng = random.Random(f"beacons-{params['seed']}")
+        # Beaconing hosts are the quietest ones, so their flows stand out
+        self.beacon_hosts = [self.hosts[-1 - i % len(self.hosts)] for i in range(params["beacons"])]
+
+    def domain_name(self, i):
+        rng = self.rng
+        if i % INDICATOR_EVERY == 0:
+            pool = [CLOUD_KEYWORDS, WINDOWS_INDICATORS, IOT_KEYWORDS, LINUX_DOMAINS][(i // INDICATOR_EVERY) % 4]
+            word = pool[rng.randrange(len(pool))].replace(" ", "")
+            if "." in word:
+                # A host under the indicator's zone
+                return f"h{i}.{word}"
+            return f"{word}{i}.{TLDS[i % len(TLDS)]}"
+        labels = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+        return f"{['www', 'api', 'cdn', 'img', 'mail'][i % 5]}.{labels}.{TLDS[i % len(TLDS)]}"
+
+    def server_ip(self, domain_index):
+        first = PUBLIC_FIRST_OCTETS[domain_index % len(PUBLIC_FIRST_OCTETS)]
+        return f"{first}.{(domain_index >> 16) % 256}.{(domain_index >> 8) % 256}.{domain_index % 256}"
+
+    def timestamp(self, n, offset=0.0):
+        ts = self.start + datetime.timedelta(seconds=n * self.step + offset)
+        return ts.strftime("%Y-%m-%dT%H:%M:%S.%f") + "+0000"
+
+    def pick_domain(self):
+        i = self.rng.choices(range(len(self.domains)), cum_weights=self.domain_weights)[0]
+        return i, self.domains[i]
+
+    def base(self, n, event_type, src_ip, dest_ip, dest_port, proto):
+        rng = self.rng
+        self.flow_id += rng.randint(1, 7)
+        return {
+            "timestamp": self.timestamp(n),
+            "flow_id": self.flow_id,
+            "in_iface": "eth0",
+            "event_type": event_type,
+            "src_ip": src_ip,
+            "src_port": rng.randint(1024, 65535),
+            "dest_ip": dest_ip,
+            "dest_port": dest_port,
+            "proto": proto,
+        }
+
+    def dns(self, n, host):
+        rng = self.rng
+        _, name = self.pick_domain()
+        record = self.base(n, "dns", host, RESOLVERS[rng.randrange(len(RESOLVERS))], 53, "UDP")
+        rrtype = "AAAA" if rng.random() < 0.2 else "A"
+        if rng.random() < self.params["nested-dns"]:
+            record["dns"] = {"version": 3, "type": "request", "id": rng.randrange(65536),
+                             "queries": [{"rrname": name, "rrtype": rrtype}]}
+        else:
+            record["dns"] = {"version": 2, "type": "query", "id": rng.randrange(65536),
+                             "rrname": name, "rrtype": rrtype, "tx_id": 0}
+        return record
+
+    def flow(self, n, host):
+        rng = self.rng
+        domain_index, _ = self.pick_domain()
+        port, proto, app_proto = SERVICES[min(len(SERVICES) - 1, int(rng.expovariate(0.8)))]
+        dest = self.server_ip(domain_index) if rng.random() < 0.8 else self.hosts[rng.randrange(len(self.hosts))]
+        record = self.base(n, "flow", host, dest, port, proto)
+        state, reason = FLOW_STATES[rng.randrange(len(FLOW_STATES))]
+        pkts = rng.randint(1, 200)
+        age = rng.randint(0, 120)
+        record["app_proto"] = app_proto
+        record["flow"] = {
+            "pkts_toserver": pkts,
+            "pkts_toclient": rng.randint(0, pkts * 2),
+            "bytes_toserver": pkts * rng.randint(60, 900),
+            "bytes_toclient": pkts * rng.randint(60, 1400),
+            "start": self.timestamp(n, -age),
+            "end": self.timestamp(n),
+            "age": age,
+            "state": state,
+            "reason": reason,
+            "alerted": rng.random() < 0.02,
+        }
+        return record
+
+    def tls(self, n, host):
+        rng = self.rng
+        domain_index, name = self.pick_domain()
+        record = self.base(n, "tls", host, self.server_ip(domain_index), 443, "TCP")
+        record["tls"] = {
+            "subject": f"CN={name}",
+            "issuerdn": "C=US, O=Let's Encrypt, CN=R3",
+            "serial": f"{domain_index:08X}",
+            "fingerprint": ":".join(f"{(domain_index * 7 + k) % 256:02x}" for k in range(20)),
+            "sni": name,
+            "version": TLS_VERSIONS[rng.randrange(2)],
+            "notbefore": "2026-01-01T00:00:00",
+            "notafter": "2026-04-01T00:00:00",
+            "ja3": {"hash": f"{rng.getrandbits(128):032x}"},
+        }
+        return record
+
+    def http(self, n, host):
+        rng = self.rng
+        domain_index, name = self.pick_domain()
+        record = self.base(n, "http", host, self.server_ip(domain_index), 80, "TCP")
+        record["http"] = {
+            "hostname": name,
+            "url": f"/{rng.choice(['', 'index.html', 'api/v1/items', 'update', 'status'])}",
+            "http_user_agent": USER_AGENTS[rng.randrange(len(USER_AGENTS))],
+            "http_content_type": "text/html",
+            "http_method": "GET" if rng.random() < 0.8 else "POST",
+            "protocol": "HTTP/1.1",
+            "status": rng.choice([200, 200, 200, 301, 304, 404]),
+            "length": rng.randint(0, 50000),
+        }
+        return record
+
+    def quic(self, n, host):
+        rng = self.rng
+        domain_index, name = self.pick_domain()
+        record = self.base(n, "quic", host, self.server_ip(domain_index), 443, "UDP")
+        record["quic"] = {"version": "1", "sni": name, "ua": "Chrome/124.0"}
+        return record
+
+    def alert(self, n, host):
+        rng = self.rng
+        domain_index, _ = self.pick_domain()
+        signature_id, signature, category, severity = SIGNATURES[rng.randrange(len(SIGNATURES))]
+        if rng.random() < 0.3:
+            record = self.base(n, "alert", self.server_ip(domain_index), host, rng.choice([22, 443, 3389]), "TCP")
+        else:
+            record = self.base(n, "alert", host, self.server_ip(domain_index), 443, "TCP")
+        record["alert"] = {"action": "allowed", "gid": 1, "signature_id": signature_id, "rev": 3,
+                           "signature": signature, "category": category, "severity": severity}
+        return record
+
+    def stats(self, n, host):
+        uptime = int(n * self.step)
+        return {"timestamp": self.timestamp(n), "event_type": "stats",
+                "stats": {"uptime": uptime, "capture": {"kernel_packets": uptime * 1500, "kernel_drops": uptime // 100}}}
+
+    def beacon(self, seconds, i):
+        # Beacon i's flow starting at `seconds` after the start: short and
+        # small, to the same server and port every time
+        rng = self.beacon_rng
+        age = rng.randint(0, 2)
+        pkts = rng.randint(4, 8)
+        return {
+            "timestamp": self.timestamp(0, seconds + age),
+            "flow_id": rng.getrandbits(50),
+            "in_iface": "eth0",
+            "event_type": "flow",
+            "src_ip": self.beacon_hosts[i],
+            "src_port": rng.randint(1024, 65535),
+            "dest_ip": f"{BEACON_NET}.{i // 256 % 256}.{i % 256}",
+            "dest_port": 443,
+            "proto": "TCP",
+            "app_proto": "tls",
+            "flow": {
+                "pkts_toserver": pkts,
+                "pkts_toclient": pkts,
+                "bytes_toserver": pkts * rng.randint(80, 200),
+                "bytes_toclient": pkts * rng.randint(80, 400),
+                "start": self.timestamp(0, seconds),
+                "end": self.timestamp(0, seconds + age),
+                "age": age,
+                "state": "closed",
+                "reason": "shutdown",
+                "alerted": False,
+            },
+        }
+
+    def next_beacon(self, seconds):
+        interval = self.params["beacon-interval"]
+        return seconds + interval * (1 + self.params["beacon-jitter"] * self.beacon_rng.uniform(-1, 1))
+
+    def malformed(self, line):
+        roll = self.rng.random()
+        if roll < 0.6:
+            # Cut mid-record, as after a crash or a partial write
+            return line[:self.rng.randint(1, max(1, len(line) - 2))]
+        if roll < 0.8:
+            return b"this is not json {"
+        return b""
+
+    def lines(self):
+        rng = self.rng
+        types, weights = self.types, self.type_weights
+        malformed = self.params["malformed"]
+        # (next flow time, beacon), first flows spread over one interval
+        beacons = [(self.beacon_rng.uniform(0, self.params["beacon-interval"]), i) for i in range(len(self.beacon_hosts))]
+        heapq.heapify(beacons)
+        for n in range(self.params["events"]):
+            while beacons and beacons[0][0] <= n * self.step:
+                seconds, i = beacons[0]
+                yield orjson.dumps(self.beacon(seconds, i))
+                heapq.heapreplace(beacons, (self.next_beacon(seconds), i))
+            event_type = rng.choices(types, cum_weights=weights)[0]
+            host = self.hosts[int(rng.paretovariate(1.2)) % len(self.hosts)]
+            line = orjson.dumps(getattr(self, event_type)(n, host))
+            if malformed and rng.random() < malformed:
+                line = self.malformed(line)
+            yield line
+
+
+def generate(path, params):
+    # Writes the EVE file (gzip when path ends in .gz) -> lines written
+    generator = EveGenerator(params)
+    opener = gzip.open if path.endswith(".gz") else open
+    written = 0
+    with opener(path, 'wb') as f:
+        batch = []
+        for line in generator.lines():
+            batch.append(line)
+            if len(batch) >= 10000:
+                f.write(b"\n".join(batch) + b"\n")
+                written += len(batch)
+                batch = []
+        if batch:
+            f.write(b"\n".join(batch) + b"\n")
+            written += len(batch)
+    return written
+
+
+def main():
+    args, options = parse_args(sys.argv[1:], DEFAULTS)
+    if len(args) != 1:
+        defaults = " ".join(f"[--{name}={value}]" for name, value in DEFAULTS.items())
+        print(f"Usage: python gen_eve.py <output.json[.gz]> {defaults}")
+        sys.exit(1)
+    params = generator_params(options)
+    written = generate(args[0], params)
+    print(f"Wrote {written} lines to {args[0]}")
+
+
+if __name__ == "__main__":
+    main()
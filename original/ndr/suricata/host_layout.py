@@ -0,0 +1,234 @@
+import duckdb
+import os
+import sys
+import time
+import orjson
+from cli import parse_args
+from duck_hunt import get_parquet_file, parquet_files
+
+# Host-clustered copies of Parquet sources and host -> row-group indexes, so
+# `profile_host.py <ip> <parquet>` reads only the row groups naming the host
+# instead of every record.
+#
+#   python host_layout.py <source>                writes <source>_by_host/:
+#       by_src/   the source's files with rows ordered by src_ip, then timestamp
+#       by_dest/  the same ordered by dest_ip, then timestamp
+#       in row groups of --row-group-size rows, each file with its index
+#   python host_layout.py <source> --index-only   indexes the files in place
+#
+# One ordering cannot cluster both endpoints of a flow, so the layout keeps
+# one copy per side: a host's outbound events sit in a few consecutive row
+# groups of by_src and its inbound ones in a few of by_dest. Besides the
+# src_ip/dest_ip min/max statistics and the Bloom filters DuckDB writes for
+# dictionary-encoded columns, each file gets an index of the row groups
+# naming each host in the column it is ordered by (both columns with
+# --index-only):
+#
+#   <file>.hosts.json   {"row_groups": [[first row, rows], ...],
+#                        "columns": [...], "hosts": {ip: [row group, ...]}, ...}
+#
+# An index is only used while its file's size and mtime match the ones it
+# was built from. by_src is a complete copy of the source and can be read
+# by duck_hunt.py like any other.
+
+HOST_INDEX_VERSION = 1
+HOST_INDEX_SUFFIX = ".hosts.json"
+DEFAULT_ROW_GROUP_SIZE = 20000
+# Layout directory -> column its files are ordered by and indexed on
+LAYOUT_SIDES = {"by_src": "src_ip", "by_dest": "dest_ip"}
+HOST_COLUMNS = ["src_ip", "dest_ip"]
+
+
+def default_layout_dir(path):
+    return os.path.splitext(path.rstrip(os.sep))[0] + "_by_host"
+
+
+def index_path(parquet_file):
+    return parquet_file + HOST_INDEX_SUFFIX
+
+
+def file_stamp(parquet_file):
+    st = os.stat(parquet_file)
+    return {"size": st.st_size, "mtime": st.st_mtime}
+
+
+def row_group_bounds(con, parquet_file):
+    # -> [[first row, rows]] per row group, in file order
+    rows = con.execute("""
+        SELECT DISTINCT row_group_id, row_group_num_rows
+        FROM parquet_metadata(?)
+        ORDER BY row_group_id
+    """, [parquet_file]).fetchall()
+    bounds = []
+    first = 0
+    for _, num_rows in rows:
+        bounds.append([first, num_rows])
+        first += num_rows
+    return bounds
+
+
+def build_host_index(con, parquet_file, columns):
+    # Writes the file's index of the hosts in columns -> number of hosts
+    bounds = row_group_bounds(con, parquet_file)
+    con.execute("CREATE OR REPLACE TEMP TABLE row_groups (row_group INTEGER, first_row BIGINT)")
+    con.executemany("INSERT INTO row_groups VALUES (?, ?)", [[i, first] for i, (first, _) in enumerate(bounds)])
+    selected = ", ".join(f"r.{column}" for column in columns)
+    hosts = " UNION ALL ".join(f"SELECT row_group, {column} as host FROM located" for column in columns)
+    rows = con.execute(f"""
+        WITH located AS (
+            SELECT g.row_group, {selected}
+            FROM read_parquet('{parquet_file}', file_row_number=true) r
+            ASOF JOIN row_groups g ON r.file_row_number >= g.first_row
+        )
+        SELECT host, list(DISTINCT row_group ORDER BY row_group)
+        FROM (
+            {hosts}
+        )
+        WHERE host IS NOT NULL
+        GROUP BY host
+    """).fetchall()
+    index = dict(file_stamp(parquet_file), version=HOST_INDEX_VERSION, row_groups=bounds,
+                 columns=columns, hosts=dict(sorted(rows)))
+    tmp = index_path(parquet_file) + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(orjson.dumps(index))
+    os.replace(tmp, index_path(parquet_file))
+    return len(rows)
+
+
+def load_host_index(parquet_file):
+    # The file's index, or None when missing or built from another version
+    # of the file
+    path = index_path(parquet_file)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        index = orjson.loads(f.read())
+    stamp = file_stamp(parquet_file)
+    if index.get("version") != HOST_INDEX_VERSION or index.get("size") != stamp["size"] or index.get("mtime") != stamp["mtime"]:
+        print(f"Ignoring stale host index {path}")
+        return None
+    return index
+
+
+def host_row_ranges(index, host):
+    # -> [(first row, last row)] covering the row groups naming the host,
+    # adjacent groups joined
+    ranges = []
+    for group in index["hosts"].get(host, []):
+        first, num_rows = index["row_groups"][group]
+        if ranges and ranges[-1][1] == first - 1:
+            ranges[-1] = (ranges[-1][0], first + num_rows - 1)
+        else:
+            ranges.append((first, first + num_rows - 1))
+    return ranges
+
+
+def cluster_file(con, parquet_file, out_file, column, row_group_size):
+    # Copies the file with its rows ordered by column, keeping the EVE schema
+    # version j2p stored in the footer
+    metadata = con.execute("""
+        SELECT decode(key), decode(value) FROM parquet_kv_metadata(?)
+        WHERE decode(key) = 'eve_schema_version'
+    """, [parquet_file]).fetchall()
+    kv = ", KV_METADATA {" + ", ".join(f"{k}: '{v}'" for k, v in metadata) + "}" if metadata else ""
+    os.makedirs(os.path.dirname(out_file) or ".", exist_ok=True)
+    con.execute(f"""
+        COPY (SELECT * FROM read_parquet('{parquet_file}') ORDER BY {column}, timestamp)
+        TO '{out_file}.tmp' (FORMAT parquet, COMPRESSION zstd, ROW_GROUP_SIZE {row_group_size}{kv})
+    """)
+    os.replace(out_file + ".tmp", out_file)
+
+
+def build_layout(source, out_dir, row_group_size=DEFAULT_ROW_GROUP_SIZE, index_only=False):
+    con = duckdb.connect(database=':memory:')
+    files = parquet_files(con, source)
+    base = source if os.path.isdir(source) else os.path.dirname(source)
+    if index_only:
+        copies = [(parquet_file, parquet_file, HOST_COLUMNS) for parquet_file in files]
+    else:
+        # Dataset parts keep their partition directories
+        copies = [
+            (parquet_file, os.path.join(out_dir, side, os.path.relpath(parquet_file, base)), [column])
+            for side, column in LAYOUT_SIDES.items() for parquet_file in files
+        ]
+    for parquet_file, target, columns in copies:
+        start = time.perf_counter()
+        if target != parquet_file:
+            cluster_file(con, parquet_file, target, columns[0], row_group_size)
+        hosts = build_host_index(con, target, columns)
+        groups = len(row_group_bounds(con, target))
+        print(f"  {target}: {groups} row groups, {hosts} hosts indexed in {time.perf_counter() - start:.1f}s")
+    return files
+
+
+# --- Lookups ---
+
+def layout_parts(path):
+    # -> [(Parquet source, host columns its index covers)]: both sides of a
+    # host_layout.py output, or the source itself
+    sides = [os.path.join(path, side) for side in LAYOUT_SIDES]
+    if all(os.path.isdir(side) for side in sides):
+        return [(side, [column]) for side, column in zip(sides, LAYOUT_SIDES.values())]
+    return [(path, HOST_COLUMNS)]
+
+
+def host_condition(columns, host):
+    # Events naming the host, each matched on one side only: by_dest skips
+    # the events by_src already has
+    literal = "'" + host.replace("'", "''") + "'"
+    if columns == ["src_ip"]:
+        return f"src_ip = {literal}"
+    if columns == ["dest_ip"]:
+        return f"dest_ip = {literal} AND src_ip IS DISTINCT FROM {literal}"
+    return f"(src_ip = {literal} OR dest_ip = {literal})"
+
+
+def host_scans(con, path, host):
+    # -> ([(Parquet file, WHERE clause)], row groups read, row groups in the
+    # files). Files with an index are read only in the row groups naming the
+    # host, through their row numbers; files without one are read whole.
+    scans = []
+    read = total = 0
+    for source, columns in layout_parts(path):
+        for parquet_file in parquet_files(con, source):
+            index = load_host_index(parquet_file)
+            condition = host_condition(columns, host)
+            if index is None or index["columns"] != columns:
+                groups = len(row_group_bounds(con, parquet_file))
+                scans.append((parquet_file, condition))
+                read += groups
+                total += groups
+                continue
+            total += len(index["row_groups"])
+            ranges = host_row_ranges(index, host)
+            if not ranges:
+                continue
+            read += len(index["hosts"][host])
+            rows = " OR ".join(f"file_row_number BETWEEN {first} AND {last}" for first, last in ranges)
+            scans.append((parquet_file, f"({rows}) AND {condition}"))
+    return scans, read, total
+
+
+def main():
+    args, options = parse_args(sys.argv[1:], {"out", "row-group-size"})
+    source = get_parquet_file(args)
+    if not source:
+        print("Usage: python host_layout.py <parquet_file_or_logs_dir_or_dataset_dir> [--out=DIR] [--row-group-size=N] [--index-only]")
+        print("Error: No .parquet file found in provided path.")
+        sys.exit(1)
+    index_only = bool(options.get("index-only"))
+    out_dir = options.get("out")
+    if not isinstance(out_dir, str):
+        out_dir = default_layout_dir(source)
+    row_group_size = int(options.get("row-group-size", DEFAULT_ROW_GROUP_SIZE))
+    if index_only:
+        print(f"Indexing hosts in {source}")
+    else:
+        print(f"Clustering {source} by host into {out_dir}")
+    files = build_layout(source, out_dir, row_group_size, index_only)
+    print(f"Done: {len(files)} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import sys
+import time
+from classify import cache_option
+from cli import parse_args
+from eve_engine import scan_detectors
+from eve_scan import jobs_option
+from analyze_cloud import CloudDestinations
+from analyze_windows_dns import WindowsDns
+from explore_dns import DnsExplorer
+from extract_dns import DnsServers
+from extract_sni import UniqueSnis
+from find_iot import IotDevices
+from find_linux_hosts import LinuxHosts
+from profile_host import HostProfile
+
+# Runs every orjson hunt over the raw EVE files in one pass: each line is
+# parsed once and dispatched to all detectors (eve_engine.py).
+
+def main():
+    args, options = parse_args(sys.argv[1:], repeated={"host", "zone"})
+    labels = cache_option(options)
+    jobs = jobs_option(options)
+    hosts = options.get("host", [])
+    zones = options.get("zone", [])
+    if not args:
+        print("Usage: python hunt_all.py <log_file1> [log_file2 ...] [--host=IP ...] [--zone=NAME ...] [--label-cache[=PATH]] [--jobs[=N]]")
+        sys.exit(1)
+
+    source = ", ".join(args)
+    hunts = [
+        ("Cloud Destinations", CloudDestinations(labels)),
+        ("Windows DNS", WindowsDns(source, labels)),
+        ("DNS Exploration", DnsExplorer(source, zones)),
+        ("DNS Servers", DnsServers()),
+        ("Unique SNIs", UniqueSnis()),
+        ("IoT Devices", IotDevices(labels)),
+        ("Linux Hosts", LinuxHosts(labels)),
+    ]
+    hunts += [(f"Host Profile {host}", HostProfile(host)) for host in hosts]
+
+    detectors = [detector for _, detector in hunts]
+    start = time.perf_counter()
+    totals, states = scan_detectors(detectors, args, jobs, labels)
+    elapsed = time.perf_counter() - start
+    labels.save()
+
+    print(f"Scanned {totals['lines']} lines ({totals['records']} records, {totals['skipped']} skipped "
+          f"by prefilter) from {len(args)} files "
+          f"in {elapsed:.2f}s for {len(hunts)} hunts")
+    for (title, detector), state in zip(hunts, states):
+        print(f"\n===== {title} =====\n")
+        detector.finalize(state, totals)
+
+if __name__ == "__main__":
+    main()
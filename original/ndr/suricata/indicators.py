@@ -0,0 +1,50 @@
+# Indicators shared by the orjson scripts, duck_hunt.py and classify.py.
+# Keywords are matched as case-insensitive substrings and LINUX_UA_REGEX as
+# a case-insensitive regular expression.
+
+CLOUD_KEYWORDS = [
+    "aws", "amazon", "azure", "google", "cloud", "googleapis",
+    "amazonaws", "blob.core.windows.net", "s3", "cloudfront",
+    "gcp", "dropbox", "box.com", "slack", "salesforce"
+]
+
+# Domains strongly associated with Windows OS background services and telemetry
+WINDOWS_INDICATORS = [
+    "time.windows.com", "msftncsi.com", "msftconnecttest.com",
+    "windowsupdate.com", "update.microsoft.com", "mp.microsoft.com",
+    "wdcp.microsoft.com", "wdcpalt.microsoft.com",  # Windows Defender
+    "displaycatalog.mp.microsoft.com", "sls.update.microsoft.com",
+    "ctldl.windowsupdate.com", "download.windowsupdate.com",
+    "tlu.dl.delivery.mp.microsoft.com", "settings-win.data.microsoft.com",
+    "v10.events.data.microsoft.com", "watson.telemetry.microsoft.com",
+    "login.live.com", "_msdcs", "_ldap._tcp", "_kerberos._tcp"
+]
+
+# IoT keywords to search for in domains, SNIs, User-Agents
+IOT_KEYWORDS = [
+    "camera", "doorbell", "smart", "alexa", "echo", "nest", "google home",
+    "tuya", "dahua", "hikvision", "amcrest", "foscam", "wyze", "ring",
+    "roku", "samsung", "lg", "tv", "sonos", "tplink", "belkin", "wemo",
+    "philips", "hue", "lifx", "xiaomi", "aqara", "eufy", "arlo",
+    "ubiquiti", "unifi", "meross", "nanoleaf", "apple tv", "fire tv",
+    "nvidia shield", "chromecast", "nintendo", "xbox", "playstation",
+    "steam deck", "oculus", "quest", "yeelight", "sensibo", "tado",
+    "netatmo", "withings", "fitbit", "garmin", "myq", "chamberlain",
+    "august", "schlage", "yale", "kasa", "tapo", "reolink", "ezviz",
+    "imou", "vivint", "simplisafe", "adt", "honeywell", "resideo",
+    "ecobee", "sensi", "daikin", "mitsubishi", "fujitsu", "panasonic",
+    "toshiba", "sharp", "hitachi", "sony", "bose", "denon", "marantz",
+    "onkyo", "pioneer", "yamaha", "harman", "jbl", "ultimate ears",
+    "bang olufsen", "bowers wilkins", "kepul", "tuya", "smartlife"
+]
+
+# Indicators of Linux systems. LINUX_DOMAINS are zones: a name matches when
+# it is one of them or a subdomain (see domain_index.SuffixSet).
+LINUX_DOMAINS = [
+    "ubuntu.com", "debian.org", "centos.org", "fedoraproject.org", "archlinux.org",
+    "raspberrypi.org", "kali.org", "linuxmint.com", "pop-os.org", "canonical.com",
+    "pypi.org", "pythonhosted.org", "docker.io", "quay.io", "gcr.io",
+    "registry.npmjs.org", "rubygems.org", "snapcraft.io"
+]
+
+LINUX_UA_REGEX = r'(linux|ubuntu|debian|fedora|arch|curl|wget|apt-http|pacman)'
@@ -1,6 +1,32 @@
 import duckdb
+import sys
+from cli import parse_args
+from duck_hunt import WINDOW_OPTIONS, get_parquet_file, parse_window, create_logs_view, format_window
 
-parquet_file = "logs/eve_merged_2026-01-20_to_2026-01-30.parquet"
+# Schema of a Parquet source as the hunts see it: one file, a directory of
+# files or a j2p dataset, with columns unified by name across the files.
+# --from/--to/--last show the files a window would open.
+
+args, options = parse_args(sys.argv[1:], WINDOW_OPTIONS)
+try:
+    window = parse_window(options)
+except ValueError as e:
+    print(f"Error: {e}")
+    sys.exit(1)
+parquet_file = get_parquet_file(args or ["logs"])
+if not parquet_file:
+    print("Usage: python inspect_schema.py [parquet_file_or_logs_dir_or_dataset_dir] [--from=DATE_OR_TIME] [--to=DATE_OR_TIME] [--last=DURATION]")
+    print("Error: No .parquet file found in provided path.")
+    sys.exit(1)
 con = duckdb.connect(':memory:')
-con.execute(f"CREATE VIEW logs AS SELECT * FROM read_parquet('{parquet_file}')")
-print(con.execute("DESCRIBE logs").fetchall())
+try:
+    files = create_logs_view(con, parquet_file, window)
+except ValueError as e:
+    print(f"Error: {e}")
+    sys.exit(1)
+label = f" in {format_window(window)}" if window is not None else ""
+print(f"{parquet_file}: {len(files)} files{label}")
+for f in files:
+    print(f"  {f}")
+if files:
+    print(con.execute("DESCRIBE logs").fetchall())
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from ipaddress import ip_address
+
+# Integer IP helpers shared by ingestion (eve_schema.py) and the orjson
+# scripts. "Private" means RFC 1918 for IPv4 and unique-local (fc00::/7)
+# for IPv6; everything else, including loopback and link-local, is public.
+
+# (network, netmask) pairs on the 32-bit integer form
+RFC1918_V4 = [
+    (0x0A000000, 0xFF000000),  # 10.0.0.0/8
+    (0xAC100000, 0xFFF00000),  # 172.16.0.0/12
+    (0xC0A80000, 0xFFFF0000),  # 192.168.0.0/16
+]
+
+# fc00::/7 on the 128-bit integer form
+ULA_V6 = (0xFC << 120, 0xFE << 120)
+
+_U64 = (1 << 64) - 1
+
+
+def is_private_v4(value):
+    return any(value & mask == net for net, mask in RFC1918_V4)
+
+
+def is_private_v6(value):
+    net, mask = ULA_V6
+    return value & mask == net
+
+
+@lru_cache(maxsize=65536)
+def parse_ip(ip_str):
+    # -> (version, integer) or None for anything that is not an IP address
+    try:
+        ip = ip_address(ip_str)
+    except ValueError:
+        return None
+    return ip.version, int(ip)
+
+
+def ip_parts(ip_str):
+    # -> (v4 u32, v6 high u64, v6 low u64, private) with None for the
+    # fields that do not apply, or None if ip_str is not an IP address
+    parsed = parse_ip(ip_str)
+    if parsed is None:
+        return None
+    version, value = parsed
+    if version == 4:
+        return value, None, None, is_private_v4(value)
+    return None, value >> 64, value & _U64, is_private_v6(value)
+
+
+def is_private(ip_str):
+    parsed = parse_ip(ip_str)
+    if parsed is None:
+        return False
+    version, value = parsed
+    return is_private_v4(value) if version == 4 else is_private_v6(value)
+
+
+# SQL fallback for string IP columns (files ingested before the numeric
+# columns existed). Matches the same ranges as is_private().
+def private_ip_sql(column):
+    return f"""(
+        {column} LIKE '10.%'
+        OR {column} LIKE '192.168.%'
+        OR ({column} LIKE '172.%' AND try_cast(split_part({column}, '.', 2) as INTEGER) BETWEEN 16 AND 31)
+        OR regexp_matches(lower({column}), '^f[cd][0-9a-f]{{2}}:')
+    )"""
@@ -1,22 +1,581 @@
 import polars as pl
+import orjson
 import sys
 import os
+import io
 import glob
+import shutil
+import time
+import datetime
+import hashlib
+import eve_schema
+from cli import parse_args
+from eve_reader import detect_compression, open_eve
+
+# Directory name for dataset (--partition / --incremental) output
+DATASET_DIRNAME = "eve_dataset"
+# Tracks which input bytes are already in the dataset
+MANIFEST_NAME = "_manifest.json"
+# Rotated-away files remembered in the manifest (see find_entry)
+MAX_ROTATED = 100
+# NDJSON bytes parsed per Parquet part in dataset mode
+CHUNK_BYTES = 256 * 1024 * 1024
+
+SINK_OPTIONS = {
+    "compression": "zstd",
+    "compression_level": 5,
+    "row_group_size": 100_000,
+    "maintain_order": True,
+}
+
+# Rows sampled for schema inference in --infer mode
+INFER_ROWS = 50000
+# Bytes read from the head of each input for fields outside the EVE schema
+SAMPLE_BYTES = 8 * 1024 * 1024
+
+def schema_label(infer):
+    return "inferred" if infer else eve_schema.EVE_SCHEMA_VERSION
+
+def sink_options(infer):
+    # The EVE schema version is stored in each file's key-value metadata
+    return dict(SINK_OPTIONS, metadata={"eve_schema_version": str(schema_label(infer))})
+
+def time_sorted(lf):
+    # Rows in timestamp order (nulls last), so each row group covers a narrow
+    # time range and its min/max statistics let readers skip it for queries
+    # on other times. Untyped (--infer) timestamps are ordered by the instant
+    # they denote and stored unchanged.
+    schema = lf.collect_schema()
+    if "timestamp" not in schema:
+        return lf
+    key = pl.col("timestamp")
+    if schema["timestamp"] == pl.String:
+        key = eve_schema.parse_timestamp(key)
+    return lf.sort(key, nulls_last=True, maintain_order=True)
+
+def ordered(lf, sort_time):
+    return time_sorted(lf) if sort_time else lf
+
+def parse_chunk(data, infer, schema=None, extra=()):
+    if infer:
+        if schema is not None:
+            return pl.read_ndjson(io.BytesIO(data), schema=schema)
+        return pl.read_ndjson(io.BytesIO(data), infer_schema_length=INFER_ROWS)
+    raw = pl.read_ndjson(io.BytesIO(data), schema=eve_schema.read_schema(extra), ignore_errors=True)
+    return eve_schema.normalize(raw.lazy(), extra).collect()
+
+def well_formed(data):
+    # Every line of a chunk has the shape of a JSON object ({...}): a test on
+    # the raw bytes, much cheaper than parsing. Blank or CRLF lines fail it.
+    body = data[:-1] if data.endswith(b"\n") else data
+    if not body:
+        return True
+    return body[:1] == b"{" and body[-1:] == b"}" and body.count(b"}\n{") == body.count(b"\n")
+
+def drop_misshapen(data):
+    # -> (data without the lines that are not shaped {...}, lines dropped),
+    # e.g. lines cut short by a crash. Blank lines are left out without
+    # counting.
+    kept = []
+    dropped = 0
+    for line in data.split(b"\n"):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped[:1] == b"{" and stripped[-1:] == b"}":
+            kept.append(line)
+        else:
+            dropped += 1
+    return b"".join(line + b"\n" for line in kept), dropped
+
+def drop_malformed(data):
+    # -> (data without the lines that are not JSON objects, lines dropped).
+    # Blank lines are left out without counting.
+    kept = []
+    dropped = 0
+    for line in data.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            record = None
+        if isinstance(record, dict):
+            kept.append(line)
+        else:
+            dropped += 1
+    return b"".join(line + b"\n" for line in kept), dropped
+
+def read_chunk(data, infer, schema=None, extra=()):
+    # One newline-aligned chunk of NDJSON bytes -> (DataFrame, malformed
+    # lines dropped). The reader gives up on the whole chunk at a line that
+    # is not JSON (ignore_errors only covers values of the wrong type), so
+    # lines that are not shaped like an object are dropped before the one
+    # parse. A line shaped {...} that still is not JSON is rare; then the
+    # chunk is decoded line by line and parsed again without it.
+    dropped = 0
+    if not well_formed(data):
+        data, dropped = drop_misshapen(data)
+    try:
+        return parse_chunk(data, infer, schema, extra), dropped
+    except pl.exceptions.ComputeError:
+        data, malformed = drop_malformed(data)
+        if not malformed:
+            raise
+        dropped += malformed
+    if not data and infer and schema is None:
+        # Nothing left to infer a schema from
+        return pl.DataFrame(), dropped
+    return parse_chunk(data, infer, schema, extra), dropped
+
+# --- Fields Outside the EVE Schema ---
+# Top-level fields the registry does not type (ssh, smb, fileinfo, the stats
+# payload, ...) are stored as JSON text when they show up in the first
+# SAMPLE_BYTES of an input. Searching every line for them would cost a
+# second JSON pass, so after the conversion the event types are checked
+# instead: an event type whose payload (the field named after it) was not
+# stored is reported with its count.
+
+def sample_fields(path, start=0):
+    # Top-level field names in the first SAMPLE_BYTES of path from start
+    with open_eve(path) as eve:
+        data = next(eve.chunks(start, chunk_bytes=SAMPLE_BYTES), b"")
+    names = set()
+    for line in data.split(b"\n"):
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(record, dict):
+            names.update(record)
+    return names
+
+def report_extra_fields(extra):
+    if extra:
+        print(f"Fields outside the EVE schema, stored as JSON text: {', '.join(extra)}")
+
+def count_unstored(frame, extra, counts):
+    # Adds {event_type: events} for the event types of frame (a DataFrame or
+    # LazyFrame) whose payload field is neither typed nor in extra
+    stored = set(eve_schema.RAW_SCHEMA) | set(extra)
+    by_type = frame.lazy().group_by(pl.col("event_type").cast(pl.String)).len()
+    for event_type, events in by_type.collect().iter_rows():
+        if event_type is not None and event_type not in stored:
+            counts[event_type] = counts.get(event_type, 0) + events
+
+def report_unstored(counts):
+    if counts:
+        listed = ", ".join(f"{t} ({n})" for t, n in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+        print(f"Warning: payload not stored for event types outside the EVE schema "
+              f"and the sampled fields: {listed}")
+
+def partition_target(base_path, schema):
+    # Hive layout: <base>/event_type=<type>/date=<YYYY-MM-DD>/<n>.parquet
+    # The key columns live in the directory names, not in the files.
+    if schema["timestamp"] == pl.String:
+        date_key = pl.col("timestamp").str.slice(0, 10)
+    else:
+        date_key = pl.col("timestamp").dt.date().cast(pl.String)
+    keys = {
+        "event_type": pl.col("event_type"),
+        "date": date_key,
+    }
+    # The partitioned sink API was renamed between polars releases
+    if hasattr(pl, "PartitionBy"):
+        return pl.PartitionBy(base_path, key=keys, include_key=False)
+    return pl.PartitionByKey(base_path, by=keys, include_key=False)
+
+def dir_size(path):
+    total = 0
+    for root, _, names in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, n)) for n in names)
+    return total
+
+# --- Dataset Mode ---
+# Input files are converted in newline-aligned byte chunks, one Parquet part
+# per chunk. The manifest records, per input file, the inode and the byte
+# offset converted so far, so a rerun only parses new files and appended
+# tails. A rotated file (same inode, new name) keeps its offset.
+#
+# Compressed files (eve_reader.detect_compression) are streamed, and their
+# offset counts decompressed bytes. logrotate compresses a rotated file into
+# a new inode, so entries also keep a digest of the file's first line: a new
+# file starting with the same line as an entry whose file is gone continues
+# from that entry's offset instead of converting the data twice. An entry
+# whose name is taken over by a new file moves to the manifest's "rotated"
+# list for this match.
+
+def load_manifest(dataset_dir, partitioned):
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    return {"version": 1, "partitioned": partitioned, "schema": None, "files": {}}
+
+def save_manifest(dataset_dir, manifest):
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    os.replace(tmp, path)
+
+def first_line_digest(path):
+    # sha1 of the first complete line (decompressed), or None
+    with open_eve(path) as eve:
+        for chunk in eve.chunks():
+            line, newline, _ = chunk.partition(b"\n")
+            return hashlib.sha1(line).hexdigest() if newline else None
+    return None
+
+def find_entry(manifest, path, st):
+    files = manifest["files"]
+    entry = files.get(path)
+    if entry and entry["dev"] == st.st_dev and entry["inode"] == st.st_ino:
+        return entry
+    # Renamed by log rotation: same inode under a new name
+    for old_path, old in list(files.items()):
+        if old_path != path and old["dev"] == st.st_dev and old["inode"] == st.st_ino:
+            return files.pop(old_path)
+    # Rotated and compressed: same first line as a file that is gone
+    rotated = manifest.setdefault("rotated", [])
+    head = first_line_digest(path)
+    if head is not None:
+        for old_path, old in list(files.items()):
+            if old_path != path and old.get("head") == head and not os.path.exists(old_path):
+                old = files.pop(old_path)
+                old.update(dev=st.st_dev, inode=st.st_ino)
+                return old
+        for i, old in enumerate(rotated):
+            if old.get("head") == head:
+                del rotated[i]
+                old.update(dev=st.st_dev, inode=st.st_ino, parts=[])
+                return old
+    # New file, or the old name now holds a different file
+    parts = entry["parts"] if entry else []
+    if entry:
+        # The old file was rotated away; keep its progress in case it comes
+        # back compressed. Its parts stay listed under the name.
+        rotated.append({k: v for k, v in entry.items() if k != "parts"})
+        del rotated[:-MAX_ROTATED]
+    return {"dev": st.st_dev, "inode": st.st_ino, "offset": 0, "parts": parts}
+
+def iter_chunks(path, start, end, complete=False):
+    # Yields (chunk_end_offset, bytes) for complete lines in [start, end).
+    # A trailing partial line (writer mid-append) is left for the next run,
+    # unless the file is complete: then a last line without newline is kept.
+    with open(path, "rb") as f:
+        pos = start
+        while pos < end:
+            size = CHUNK_BYTES
+            while True:
+                f.seek(pos)
+                data = f.read(min(size, end - pos))
+                cut = data.rfind(b"\n")
+                if cut >= 0 or pos + len(data) >= end:
+                    break
+                size *= 2
+            if cut < 0:
+                if complete and data:
+                    yield pos + len(data), data
+                return
+            yield pos + cut + 1, data[:cut + 1]
+            pos += cut + 1
+
+def iter_stream_chunks(path, start):
+    # iter_chunks for a complete file, e.g. a compressed one, read from
+    # (decompressed) offset start. A last line without newline is kept.
+    with open_eve(path) as eve:
+        pos = start
+        for data in eve.chunks(start, chunk_bytes=CHUNK_BYTES):
+            pos += len(data)
+            yield pos, data
+
+def write_part(lf, dataset_dir, partitioned, part_name, infer):
+    if not partitioned:
+        target = os.path.join(dataset_dir, f"{part_name}.parquet")
+        lf.sink_parquet(target, **sink_options(infer))
+        return [target]
+
+    # Partitioned sinks name files 00000000.parquet etc., so write to a
+    # sibling staging directory and move them in under unique names.
+    staging = f"{dataset_dir}.staging-{part_name}"
+    lf.sink_parquet(partition_target(staging, lf.collect_schema()), mkdir=True, **sink_options(infer))
+    written = []
+    for root, _, names in os.walk(staging):
+        dest_dir = os.path.join(dataset_dir, os.path.relpath(root, staging))
+        for name in names:
+            os.makedirs(dest_dir, exist_ok=True)
+            dest = os.path.join(dest_dir, f"{part_name}-{name}")
+            os.replace(os.path.join(root, name), dest)
+            written.append(dest)
+    shutil.rmtree(staging)
+    return written
+
+def convert_dataset(files, dataset_dir, partitioned, infer, sort_time=True, complete=False):
+    # sort_time: each part's rows in timestamp order (see time_sorted)
+    # complete: the files are no longer written to (one-shot --partition),
+    # so a last line without newline is converted, see iter_chunks
+    os.makedirs(dataset_dir, exist_ok=True)
+    manifest = load_manifest(dataset_dir, partitioned)
+    schema = schema_label(infer)
+    if manifest.get("schema") not in (None, schema):
+        print(f"Warning: {dataset_dir} was written with schema {manifest['schema']}, "
+              f"new parts use {schema}; readers must union by name")
+    manifest["schema"] = schema
+    if partitioned and not manifest["partitioned"]:
+        print(f"Note: keeping the existing {'partitioned' if manifest['partitioned'] else 'flat'} layout of {dataset_dir}")
+    partitioned = manifest["partitioned"]
+
+    run_id = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    seq = 0
+    new_bytes = 0
+    new_rows = 0
+    unstored = {}
+
+    for file_path in files:
+        path = os.path.abspath(file_path)
+        st = os.stat(path)
+        entry = find_entry(manifest, path, st)
+        compressed = detect_compression(path)
+        if compressed:
+            start = entry["offset"]
+            up_to_date = entry.get("size") == st.st_size and entry.get("mtime") == st.st_mtime
+        else:
+            start = entry["offset"] if st.st_size >= entry["offset"] else 0
+            up_to_date = st.st_size <= start
+        if not entry.get("head"):
+            entry["head"] = first_line_digest(path)
+        if up_to_date:
+            print(f"Up to date: {file_path}")
+            manifest["files"][path] = entry
+            continue
+        if start:
+            print(f"Appending {file_path} from byte {start}")
+        else:
+            print(f"Converting {file_path}")
+
+        t0 = time.perf_counter()
+        file_bytes = 0
+        file_rows = 0
+        file_dropped = 0
+        extra = () if infer else eve_schema.unregistered(sample_fields(path, start))
+        report_extra_fields(extra)
+        if compressed:
+            chunks = iter_stream_chunks(path, start)
+        else:
+            chunks = iter_chunks(path, start, st.st_size, complete)
+        for chunk_end, data in chunks:
+            df, dropped = read_chunk(data, infer, extra=extra)
+            if df.height and not infer:
+                count_unstored(df, extra, unstored)
+            if df.height:
+                part_name = f"part-{run_id}-{seq:05d}"
+                seq += 1
+                written = write_part(ordered(df.lazy(), sort_time), dataset_dir, partitioned, part_name, infer)
+                entry["parts"] += [os.path.relpath(w, dataset_dir) for w in written]
+            file_bytes += len(data)
+            file_rows += df.height
+            file_dropped += dropped
+            entry.update(offset=chunk_end, size=st.st_size, mtime=st.st_mtime)
+            manifest["files"][path] = entry
+            save_manifest(dataset_dir, manifest)
+        entry.update(size=st.st_size, mtime=st.st_mtime)
+        manifest["files"][path] = entry
+
+        report_throughput(file_path, file_bytes, file_rows, time.perf_counter() - t0, file_dropped)
+        new_bytes += file_bytes
+        new_rows += file_rows
+
+    save_manifest(dataset_dir, manifest)
+    report_unstored(unstored)
+    return new_bytes, new_rows
+
+# --- Parquet Footer Helpers ---
+
+def date_str(ts):
+    if ts is None: return "unknown"
+    # If parsed as string (common in NDJSON)
+    if isinstance(ts, str):
+        return ts.split("T")[0]
+    # If parsed as datetime
+    if hasattr(ts, "strftime"):
+        return ts.strftime("%Y-%m-%d")
+    return str(ts)[:10]
+
+def parquet_summary(path):
+    # (rows, min timestamp, max timestamp) of a written Parquet file, taken
+    # from the footer statistics when pyarrow is available
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        pq = None
+
+    if pq is not None:
+        meta = pq.ParquetFile(path).metadata
+        paths = [meta.schema.column(j).path for j in range(meta.num_columns)]
+        if "timestamp" in paths:
+            ts_index = paths.index("timestamp")
+            start = end = None
+            complete = True
+            for i in range(meta.num_row_groups):
+                stats = meta.row_group(i).column(ts_index).statistics
+                if stats is None or not stats.has_min_max:
+                    # All-null row groups have no min/max; anything else does
+                    if stats is None or stats.null_count != meta.row_group(i).num_rows:
+                        complete = False
+                        break
+                    continue
+                start = stats.min if start is None else min(start, stats.min)
+                end = stats.max if end is None else max(end, stats.max)
+            if complete:
+                return meta.num_rows, start, end
+
+    # Fallback: read just the timestamp column back from the Parquet file
+    summary = pl.scan_parquet(path).select([
+        pl.len().alias("rows"),
+        pl.col("timestamp").min().alias("start"),
+        pl.col("timestamp").max().alias("end")
+    ]).collect()
+    return summary["rows"][0], summary["start"][0], summary["end"][0]
+
+def date_range_filename(start_ts, end_ts):
+    return f"eve_merged_{date_str(start_ts)}_to_{date_str(end_ts)}.parquet"
+
+def report_throughput(file_path, num_bytes, rows, elapsed, dropped=0):
+    elapsed = max(elapsed, 1e-9)
+    mb = num_bytes / (1024**2)
+    print(f"  {os.path.basename(file_path)}: {mb:.1f} MB, {rows} rows in {elapsed:.2f}s "
+          f"({mb / elapsed:.1f} MB/s, {rows / elapsed:,.0f} rows/s)")
+    if dropped:
+        print(f"  {os.path.basename(file_path)}: skipped {dropped} malformed lines")
+
+def infer_schema(files):
+    plain = [f for f in files if not detect_compression(f)]
+    if plain:
+        try:
+            return pl.scan_ndjson(plain, infer_schema_length=INFER_ROWS).collect_schema()
+        except pl.exceptions.ComputeError:
+            # A line that is not JSON in the sample; use the head of the
+            # first file without it
+            pass
+    # Compressed input only: infer from the head of the first file
+    with open_eve((plain or files)[0]) as eve:
+        head = next(eve.chunks(chunk_bytes=CHUNK_BYTES), b"")
+    return read_chunk(head, True)[0].schema
+
+def well_formed_file(path):
+    with open_eve(path) as eve:
+        return all(well_formed(chunk) for chunk in eve.chunks())
+
+def write_chunk_parts(file_path, staging, i, infer, schema, sort_time, extra=()):
+    # One part per chunk of file_path -> (parts, bytes, malformed lines dropped)
+    parts = []
+    num_bytes = 0
+    dropped = 0
+    for n, (_, data) in enumerate(iter_stream_chunks(file_path, 0)):
+        df, chunk_dropped = read_chunk(data, infer, schema, extra)
+        num_bytes += len(data)
+        dropped += chunk_dropped
+        part = os.path.join(staging, f"{i:05d}-{n:05d}.parquet")
+        ordered(df.lazy(), sort_time).sink_parquet(part, **sink_options(infer))
+        parts.append(part)
+    return parts, num_bytes, dropped
+
+def convert_merged(files, output_dir, infer, sort_time=True):
+    # Each input file is parsed exactly once into its own part, with one
+    # schema shared by all parts. The parts are then merged Parquet-to-Parquet
+    # and the date range for the filename comes from their footers.
+    # Compressed files are streamed into one part per decompressed chunk.
+    # With sort_time every part, and the merge of several, is written in
+    # timestamp order (see time_sorted).
+    schema = infer_schema(files) if infer else None
+    # One set of extra fields for all files, so the parts share a schema
+    extra = () if infer else eve_schema.unregistered(set().union(*(sample_fields(f) for f in files)))
+    report_extra_fields(extra)
+
+    run_id = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    staging = os.path.join(output_dir, f".j2p-staging-{run_id}")
+    os.makedirs(staging)
+
+    parts = []
+    start_ts = end_ts = None
+    try:
+        for i, file_path in enumerate(files):
+            t0 = time.perf_counter()
+            # Inputs with a line that is not shaped like an object are
+            # converted in chunks, dropping such lines (see read_chunk)
+            chunked = detect_compression(file_path) or not well_formed_file(file_path)
+            if not chunked:
+                part = os.path.join(staging, f"{i:05d}.parquet")
+                if infer:
+                    lf = pl.scan_ndjson(file_path, schema=schema)
+                else:
+                    lf = eve_schema.scan_eve(file_path, extra)
+                try:
+                    ordered(lf, sort_time).sink_parquet(part, **sink_options(infer))
+                    file_parts = [part]
+                    num_bytes = os.path.getsize(file_path)
+                    dropped = 0
+                except pl.exceptions.ComputeError:
+                    # A line shaped {...} that is not JSON: convert in
+                    # chunks instead
+                    if os.path.exists(part):
+                        os.remove(part)
+                    chunked = True
+            if chunked:
+                file_parts, num_bytes, dropped = write_chunk_parts(file_path, staging, i, infer, schema, sort_time, extra)
+            elapsed = time.perf_counter() - t0
+
+            rows = 0
+            for part in file_parts:
+                part_rows, part_start, part_end = parquet_summary(part)
+                rows += part_rows
+                if part_start is not None:
+                    start_ts = part_start if start_ts is None else min(start_ts, part_start)
+                if part_end is not None:
+                    end_ts = part_end if end_ts is None else max(end_ts, part_end)
+            report_throughput(file_path, num_bytes, rows, elapsed, dropped)
+            parts += file_parts
+
+        if len(parts) == 1:
+            merged = parts[0]
+        else:
+            merged = os.path.join(staging, "merged.parquet")
+            ordered(pl.scan_parquet(parts), sort_time).sink_parquet(merged, **sink_options(infer))
+
+        output_file = os.path.join(output_dir, date_range_filename(start_ts, end_ts))
+        os.replace(merged, output_file)
+        if not infer:
+            unstored = {}
+            count_unstored(pl.scan_parquet(output_file), extra, unstored)
+            report_unstored(unstored)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return output_file
 
 def convert_json_to_parquet():
     # 1. Check if an argument was provided
-    if len(sys.argv) < 2:
-        print("Usage: python j2p.py <directory_or_file>")
+    args, options = parse_args(sys.argv[1:])
+    if not args:
+        print("Usage: python j2p.py <directory_or_file> [--partition] [--incremental] [--infer] [--arrival-order]")
         sys.exit(1)
 
-    input_path = sys.argv[1]
+    input_path = args[0]
+    partitioned = bool(options.get("partition"))
+    incremental = bool(options.get("incremental"))
+    # Sample-based schema inference instead of the EVE schema registry
+    infer = bool(options.get("infer"))
+    # Rows as they were logged instead of sorted by timestamp
+    sort_time = not options.get("arrival-order")
     files = []
 
     # 2. Handle directory or single file
     if os.path.isdir(input_path):
-        # Look for *.json in the directory
-        pattern = os.path.join(input_path, "*.json")
-        files = sorted(glob.glob(pattern))
+        # Look for *.json in the directory, plus rotated logs compressed
+        # with gzip/zstd/bz2 (eve.json.1.gz, eve-20260120.json.zst, ...)
+        pattern = os.path.join(input_path, "*.json*")
+        files = sorted(f for f in glob.glob(pattern)
+                       if f.endswith(".json") or (os.path.isfile(f) and detect_compression(f)))
         if not files:
             print(f"No .json files found in directory: {input_path}")
             sys.exit(1)
@@ -25,63 +584,37 @@ def convert_json_to_parquet():
         files = [input_path]
         print(f"Processing file: {input_path}")
 
+    # Determine output path
+    if os.path.isdir(input_path):
+        output_dir = input_path
+    else:
+        output_dir = os.path.dirname(input_path) or "."
+
     try:
-        # 3. Lazy Scan
-        # Passing a list of files to scan_ndjson
-        q = pl.scan_ndjson(files, infer_schema_length=50000)
+        if partitioned or incremental:
+            # 3. Chunked conversion into a dataset directory
+            dataset_dir = os.path.join(output_dir, DATASET_DIRNAME)
+            if not incremental and os.path.isdir(dataset_dir) and os.listdir(dataset_dir):
+                print(f"Error: {dataset_dir} already exists and is not empty (use --incremental to append).")
+                sys.exit(1)
 
-        print("Scanning data to determine date range (min/max timestamp)...")
-        
-        # 4. Determine Date Range for Filename
-        # Optimization: Select only the timestamp column to avoid reading full rows
-        try:
-            dates = q.select([
-                pl.col("timestamp").min().alias("start"),
-                pl.col("timestamp").max().alias("end")
-            ]).collect()
-            
-            start_ts = dates["start"][0]
-            end_ts = dates["end"][0]
-            
-            # Helper to format date
-            def get_date_str(ts):
-                if ts is None: return "unknown"
-                # If parsed as string (common in NDJSON)
-                if isinstance(ts, str):
-                    return ts.split("T")[0]
-                # If parsed as datetime
-                if hasattr(ts, "strftime"):
-                    return ts.strftime("%Y-%m-%d")
-                return str(ts)[:10]
-
-            start_str = get_date_str(start_ts)
-            end_str = get_date_str(end_ts)
-            
-            filename = f"eve_merged_{start_str}_to_{end_str}.parquet"
-            
-        except Exception as e:
-            print(f"Warning: Could not determine dates from 'timestamp' field: {e}")
-            filename = "eve_merged_unknown_dates.parquet"
-
-        # Determine output path
-        if os.path.isdir(input_path):
-            output_file = os.path.join(input_path, filename)
-        else:
-            output_file = os.path.join(os.path.dirname(input_path) or ".", filename)
+            print(f"Destination: {dataset_dir}")
+            print("-" * 30)
+            new_bytes, new_rows = convert_dataset(files, dataset_dir, partitioned, infer, sort_time,
+                                                  complete=not incremental)
 
-        print(f"Destination: {output_file}")
-        print("-" * 30)
+            print(f"Success!")
+            print(f"New Input:    {new_bytes / (1024**3):.2f} GB ({new_rows} rows)")
+            print(f"Dataset Size: {dir_size(dataset_dir) / (1024**3):.2f} GB")
+            return
 
-        # 5. Sink to Parquet
-        q.sink_parquet(
-            output_file, 
-            compression="zstd",
-            compression_level=5,
-            row_group_size=100_000, 
-            maintain_order=True
-        )
+        # 3. Single pass: per-file parts, merged and named from footer stats
+        print(f"Destination: {output_dir}")
+        print("-" * 30)
+        output_file = convert_merged(files, output_dir, infer, sort_time)
+        print(f"Written: {output_file}")
         
-        # 6. Final stats
+        # 4. Final stats
         orig_size = sum(os.path.getsize(f) for f in files)
         orig_size_gb = orig_size / (1024**3)
         new_size_gb = os.path.getsize(output_file) / (1024**3)
@@ -94,4 +627,4 @@ def convert_json_to_parquet():
         print(f"\nError: {e}")
 
 if __name__ == "__main__":
-    convert_json_to_parquet()
\ No newline at end of file
+    convert_json_to_parquet()
@@ -0,0 +1,128 @@
+import re
+
+# Multi-pattern substring matching for keyword lists (cloud/IoT/Windows
+# indicators). A KeywordMatcher is built once per list and finds every
+# keyword in a string in one left-to-right pass, case-insensitively, instead
+# of one `in` test (or one ILIKE) per keyword.
+#
+# Uses the pyahocorasick automaton when it is installed. Otherwise the
+# keyword trie is compiled into a single regular expression that reports,
+# at each position, the longest keyword starting there; the shorter
+# keywords starting at the same position are exactly its keyword prefixes,
+# which are precomputed. Both give the same results.
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+_SPECIAL = set("\\.^$|?*+()[]{}")
+
+
+def _escape(char):
+    return "\\" + char if char in _SPECIAL else char
+
+
+def _trie_pattern(node):
+    # node: {char: child}; "" marks the end of a keyword
+    branches = []
+    for char in sorted(k for k in node if k):
+        branches.append(_escape(char) + _trie_pattern(node[char]))
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        return f"(?:{body})?"
+    return body
+
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        # Keyword order is kept: first() and findall() report in list order
+        self.keywords = list(dict.fromkeys(k.lower() for k in keywords if k))
+        self.rank = {k: i for i, k in enumerate(self.keywords)}
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = True
+        # Also valid RE2 syntax, so DuckDB's regexp_matches() can use it
+        self.pattern = _trie_pattern(trie)
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, self.rank[keyword])
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._regex = re.compile(f"(?=({self.pattern}))") if self.keywords else None
+            self._search = re.compile(self.pattern).search if self.keywords else None
+            # longest match -> ranks of every keyword that is a prefix of it
+            self._prefixes = {
+                k: tuple(self.rank[p] for p in self.keywords if k.startswith(p))
+                for k in self.keywords
+            }
+
+    def _ranks(self, text):
+        text = text.lower()
+        if self._automaton is not None:
+            return {rank for _, rank in self._automaton.iter(text)}
+        if self._regex is None:
+            return set()
+        ranks = set()
+        for longest in set(self._regex.findall(text)):
+            ranks.update(self._prefixes[longest])
+        return ranks
+
+    def findall(self, text):
+        # -> every keyword contained in text, in keyword-list order
+        if not text:
+            return []
+        return [self.keywords[r] for r in sorted(self._ranks(text))]
+
+    def first(self, text):
+        # -> the earliest keyword (in list order) contained in text, or None
+        if not text:
+            return None
+        ranks = self._ranks(text)
+        return self.keywords[min(ranks)] if ranks else None
+
+    def matches(self, text):
+        if not text:
+            return False
+        if self._automaton is not None:
+            return bool(self._ranks(text))
+        # Any keyword at all: stop at the first hit
+        return self._search is not None and self._search(text.lower()) is not None
+
+
+def sql_match(column, matcher):
+    # DuckDB predicate: column contains any of the matcher's keywords.
+    # One RE2 pass over lower(column) instead of an ILIKE per keyword.
+    if not matcher.keywords:
+        return "false"
+    pattern = matcher.pattern.replace("'", "''")
+    return f"regexp_matches(lower({column}), '{pattern}')"
+
+
+def register_duckdb_matcher(con, name, matcher):
+    # SQL function name(VARCHAR) -> VARCHAR[] of matched keywords, or NULL
+    # when nothing matches. Vectorized over Arrow batches: each distinct
+    # value in a batch is matched once.
+    import duckdb
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    def match_batch(values):
+        if isinstance(values, pa.ChunkedArray):
+            values = values.combine_chunks()
+        encoded = pc.dictionary_encode(values)
+        distinct = [matcher.findall(v) or None for v in encoded.dictionary.to_pylist()]
+        return pa.array(distinct, type=pa.list_(pa.string())).take(encoded.indices)
+
+    con.create_function(
+        name, match_batch, [duckdb.sqltype("VARCHAR")], duckdb.list_type(duckdb.sqltype("VARCHAR")),
+        type="arrow", null_handling="special", side_effects=False,
+    )
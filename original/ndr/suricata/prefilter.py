@@ -0,0 +1,90 @@
+import re
+
+# Byte-level prefilter for the orjson hunts. Rather than decoding every line,
+# the scan searches whole blocks of raw bytes for the few lines a detector
+# could use (by its event_types and optional needles) and only those are
+# passed to orjson.loads. The search runs in the regex engine, so skipped
+# lines cost no Python work at all.
+#
+# A line is a candidate when it contains any of:
+#   - "event_type":"<wanted type>" for a detector that filters on event_types
+#   - a needle: the quoted bytes of a string value a detector requires, such
+#     as the host IP of profile_host.py
+#   - a \u escape, since JSON can only hide the letters of a key, an event
+#     type or an IP address behind \u; without one they appear verbatim
+#   - "event_type" not followed by :" (whitespace around the colon, or the
+#     name used as a value), where the type cannot be read from the bytes
+# Every other line either has a top-level event_type written as
+# "event_type":"<other>" or none at all, and holds none of the needles, so no
+# detector would act on it. Candidates are still routed on the decoded record,
+# so a false positive costs time, never output.
+
+EVENT_TYPE_KEY = b'"event_type"'
+EVENT_TYPE_TOKEN = b'"event_type":"'
+_LOOSE_KEY = re.compile(re.escape(EVENT_TYPE_KEY) + b'(?!:")')
+
+# Characters whose JSON encoding is always the character itself (no "\/")
+_PLAIN_NEEDLE = re.compile(r"[0-9A-Za-z.:%_\-]+")
+
+
+def needle(value):
+    # -> the bytes a line must contain for one of its strings to equal value,
+    # or None when the value could be written with escapes
+    if not _PLAIN_NEEDLE.fullmatch(value):
+        return None
+    return b'"' + value.encode() + b'"'
+
+
+class LinePrefilter:
+    def __init__(self, detectors):
+        tokens = set()
+        needles = set()
+        self.active = bool(detectors)
+        for d in detectors:
+            rule_needles = getattr(d, "needles", None)
+            if rule_needles is not None:
+                # Needles alone pick a superset of the lines the detector wants
+                needles.update(rule_needles)
+            elif d.event_types is not None:
+                tokens.update(EVENT_TYPE_TOKEN + t.encode() + b'"' for t in d.event_types)
+            else:
+                # A detector taking every line turns the filter off
+                self.active = False
+
+        # Searched one literal at a time: bytes.find is far faster than a
+        # regex alternation, which tries every pattern at every offset
+        self.literals = sorted(tokens | needles)
+        self.check_key = bool(tokens)
+
+    def wants(self, line):
+        if b'\\u' in line or any(literal in line for literal in self.literals):
+            return True
+        return self.check_key and _LOOSE_KEY.search(line) is not None
+
+    def candidates(self, block):
+        # Yields the candidate lines of a block of whole lines, in order
+        starts = set()
+        # Backslashes are rare, and a one-byte find is a plain memchr
+        pos = block.find(b'\\')
+        while pos >= 0:
+            if block[pos + 1:pos + 2] == b'u':
+                starts.add(block.rfind(b'\n', 0, pos) + 1)
+            pos = block.find(b'\\', pos + 2)
+        for literal in self.literals:
+            pos = block.find(literal)
+            while pos >= 0:
+                starts.add(block.rfind(b'\n', 0, pos) + 1)
+                end = block.find(b'\n', pos)
+                if end < 0:
+                    break
+                pos = block.find(literal, end)
+        # Every "event_type" is compact unless the counts differ
+        if self.check_key and block.count(EVENT_TYPE_KEY) != block.count(EVENT_TYPE_TOKEN):
+            for match in _LOOSE_KEY.finditer(block):
+                starts.add(block.rfind(b'\n', 0, match.start()) + 1)
+
+        # memoryview slices: orjson decodes them without a copy
+        view = memoryview(block)
+        for start in sorted(starts):
+            end = block.find(b'\n', start)
+            yield view[start:] if end < 0 else view[start:end + 1]
@@ -1,85 +1,423 @@
+import datetime
+import heapq
+import os
+import sqlite3
 import sys
-import orjson
 from collections import Counter
+from ipaddress import ip_address, ip_network
+from cli import parse_args
+from eve_engine import Detector, run, scan_detectors
+from eve_follow import FOLLOW_OPTIONS, follow, follow_option
+from eve_scan import jobs_option
+from ipnet import is_private
+from prefilter import needle
+from sketches import SKETCH_OPTIONS, HyperLogLog, SpaceSaving, format_count, format_distinct, run_sketches, sketch_option
 
-def analyze_logs(host, file_paths):
-    outbound_ports = Counter()
-    inbound_ports = Counter()
-    protocols = Counter()
-    sites = Counter()
-    
-    for file_path in file_paths:
-        try:
-            with open(file_path, 'rb') as f:
-                for line in f:
-                    try:
-                        record = orjson.loads(line)
-                    except orjson.JSONDecodeError:
-                        continue
-                        
-                    if record.get("event_type") == "stats":
-                        continue
-                        
-                    src_ip = record.get("src_ip")
-                    dest_ip = record.get("dest_ip")
-                    
-                    if src_ip != host and dest_ip != host:
-                        continue
-                        
-                    # Protocol
-                    if "proto" in record:
-                        protocols[record["proto"]] += 1
-                        
-                    # Ports
-                    if src_ip == host:
-                        # Outbound traffic, interested in where it's going
-                        if "dest_port" in record:
-                            outbound_ports[record["dest_port"]] += 1
-                    else:
-                        # Inbound traffic, interested in what port on host is being accessed
-                        if "dest_port" in record:
-                            inbound_ports[record["dest_port"]] += 1
-
-                    # Sites
-                    event_type = record.get("event_type")
-                    if event_type == "dns" and "dns" in record:
-                        if "rrname" in record["dns"]:
-                            sites[record["dns"]["rrname"]] += 1
-                    elif event_type == "tls" and "tls" in record:
-                        if "sni" in record["tls"]:
-                            sites[record["tls"]["sni"]] += 1
-                    elif event_type == "quic" and "quic" in record:
-                        if "sni" in record["quic"]:
-                            sites[record["quic"]["sni"]] += 1
-                    elif event_type == "http" and "http" in record:
-                        if "hostname" in record["http"]:
-                            sites[record["http"]["hostname"]] += 1
-
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}", file=sys.stderr)
+COUNTERS = ["outbound_ports", "inbound_ports", "protocols", "sites"]
+# Site of each event type, as read from Parquet
+SITE_FIELDS = [("dns", "dns.rrname"), ("tls", "tls.sni"), ("quic", "quic.sni"), ("http", "http.hostname")]
+# Site field of each event type in EVE records
+SITE_KEYS = {"dns": "rrname", "tls": "sni", "quic": "sni", "http": "hostname"}
+# Lists shown per profile: (title, counter, entries)
+SECTIONS = [
+    ("Top Protocols", "protocols", 10),
+    ("Top Outbound Ports (Remote Services Accessed)", "outbound_ports", 10),
+    ("Top Inbound Ports (Services Hosted)", "inbound_ports", 10),
+    ("Top Sites (Domains)", "sites", 20),
+]
+# SpaceSaving counters per list and host in batch mode
+DEFAULT_BATCH_TOP = 50
+DEFAULT_PROFILES_FILE = "host_profiles.db"
+PROFILES_SUFFIX = ".db"
+
+def most_common(counter, n):
+    # Counter.most_common() with ties in value order, as SpaceSaving lists
+    # them, so the JSON and Parquet modes print equal counts alike
+    return heapq.nsmallest(n, counter.items(), key=lambda pair: (-pair[1], str(pair[0])))
+
+class HostProfile(Detector):
+    def __init__(self, host, sketch_size=None):
+        self.host = host
+        # SpaceSaving counters per top-N list; None counts exactly
+        self.sketch_size = sketch_size
+        # Only lines naming the host as a string can match src_ip/dest_ip
+        host_needle = needle(host)
+        if host_needle is not None:
+            self.needles = (host_needle,)
+
+    def init(self):
+        if self.sketch_size:
+            profile = {name: SpaceSaving(self.sketch_size) for name in COUNTERS}
+            # Distinct sites and peer addresses
+            profile["distinct_sites"] = HyperLogLog()
+            profile["distinct_peers"] = HyperLogLog()
+            return profile
+        return {name: Counter() for name in COUNTERS}
+
+    def update(self, profile, record):
+        src_ip = record.get("src_ip")
+        dest_ip = record.get("dest_ip")
+        host = self.host
+
+        if src_ip != host and dest_ip != host:
+            return
+
+        event_type = record.get("event_type")
+        if event_type == "stats":
+            return
+
+        # Outbound traffic: where it's going. Inbound traffic: what port on
+        # the host is being accessed.
+        ports = "outbound_ports" if src_ip == host else "inbound_ports"
+        site = None
+        key = SITE_KEYS.get(event_type)
+        if key is not None:
+            app = record.get(event_type)
+            if isinstance(app, dict):
+                site = app.get(key)
+
+        if self.sketch_size:
+            if "proto" in record:
+                profile["protocols"].add(record["proto"])
+            if "dest_port" in record:
+                profile[ports].add(record["dest_port"])
+            peer = dest_ip if src_ip == host else src_ip
+            if peer is not None:
+                profile["distinct_peers"].add(peer)
+            if site is not None:
+                profile["sites"].add(site)
+                profile["distinct_sites"].add(site)
+            return
+
+        if "proto" in record:
+            profile["protocols"][record["proto"]] += 1
+        if "dest_port" in record:
+            profile[ports][record["dest_port"]] += 1
+        if site is not None:
+            profile["sites"][site] += 1
+
+    def checkpoint_key(self):
+        if self.sketch_size:
+            return f"HostProfile({self.host}, sketch={self.sketch_size})"
+        return f"HostProfile({self.host})"
+
+    def merge(self, profile, other):
+        for name, counts in other.items():
+            if self.sketch_size:
+                profile[name].merge(counts)
+            else:
+                profile[name].update(counts)
+        return profile
+
+    def finalize(self, profile, totals):
+        print(f"Profile for Host: {self.host}")
+        print("-" * 30)
+        if self.sketch_size:
+            self.finalize_sketches(profile)
+            return
+
+        for title, name, limit in SECTIONS:
+            print(f"\n{title}:")
+            for value, count in most_common(profile[name], limit):
+                print(f"  {value}: {count}")
+
+    def finalize_sketches(self, profile):
+        print(f"(top {self.sketch_size} sketches: counts marked ~ may be over by the amount shown)")
+        print(f"Distinct sites: {format_distinct(profile['distinct_sites'])}")
+        print(f"Distinct peers: {format_distinct(profile['distinct_peers'])}")
+        for title, name, limit in SECTIONS:
+            print(f"\n{title}:")
+            for value, count, error in profile[name].most_common(limit):
+                print(f"  {value}: {format_count(count, error)}")
+
+def analyze_logs(host, file_paths, jobs=1):
+    run([HostProfile(host)], file_paths, jobs)
+
+# --- Batch ---
+# Profiles of many hosts from one pass over the logs: every private host
+# (--all), a list (--hosts=a,b or --hosts=FILE with one address per line) or
+# the hosts in networks (--cidr=10.0.0.0/8,fd00::/8). Each host keeps its
+# event counts and a SpaceSaving top-K per list, so memory grows with the
+# number of hosts but not with their traffic. The result is written to a
+# SQLite file keyed by host, which `profile_host.py <ip> <file.db>` reads.
+
+class HostProfiles(Detector):
+    def __init__(self, hosts=None, networks=None, top=DEFAULT_BATCH_TOP):
+        # Neither hosts nor networks: every private address
+        self.hosts = set(hosts) if hosts else None
+        self.networks = networks
+        self.top = top
+        # Address -> whether it is profiled, memoised per address
+        self.selected = {}
+        if self.hosts:
+            host_needles = [needle(host) for host in self.hosts]
+            if None not in host_needles:
+                self.needles = tuple(host_needles)
+
+    def selection(self):
+        if self.hosts:
+            return f"hosts={','.join(sorted(self.hosts))}"
+        if self.networks:
+            return f"cidr={','.join(str(net) for net in self.networks)}"
+        return "all private hosts"
+
+    def wants(self, ip):
+        if ip is None:
+            return False
+        wanted = self.selected.get(ip)
+        if wanted is None:
+            if self.hosts:
+                wanted = ip in self.hosts
+            elif self.networks:
+                try:
+                    address = ip_address(ip)
+                except ValueError:
+                    address = None
+                wanted = address is not None and any(address in net for net in self.networks)
+            else:
+                wanted = is_private(ip)
+            self.selected[ip] = wanted
+        return wanted
 
+    def init(self):
+        return {}
+
+    def new_profile(self):
+        profile = {name: SpaceSaving(self.top) for name in COUNTERS}
+        profile.update(events=0, outbound=0, inbound=0)
+        return profile
+
+    def update(self, profiles, record):
+        event_type = record.get("event_type")
+        if event_type == "stats":
+            return
+        src_ip = record.get("src_ip")
+        dest_ip = record.get("dest_ip")
+        sides = []
+        if self.wants(src_ip):
+            sides.append((src_ip, "outbound"))
+        if dest_ip != src_ip and self.wants(dest_ip):
+            sides.append((dest_ip, "inbound"))
+        if not sides:
+            return
+
+        proto = record.get("proto")
+        dest_port = record.get("dest_port")
+        site = None
+        key = SITE_KEYS.get(event_type)
+        if key is not None:
+            app = record.get(event_type)
+            if isinstance(app, dict):
+                site = app.get(key)
+        for host, direction in sides:
+            profile = profiles.get(host)
+            if profile is None:
+                profile = profiles[host] = self.new_profile()
+            profile["events"] += 1
+            profile[direction] += 1
+            if proto is not None:
+                profile["protocols"].add(proto)
+            if dest_port is not None:
+                profile[f"{direction}_ports"].add(dest_port)
+            if site is not None:
+                profile["sites"].add(site)
+
+    def checkpoint_key(self):
+        return f"HostProfiles({self.selection()}, top={self.top})"
+
+    def merge(self, profiles, other):
+        for host, theirs in other.items():
+            ours = profiles.get(host)
+            if ours is None:
+                profiles[host] = theirs
+                continue
+            for name in COUNTERS:
+                ours[name].merge(theirs[name])
+            for name in ("events", "outbound", "inbound"):
+                ours[name] += theirs[name]
+        return profiles
+
+    def finalize(self, profiles, totals):
+        print(f"Profiled {len(profiles)} hosts ({self.selection()}) from {totals['lines']} lines")
+        busiest = sorted(profiles.items(), key=lambda item: (-item[1]["events"], item[0]))
+        print("\nBusiest hosts (events, outbound, inbound):")
+        for host, profile in busiest[:10]:
+            print(f"  {host}: {profile['events']}, {profile['outbound']}, {profile['inbound']}")
+
+def save_profiles(path, detector, profiles, totals, sources):
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    db.executescript("""
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE hosts (host TEXT PRIMARY KEY, events INTEGER, outbound INTEGER, inbound INTEGER);
+        CREATE TABLE entries (
+            host TEXT, list TEXT, rank INTEGER, value TEXT, count INTEGER, error INTEGER,
+            PRIMARY KEY (host, list, rank)
+        ) WITHOUT ROWID;
+    """)
+    db.executemany("INSERT INTO meta VALUES (?, ?)", [
+        ("created", datetime.datetime.now().isoformat(timespec="seconds")),
+        ("selection", detector.selection()),
+        ("top", str(detector.top)),
+        ("sources", " ".join(sources)),
+        ("lines", str(totals["lines"])),
+    ])
+    db.executemany("INSERT INTO hosts VALUES (?, ?, ?, ?)", [
+        (host, profile["events"], profile["outbound"], profile["inbound"]) for host, profile in profiles.items()
+    ])
+    db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", (
+        (host, name, rank, str(value), count, error)
+        for host, profile in profiles.items()
+        for name in COUNTERS
+        for rank, (value, count, error) in enumerate(profile[name].most_common())
+    ))
+    db.commit()
+    db.close()
+    os.replace(tmp, path)
+
+def analyze_batch(file_paths, options, jobs=1):
+    detector = HostProfiles(options.get("hosts"), options.get("networks"), options["top"])
+    totals, (profiles,) = scan_detectors([detector], file_paths, jobs)
+    detector.finalize(profiles, totals)
+    save_profiles(options["out"], detector, profiles, totals, file_paths)
+    print(f"\nSaved {len(profiles)} profiles to {options['out']}")
+
+def is_profiles_file(path):
+    return path.endswith(PROFILES_SUFFIX)
+
+def show_saved_profile(host, path):
+    if not os.path.isfile(path):
+        print(f"Error: {path} not found")
+        sys.exit(1)
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    meta = dict(db.execute("SELECT key, value FROM meta"))
     print(f"Profile for Host: {host}")
     print("-" * 30)
-    
-    print("\nTop Protocols:")
-    for proto, count in protocols.most_common(10):
-        print(f"  {proto}: {count}")
-        
-    print("\nTop Outbound Ports (Remote Services Accessed):")
-    for port, count in outbound_ports.most_common(10):
-        print(f"  {port}: {count}")
-
-    print("\nTop Inbound Ports (Services Hosted):")
-    for port, count in inbound_ports.most_common(10):
-        print(f"  {port}: {count}")
-
-    print("\nTop Sites (Domains):")
-    for site, count in sites.most_common(20):
-        print(f"  {site}: {count}")
+    counts = db.execute("SELECT events, outbound, inbound FROM hosts WHERE host = ?", [host]).fetchone()
+    if counts is None:
+        print(f"No events in {path} ({meta['selection']})")
+        return
+    print(f"(from {path}, {meta['created']}: top {meta['top']} per list; counts marked ~ may be over by the amount shown)")
+    print(f"Events: {counts[0]} ({counts[1]} outbound, {counts[2]} inbound)")
+    for title, name, limit in SECTIONS:
+        print(f"\n{title}:")
+        for value, count, error in db.execute(
+                "SELECT value, count, error FROM entries WHERE host = ? AND list = ? ORDER BY rank LIMIT ?", [host, name, limit]):
+            print(f"  {value}: {format_count(count, error)}")
+
+# Options of batch_option() that take a value (cli.parse_args)
+BATCH_OPTIONS = {"hosts", "cidr", "out", "top"}
+
+def batch_option(options):
+    # --all, --hosts=, --cidr=, --out= and --top= -> batch options, or None
+    # when not batch profiling
+    batch_options = {}
+    if options.get("all"):
+        batch_options["all"] = True
+    if "hosts" in options:
+        value = options["hosts"]
+        if os.path.isfile(value):
+            with open(value) as f:
+                value = ",".join(line.strip() for line in f if line.strip() and not line.startswith("#"))
+        batch_options["hosts"] = [host for host in value.split(",") if host]
+    if "cidr" in options:
+        batch_options["networks"] = [ip_network(net, strict=False) for net in options["cidr"].split(",") if net]
+    if not batch_options:
+        return None
+    batch_options["out"] = options.get("out", DEFAULT_PROFILES_FILE)
+    batch_options["top"] = max(1, int(options.get("top", DEFAULT_BATCH_TOP)))
+    return batch_options
+
+# --- Parquet ---
+# The same profile from Parquet files, a host_layout.py layout or any source
+# duck_hunt.py reads. Only the row groups the host indexes name are read.
+
+def is_parquet_source(path):
+    return os.path.isdir(path) or path.endswith(".parquet")
+
+def site_expression(con, parquet_file):
+    # CASE over the site fields the file has
+    import duckdb
+    cases = []
+    for event_type, field in SITE_FIELDS:
+        try:
+            con.execute(f"SELECT {field} FROM read_parquet('{parquet_file}') LIMIT 0")
+        except duckdb.Error:
+            continue
+        cases.append(f"WHEN event_type = '{event_type}' THEN {field}")
+    return f"CASE {' '.join(cases)} END" if cases else "NULL"
+
+def analyze_parquet(host, path):
+    # Imported here: the JSON modes should not pay for loading DuckDB
+    import duckdb
+    from duck_hunt import get_parquet_file
+    from host_layout import LAYOUT_SIDES, host_scans
+    con = duckdb.connect(database=':memory:')
+    if not all(os.path.isdir(os.path.join(path, side)) for side in LAYOUT_SIDES):
+        path = get_parquet_file([path])
+        if not path:
+            print("Error: No .parquet file found in provided path.")
+            sys.exit(1)
+    scans, read, total = host_scans(con, path, host)
+    print(f"Reading {read} of {total} row groups from {len(scans)} files")
+    profile = {name: Counter() for name in COUNTERS}
+    if scans:
+        literal = "'" + host.replace("'", "''") + "'"
+        selects = [
+            f"""SELECT src_ip = {literal} AS outbound, proto, dest_port, {site_expression(con, parquet_file)} AS site
+                FROM read_parquet('{parquet_file}', file_row_number=true)
+                WHERE {where} AND event_type IS DISTINCT FROM 'stats'"""
+            for parquet_file, where in scans
+        ]
+        con.execute(f"CREATE TEMP TABLE host_events AS {' UNION ALL '.join(selects)}")
+        for name, value, condition in [
+            ("protocols", "proto", "proto IS NOT NULL"),
+            ("outbound_ports", "dest_port", "outbound AND dest_port IS NOT NULL"),
+            ("inbound_ports", "dest_port", "NOT coalesce(outbound, false) AND dest_port IS NOT NULL"),
+            ("sites", "site", "site IS NOT NULL"),
+        ]:
+            rows = con.execute(f"SELECT {value}, count(*) FROM host_events WHERE {condition} GROUP BY 1 ORDER BY 2 DESC, 1").fetchall()
+            profile[name].update(dict(rows))
+    HostProfile(host).finalize(profile, None)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python profile_host.py <host_ip> <log_file1> [log_file2 ...]")
+    args, options = parse_args(sys.argv[1:], FOLLOW_OPTIONS | SKETCH_OPTIONS | BATCH_OPTIONS)
+    jobs = jobs_option(options)
+    follow_options = follow_option(options)
+    sketch_options = sketch_option(options)
+    try:
+        batch_options = batch_option(options)
+    except ValueError as e:
+        print(f"Error: {e}")
         sys.exit(1)
-    
-    analyze_logs(sys.argv[1], sys.argv[2:])
+    if batch_options:
+        if not args or follow_options or sketch_options:
+            print("Usage: python profile_host.py --all|--hosts=a,b|--hosts=FILE|--cidr=NET[,NET] <log_file1> [...] [--out=host_profiles.db] [--top=K] [--jobs[=N]]")
+            sys.exit(1)
+        analyze_batch(args, batch_options, jobs)
+        sys.exit(0)
+    if len(args) < 2 or (follow_options and len(args) != 2):
+        print("Usage: python profile_host.py <host_ip> <log_file1> [log_file2 ...] [--jobs[=N]]")
+        print("       python profile_host.py <host_ip> <log_file|file.sketch> [...] --sketch[=K] [--save-sketch=PATH] [--jobs[=N]]")
+        print("       python profile_host.py <host_ip> <eve.json> --follow|--once [--checkpoint=PATH] [--interval=SECONDS] [--sketch[=K]]")
+        print("       python profile_host.py <host_ip> <parquet_file_or_dir_or_host_layout_dir>")
+        print("       python profile_host.py <host_ip> <host_profiles.db>")
+        print("       python profile_host.py --all|--hosts=a,b|--hosts=FILE|--cidr=NET[,NET] <log_file1> [...] [--out=host_profiles.db] [--top=K] [--jobs[=N]]")
+        sys.exit(1)
+
+    sketch_size = sketch_options["size"] if sketch_options else None
+    if is_profiles_file(args[1]):
+        show_saved_profile(args[0], args[1])
+    elif is_parquet_source(args[1]):
+        if len(args) != 2 or follow_options or sketch_options:
+            print("Error: a Parquet source is profiled exactly, on its own")
+            sys.exit(1)
+        analyze_parquet(args[0], args[1])
+    elif follow_options:
+        follow([HostProfile(args[0], sketch_size)], args[1], follow_options)
+    elif sketch_options:
+        run_sketches([HostProfile(args[0], sketch_size)], args[1:], sketch_options, jobs)
+    else:
+        analyze_logs(args[0], args[1:], jobs)
@@ -0,0 +1,224 @@
+import contextlib
+import datetime
+import os
+import threading
+import orjson
+
+# Per-query profiles for the DuckDB reports (duck_hunt.py and
+# analyze_malware.py with --profile[=PATH]). Every query run through their
+# run_query is recorded with DuckDB's JSON profile of it: latency and CPU
+# time, rows returned and scanned, peak buffer memory and the operator tree
+# with each operator's time and row counts. For each table or Parquet scan
+# the summary keeps the columns it projected, the filters DuckDB pushed into
+# it and, for partitioned datasets, how many files it read out of those it
+# could have ("Scanning Files: 1/7" after partition pruning). A query
+# that fails is recorded with its error.
+#
+# The full profiles go to a JSON sidecar next to the report
+# (<report>.profile.json); format_appendix() summarises them for the
+# Markdown report. DuckDB reports rows scanned per file, not per row group,
+# so pruning inside a file does not show in these numbers. Its bytes-read
+# counter is left out: it is not the bytes fetched from Parquet files.
+
+PROFILE_VERSION = 1
+PROFILE_SUFFIX = ".profile.json"
+# Operators kept per query in the summary, slowest first
+TOP_OPERATORS = 3
+# Queries listed in the appendix, slowest first
+APPENDIX_QUERIES = 15
+# Distinct scans shown per query in the appendix
+APPENDIX_SCANS = 3
+# Characters of SQL shown per query in the appendix
+QUERY_PREVIEW = 70
+# Section of queries run outside any report section
+SETUP_SECTION = "Setup"
+# Profile keys copied into each query's record
+QUERY_METRICS = {
+    "latency": 0.0,
+    "cpu_time": 0.0,
+    "rows_returned": 0,
+    "cumulative_rows_scanned": 0,
+    "system_peak_buffer_memory": 0,
+}
+OPERATOR_KEYS = ["operator_name", "operator_type", "operator_timing", "operator_cardinality", "operator_rows_scanned", "extra_info"]
+
+
+def enable_profiling(con):
+    # Profiling is per connection: every cursor needs it switched on.
+    # -> False when this DuckDB cannot profile
+    try:
+        con.execute("PRAGMA enable_profiling='no_output'")
+        return True
+    except Exception as e:
+        print(f"Query profiling unavailable: {e}")
+        return False
+
+
+def default_profile_path(report_filename):
+    return os.path.splitext(report_filename)[0] + PROFILE_SUFFIX
+
+
+def operator_tree(node):
+    # The profile's operators without the planner/optimizer timings
+    return [
+        dict({key: child.get(key) for key in OPERATOR_KEYS}, children=operator_tree(child))
+        for child in node.get("children", [])
+    ]
+
+
+def walk_operators(operators):
+    for op in operators:
+        yield op
+        yield from walk_operators(op["children"])
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def scan_summary(op):
+    extra = op.get("extra_info") or {}
+    return {
+        "operator": op["operator_name"],
+        "table": extra.get("Table") or extra.get("Function"),
+        "projections": extra.get("Projections"),
+        "filters": as_list(extra.get("Filters")) + as_list(extra.get("File Filters")),
+        "files": extra.get("Scanning Files") or extra.get("Total Files Read"),
+        "rows_scanned": op.get("operator_rows_scanned") or 0,
+        "rows_out": op.get("operator_cardinality") or 0,
+    }
+
+
+def one_line(sql):
+    return " ".join(sql.split())
+
+
+class QueryProfiler:
+    def __init__(self):
+        # Queries are recorded only when enabled (--profile)
+        self.enabled = False
+        self.queries = []
+        self.lock = threading.Lock()
+        self.current = threading.local()
+
+    @contextlib.contextmanager
+    def section(self, name):
+        # Queries run on this thread inside the block belong to `name`
+        previous = getattr(self.current, "name", None)
+        self.current.name = name
+        try:
+            yield
+        finally:
+            self.current.name = previous
+
+    def record(self, query, profile, rows_returned, wall_time, error=None):
+        if not self.enabled:
+            return
+        operators = operator_tree(profile) if error is None else []
+        record = {
+            "section": getattr(self.current, "name", None) or SETUP_SECTION,
+            "query": one_line(query),
+            "error": error,
+            "wall_time": wall_time,
+        }
+        for key, default in QUERY_METRICS.items():
+            record[key] = profile.get(key, default) if error is None else default
+        record["rows_returned"] = rows_returned
+        slowest = sorted(walk_operators(operators), key=lambda op: -(op["operator_timing"] or 0))
+        record["slowest_operators"] = [
+            {"operator": op["operator_name"], "timing": op["operator_timing"] or 0, "rows": op["operator_cardinality"] or 0}
+            for op in slowest[:TOP_OPERATORS]
+        ]
+        record["scans"] = [scan_summary(op) for op in walk_operators(operators) if op["operator_type"] == "TABLE_SCAN"]
+        record["operators"] = operators
+        with self.lock:
+            self.queries.append(record)
+
+    def totals(self):
+        totals = {"queries": len(self.queries), "failed": 0, "wall_time": 0.0}
+        totals.update((key, 0) for key in QUERY_METRICS)
+        for record in self.queries:
+            totals["failed"] += record["error"] is not None
+            totals["wall_time"] += record["wall_time"]
+            for key in QUERY_METRICS:
+                if key == "system_peak_buffer_memory":
+                    totals[key] = max(totals[key], record[key])
+                else:
+                    totals[key] += record[key]
+        return totals
+
+    def save(self, path, report=None, source=None):
+        data = {
+            "version": PROFILE_VERSION,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "report": report,
+            "source": source,
+            "totals": self.totals(),
+            "queries": self.queries,
+        }
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp, path)
+
+    def format_appendix(self, sidecar=None):
+        totals = self.totals()
+        output = "## Appendix: Query Profiles\n\n"
+        output += (f"- Queries profiled: {totals['queries']} ({totals['failed']} failed); "
+                   f"DuckDB latency {totals['latency']:.3f}s, CPU {totals['cpu_time']:.3f}s\n")
+        output += (f"- Rows scanned: {totals['cumulative_rows_scanned']}; "
+                   f"peak buffer memory: {format_bytes(totals['system_peak_buffer_memory'])}\n")
+        if sidecar:
+            output += f"- Full profiles: `{sidecar}`\n"
+        output += "\n"
+
+        profiled = [record for record in self.queries if record["error"] is None]
+        ranked = sorted(profiled, key=lambda r: -r["latency"])[:APPENDIX_QUERIES]
+        if ranked:
+            output += "### Slowest Queries\n\n"
+            output += "| Section | Latency (s) | Rows scanned | Rows returned | Slowest operators | Scans (files, pushed filters) | Query |\n"
+            output += "|---|---|---|---|---|---|---|\n"
+            for record in ranked:
+                operators = ", ".join(f"{op['operator']} {op['timing']:.3f}s" for op in record["slowest_operators"])
+                scans = list(dict.fromkeys(format_scan(scan) for scan in record["scans"]))
+                if len(scans) > APPENDIX_SCANS:
+                    scans[APPENDIX_SCANS:] = [f"{len(scans) - APPENDIX_SCANS} more"]
+                scans = "; ".join(scans)
+                output += (f"| {record['section']} | {record['latency']:.3f} | {record['cumulative_rows_scanned']} "
+                           f"| {record['rows_returned']} | {cell(operators)} | {cell(scans)} | `{cell(preview(record['query']))}` |\n")
+            output += "\n"
+
+        failed = [record for record in self.queries if record["error"] is not None]
+        if failed:
+            output += "### Failed Queries\n\n"
+            for record in failed:
+                output += f"- {record['section']}: {one_line(record['error'])} (`{preview(record['query'])}`)\n"
+            output += "\n"
+        return output
+
+
+def format_scan(scan):
+    files = f" {scan['files']} files" if scan["files"] else ""
+    filters = ", ".join(scan["filters"]) if scan["filters"] else "no filter"
+    return f"{scan['table']}{files}: {filters}"
+
+
+def format_bytes(num):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if num < 1024:
+            return f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} TB"
+
+
+def preview(sql):
+    if len(sql) <= QUERY_PREVIEW:
+        return sql
+    return sql[:QUERY_PREVIEW - 3] + "..."
+
+
+def cell(text):
+    # Markdown table cell
+    return text.replace("|", "\\|").replace("`", "'").replace("\n", " ")
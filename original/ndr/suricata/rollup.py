@@ -0,0 +1,189 @@
+import duckdb
+import datetime
+import os
+import shutil
+import sys
+import time
+import orjson
+from cli import parse_args
+from duck_hunt import (get_parquet_file, parquet_source, private_flag, slice_definitions, time_literal,
+                       default_rollup_dir, load_rollup_manifest, ROLLUP_MANIFEST, UNWEIGHTED_SLICES)
+
+# Ingest-side rollups for `duck_hunt.py --rollups`. For each day (UTC) the
+# slices duck_hunt reads are grouped on all their columns and stored with the
+# number of events behind each row; flows also keep their byte totals, and
+# alerts are counted per source, destination and signature:
+#
+#   <dir>/<table>/day=<YYYY-MM-DD>/data_0.parquet
+#   <dir>/_rollups.json   days rolled up, with the raw event count of each
+#
+# The counts are exact and come from duck_hunt's own slice queries, so a
+# report over the rollups equals one over the raw events. A day is rebuilt
+# from the raw data when its event count differs from the one it was rolled
+# up from (events appended by `j2p.py --incremental`), and every day is with
+# --rebuild. Days that are no longer in the raw data (expired) are kept.
+
+ROLLUP_VERSION = 1
+# Day of events without a timestamp
+UNDATED = "undated"
+
+
+def day_expression(timestamp_type):
+    # SQL for an event's day
+    if timestamp_type is None:
+        return f"'{UNDATED}'"
+    if timestamp_type == "VARCHAR":
+        # Untyped conversion: the date as written, like j2p's date partitions
+        return f"coalesce(substr(timestamp, 1, 10), '{UNDATED}')"
+    if timestamp_type.startswith("TIMESTAMP WITH TIME ZONE"):
+        return f"coalesce(strftime(timezone('UTC', timestamp), '%Y-%m-%d'), '{UNDATED}')"
+    return f"coalesce(strftime(timestamp, '%Y-%m-%d'), '{UNDATED}')"
+
+
+def day_start(day):
+    return datetime.datetime.combine(datetime.date.fromisoformat(day), datetime.time())
+
+
+def days_filter(day_sql, timestamp_type, days):
+    # WHERE clause for the events of `days`. The timestamp range lets DuckDB
+    # skip row groups (and date partitions) outside it.
+    clauses = []
+    dated = sorted(d for d in days if d != UNDATED)
+    if dated:
+        in_days = f"{day_sql} IN ({', '.join(repr(d) for d in dated)})"
+        if timestamp_type is not None:
+            start = time_literal(timestamp_type, day_start(dated[0]))
+            end = time_literal(timestamp_type, day_start(dated[-1]) + datetime.timedelta(days=1))
+            in_days = f"timestamp >= {start} AND timestamp < {end} AND {in_days}"
+        clauses.append(f"({in_days})")
+    if UNDATED in days:
+        clauses.append("timestamp IS NULL" if timestamp_type is not None else "true")
+    return " OR ".join(clauses)
+
+
+def rollup_definitions(columns, source="rollup_events"):
+    # -> {table: query} over `source`, which has the raw columns plus `day`
+    has_ip_flags = 'src_private' in columns and 'dest_private' in columns
+    slices = slice_definitions('http' in columns, 'dns' in columns, 'tls' in columns, has_ip_flags,
+                               source=source, carry=("day",))
+    tables = {}
+    for name, query in slices.items():
+        if name in UNWEIGHTED_SLICES:
+            tables[name] = query
+        else:
+            tables[name] = f"SELECT *, count(*) as events FROM ({query}) GROUP BY ALL"
+
+    # The flow_events slice with the flows' byte totals
+    if 'flow' in columns:
+        byte_totals = "sum(flow.bytes_toserver) as bytes_toserver, sum(flow.bytes_toclient) as bytes_toclient"
+    else:
+        byte_totals = "CAST(NULL AS HUGEINT) as bytes_toserver, CAST(NULL AS HUGEINT) as bytes_toclient"
+    tables["flow_events"] = f"""
+        SELECT day, src_ip, dest_ip, dest_port, proto,
+               {private_flag("src", has_ip_flags)}, {private_flag("dest", has_ip_flags)},
+               count(*) as events, {byte_totals}
+        FROM {source}
+        WHERE event_type = 'flow'
+        GROUP BY ALL
+    """
+    if 'alert' in columns:
+        tables["alert_signatures"] = f"""
+            SELECT day, src_ip, dest_ip,
+                   alert.signature_id as signature_id, alert.signature as signature,
+                   alert.category as category, alert.severity as severity,
+                   count(*) as events
+            FROM {source}
+            WHERE event_type = 'alert'
+            GROUP BY ALL
+        """
+    return list(slices), tables
+
+
+def replace_day(out_dir, staging, table, day):
+    # Swaps the staged day of `table` in; a day without rows is removed
+    target = os.path.join(out_dir, table, f"day={day}")
+    staged = os.path.join(staging, table, f"day={day}")
+    if os.path.exists(target):
+        retired = os.path.join(staging, "_retired", table, f"day={day}")
+        os.makedirs(os.path.dirname(retired), exist_ok=True)
+        os.replace(target, retired)
+    if os.path.exists(staged):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(staged, target)
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, ROLLUP_MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    os.replace(tmp, path)
+
+
+def build_rollups(parquet_file, out_dir, rebuild=False):
+    con = duckdb.connect(database=':memory:')
+    con.execute(f"CREATE VIEW logs AS SELECT * FROM {parquet_source(parquet_file)}")
+    columns = {r[0]: r[1] for r in con.execute("DESCRIBE logs").fetchall()}
+    slices, tables = rollup_definitions(columns)
+    day_sql = day_expression(columns.get("timestamp"))
+
+    day_events = dict(con.execute(f"SELECT {day_sql} as day, count(*) FROM logs GROUP BY day").fetchall())
+    manifest = load_rollup_manifest(out_dir)
+    if (manifest is None or manifest.get("version") != ROLLUP_VERSION
+            or manifest.get("tables") != sorted(tables) or manifest.get("slices") != slices):
+        # New, or built from a different schema: nothing can be reused
+        if manifest is not None:
+            print("Rollups were built from a different schema, rebuilding every day")
+        manifest = {"version": ROLLUP_VERSION, "days": {}}
+        rebuild = True
+    manifest.update(source=os.path.abspath(parquet_file), slices=slices, tables=sorted(tables))
+
+    stale = sorted(day for day, events in day_events.items()
+                   if rebuild or manifest["days"].get(day, {}).get("events") != events)
+    if not stale:
+        print(f"Rollups up to date: {out_dir} ({len(manifest['days'])} days)")
+        return
+    print(f"Rolling up {len(stale)} of {len(day_events)} days from {parquet_file} into {out_dir}")
+
+    start = time.perf_counter()
+    con.execute(f"CREATE VIEW rollup_events AS SELECT *, {day_sql} as day FROM logs WHERE {days_filter(day_sql, columns.get('timestamp'), stale)}")
+    os.makedirs(out_dir, exist_ok=True)
+    staging = os.path.join(out_dir, "_staging")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for table, query in tables.items():
+        rows = con.execute(f"""
+            COPY ({query}) TO '{os.path.join(staging, table)}'
+            (FORMAT parquet, PARTITION_BY (day))
+        """).fetchone()[0]
+        print(f"  {table}: {rows} rows")
+
+    for table in tables:
+        for day in stale:
+            replace_day(out_dir, staging, table, day)
+    shutil.rmtree(staging, ignore_errors=True)
+
+    built = datetime.datetime.now().isoformat(timespec="seconds")
+    for day in stale:
+        manifest["days"][day] = {"events": day_events[day], "built": built}
+    save_manifest(out_dir, manifest)
+    kept = len(manifest["days"]) - len(day_events)
+    note = f", {kept} days kept from earlier data" if kept > 0 else ""
+    print(f"Done in {time.perf_counter() - start:.1f}s: {len(manifest['days'])} days rolled up{note}")
+
+
+def main():
+    args, options = parse_args(sys.argv[1:], {"out"})
+    parquet_file = get_parquet_file(args)
+    if not parquet_file:
+        print("Usage: python rollup.py <parquet_file_or_logs_dir_or_dataset_dir> [--out=DIR] [--rebuild]")
+        print("Error: No .parquet file found in provided path.")
+        sys.exit(1)
+    out_dir = options.get("out")
+    if not isinstance(out_dir, str):
+        out_dir = default_rollup_dir(parquet_file)
+    build_rollups(parquet_file, out_dir, rebuild=bool(options.get("rebuild")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import base64
+import hashlib
+import heapq
+import math
+import os
+import sys
+import orjson
+from eve_engine import merge_ranges, scan_detectors
+
+# Fixed-memory summaries for the orjson hunts, used in place of exact
+# Counters when the number of distinct values is unbounded (a month of DNS
+# names, a whole fleet). Both kinds merge, so sketches built per file, per
+# sensor or per day combine into the sketch of all the data, and both save
+# to JSON files (*.sketch) that scripts accept as inputs next to EVE logs.
+#
+# HyperLogLog: distinct count of strings in 2**p one-byte registers
+# (16 KiB at the default p=14), standard error 1.04 / sqrt(2**p) = 0.8%.
+#
+# SpaceSaving: top-K of a stream in k counters. Every tracked item's count is
+# an upper bound that overstates the true count by at most its error, and no
+# error exceeds total / k; an item whose true count is above total / k is
+# always tracked. Merging follows Agarwal et al., "Mergeable Summaries"
+# (PODS 2012), which keeps both guarantees.
+
+SKETCH_VERSION = 1
+SKETCH_SUFFIX = ".sketch"
+DEFAULT_PRECISION = 14
+DEFAULT_COUNTERS = 1000
+
+
+def hash64(value):
+    # Stable across processes and machines, unlike hash()
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, p=DEFAULT_PRECISION):
+        self.p = p
+        self.registers = bytearray(1 << p)
+
+    def add(self, value):
+        h = hash64(value)
+        bits = 64 - self.p
+        rest = h & ((1 << bits) - 1)
+        # Position of the first 1 bit after the register index
+        rank = bits - rest.bit_length() + 1
+        index = h >> bits
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog sketches of precision {self.p} and {other.p}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting is more accurate
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def to_dict(self):
+        return {"type": "hll", "p": self.p, "registers": base64.b64encode(self.registers).decode()}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["p"])
+        sketch.registers = bytearray(base64.b64decode(data["registers"]))
+        return sketch
+
+
+class SpaceSaving:
+    def __init__(self, k=DEFAULT_COUNTERS):
+        self.k = k
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        # Min-heap of (count, serial, item), one entry per tracked item. An
+        # entry goes stale when its item is counted again; stale entries are
+        # refreshed when they reach the top.
+        self.heap = []
+        self.serial = 0
+
+    def push(self, item, count):
+        self.serial += 1
+        heapq.heappush(self.heap, (count, self.serial, item))
+
+    def pop_min(self):
+        while True:
+            count, _, item = heapq.heappop(self.heap)
+            current = self.counts[item]
+            if current == count:
+                return item, count
+            self.push(item, current)
+
+    def add(self, item, count=1):
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            return
+        if len(counts) < self.k:
+            counts[item] = count
+            self.errors[item] = 0
+            self.push(item, count)
+            return
+        # Replace the smallest counter: the new item may have been seen up
+        # to that many times before
+        victim, floor = self.pop_min()
+        del counts[victim], self.errors[victim]
+        counts[item] = floor + count
+        self.errors[item] = floor
+        self.push(item, floor + count)
+
+    def floor(self):
+        # Most an untracked item can have been seen
+        if len(self.counts) < self.k:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other):
+        floor, other_floor = self.floor(), other.floor()
+        counts, errors = {}, {}
+        for item in self.counts.keys() | other.counts.keys():
+            # An item missing on one side had at most that side's floor there
+            counts[item] = self.counts.get(item, floor) + other.counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, floor) + other.errors.get(item, other_floor)
+        kept = sorted(counts, key=lambda item: (-counts[item], str(item)))[:self.k]
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+        self.total += other.total
+        self.heap = []
+        for item, count in self.counts.items():
+            self.push(item, count)
+        return self
+
+    def most_common(self, n=None):
+        # -> [(item, count, error)], highest count first
+        items = sorted(self.counts.items(), key=lambda pair: (-pair[1], str(pair[0])))
+        return [(item, count, self.errors[item]) for item, count in items[:n]]
+
+    def max_error(self):
+        return self.total // self.k
+
+    def __len__(self):
+        return len(self.counts)
+
+    def to_dict(self):
+        return {
+            "type": "space_saving",
+            "k": self.k,
+            "total": self.total,
+            "items": [[item, count, error] for item, count, error in self.most_common()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.total = data["total"]
+        for item, count, error in data["items"]:
+            sketch.counts[item] = count
+            sketch.errors[item] = error
+            sketch.push(item, count)
+        return sketch
+
+
+SKETCH_TYPES = {"hll": HyperLogLog, "space_saving": SpaceSaving}
+
+
+def format_count(count, error):
+    # Exact when the item was tracked from its first sighting
+    return f"{count}" if not error else f"~{count} (+{error} at most)"
+
+
+def format_distinct(sketch):
+    return f"~{sketch.count()} (+/-{sketch.relative_error():.1%})"
+
+
+# --- Sketch files ---
+# A detector state made of sketches ({name: sketch}) is saved with the
+# detector's checkpoint_key(), which includes the sketch size, so only
+# sketches built the same way are merged.
+
+# Options of sketch_option() that take a value (cli.parse_args)
+SKETCH_OPTIONS = {"save-sketch"}
+
+
+def sketch_option(options):
+    # --sketch[=K] and --save-sketch=PATH -> sketch options, or None when not
+    # sketching. K is the number of SpaceSaving counters.
+    size = options.get("sketch")
+    save = options.get("save-sketch")
+    if size is None and save is None:
+        return None
+    sketch_options = {"size": DEFAULT_COUNTERS if size in (None, True) else max(1, int(size))}
+    if save is not None:
+        sketch_options["save"] = save
+    return sketch_options
+
+
+def is_sketch_file(path):
+    return path.endswith(SKETCH_SUFFIX)
+
+
+def save_sketch_file(path, detectors, totals, states):
+    data = {
+        "version": SKETCH_VERSION,
+        "detectors": [d.checkpoint_key() for d in detectors],
+        "totals": totals,
+        "states": [{name: sketch.to_dict() for name, sketch in state.items()} for state in states],
+    }
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(orjson.dumps(data))
+    os.replace(tmp, path)
+
+
+def load_sketch_file(path, detectors):
+    # -> (totals, states)
+    with open(path, 'rb') as f:
+        data = orjson.loads(f.read())
+    expected = [d.checkpoint_key() for d in detectors]
+    if data.get("version") != SKETCH_VERSION or data.get("detectors") != expected:
+        raise ValueError(f"{path} holds sketches of {data.get('detectors')}, not {expected}")
+    states = [
+        {name: SKETCH_TYPES[sketch["type"]].from_dict(sketch) for name, sketch in state.items()}
+        for state in data["states"]
+    ]
+    return data["totals"], states
+
+
+def run_sketches(detectors, paths, options, jobs=1):
+    # Scans the EVE files among paths, merges in the *.sketch files among
+    # them, optionally saves the result and reports it
+    logs = [p for p in paths if not is_sketch_file(p)]
+    result = scan_detectors(detectors, logs, jobs)
+    for path in paths:
+        if is_sketch_file(path):
+            try:
+                saved = load_sketch_file(path, detectors)
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            result = merge_ranges(detectors, result, saved)
+    totals, states = result
+    if options.get("save"):
+        save_sketch_file(options["save"], detectors, totals, states)
+        print(f"Saved sketches to {options['save']}")
+    for detector, state in zip(detectors, states):
+        detector.finalize(state, totals)
+    return totals